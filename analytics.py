@@ -0,0 +1,400 @@
+"""
+Columnar analytics over the student, teacher and course tables.
+
+ColumnStore loads the columns that breakdowns use into NumPy arrays, one array
+per column with rows sorted by id. grade and subject are dictionary-encoded as
+small integer codes, and dates are datetime64. Group-by, histogram and join
+aggregations then run as whole-array operations instead of row by row through
+SQLite. The store is kept between calls: refresh() asks change_log (see
+changes.py) which rows were written or deleted since it last looked, and
+reloads only those, so keeping up with the database is cheap. change_log is
+filled by triggers, so this includes writes made outside the API; without it,
+as in a database that predates change tracking, every refresh reloads in full.
+
+The rest of the application does not need NumPy; without it AVAILABLE is
+False and the /api/analytics endpoints answer 503.
+
+Functions take a DB-API sqlite3 connection.
+
+Usage:
+    python analytics.py groupby course --by subject,tenure --agg count,sum:credits,avg:credits
+    python analytics.py histogram student age --by grade
+    python analytics.py status --live
+"""
+
+import argparse
+import itertools
+import threading
+import time
+from datetime import date, datetime
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+AVAILABLE = np is not None
+
+# table -> {column: type}: the columns loaded into the store
+COLUMNS = {
+    'student': {'grade': 'category', 'date_of_birth': 'date'},
+    'teacher': {'subject': 'category', 'experience': 'int'},
+    'course': {'teacher_id': 'int', 'credits': 'int'},
+}
+# table -> fields that can be grouped by or aggregated; course gets its teacher's fields by a join
+FIELDS = {
+    'student': ['grade', 'age', 'birth_year'],
+    'teacher': ['subject', 'experience', 'tenure'],
+    'course': ['credits', 'teacher_id', 'subject', 'experience', 'tenure'],
+}
+AGGREGATES = ('count', 'sum', 'avg', 'min', 'max')
+# lower bounds, in years of experience, of the tenure bands
+TENURE_BANDS = (0, 5, 10, 20)
+TENURE_LABELS = ['0-4', '5-9', '10-19', '20+']
+# reload the whole table rather than the changed rows once this share of it has changed
+FULL_RELOAD_RATIO = 0.25
+ID_CHUNK = 500
+
+
+class ColumnTable:
+    def __init__(self, ids, columns):
+        self.ids = ids
+        self.columns = columns
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def nbytes(self):
+        return self.ids.nbytes + sum(array.nbytes for array in self.columns.values())
+
+    def take(self, positions):
+        return ColumnTable(self.ids[positions], {name: array[positions] for name, array in self.columns.items()})
+
+    @classmethod
+    def concatenate(cls, first, second):
+        ids = np.concatenate([first.ids, second.ids])
+        order = np.argsort(ids, kind='stable')
+        return cls(ids[order], {name: np.concatenate([array, second.columns[name]])[order]
+                                for name, array in first.columns.items()})
+
+
+def parse_aggregate(spec):
+    """'count' or '<sum|avg|min|max>:<field>' -> (function, field or None)"""
+    function, _, name = spec.strip().partition(':')
+    if function not in AGGREGATES:
+        raise ValueError(f"aggregate must be one of: {', '.join(AGGREGATES)}")
+    if function == 'count' and name:
+        raise ValueError("count takes no field")
+    if function != 'count' and not name:
+        raise ValueError(f"use {function}:<field>")
+    return function, name or None
+
+
+def _python(value):
+    return value.item() if hasattr(value, 'item') else value
+
+
+class ColumnStore:
+    def __init__(self):
+        self.tables = {}
+        # (table, column) -> values, indexed by code; only ever appended to, so codes stay valid
+        self.dictionaries = {}
+        self._codes = {}
+        # table -> change_log revision its arrays are current to
+        self._revisions = {}
+        self.loads = {}
+        self._lock = threading.Lock()
+
+    def refresh(self, conn):
+        """Bring the arrays up to date with the database; returns the store"""
+        with self._lock:
+            # read the revision first: a write that lands during the reload is picked up next time
+            revision = _change_revision(conn)
+            tables = dict(self.tables)
+            for table in COLUMNS:
+                since = self._revisions.get(table)
+                if table in tables and revision is not None and since == revision:
+                    continue
+                tables[table] = self._reload(conn, table, tables.get(table), since, revision)
+                self._revisions[table] = revision
+            # readers take self.tables once, so they never see a half-refreshed store
+            self.tables = tables
+        return self
+
+    def _reload(self, conn, table, current, since, revision):
+        started = time.perf_counter()
+        changed = None
+        if current is not None and since is not None and revision is not None:
+            # one past the most an incremental reload takes, so a bulk write is not read in full twice
+            changed = _changed_ids(conn, table, since, revision, int(FULL_RELOAD_RATIO * len(current)) + 1)
+        if changed is None or len(changed) > FULL_RELOAD_RATIO * len(current):
+            loaded, mode = self._load(conn, table), 'full'
+        elif not len(changed):
+            return current
+        else:
+            # rows written since are read again; deleted ones are simply not found
+            loaded = current.take(~np.isin(current.ids, changed))
+            for start in range(0, len(changed), ID_CHUNK):
+                loaded = ColumnTable.concatenate(loaded, self._load(conn, table, changed[start:start + ID_CHUNK]))
+            mode = 'incremental'
+        self.loads[table] = {
+            'mode': mode,
+            'rows_read': len(loaded) if mode == 'full' else len(changed),
+            'ms': round((time.perf_counter() - started) * 1000, 1),
+            'loaded_at': datetime.utcnow().isoformat(),
+        }
+        return loaded
+
+    def _load(self, conn, table, ids=None):
+        names = list(COLUMNS[table])
+        sql = f"SELECT id, {', '.join(names)} FROM {table}"
+        params = ()
+        if ids is not None:
+            sql += f" WHERE id IN ({', '.join('?' * len(ids))})"
+            params = [int(row_id) for row_id in ids]
+        rows = conn.execute(sql + " ORDER BY id", params).fetchall()
+        values = list(zip(*rows)) if rows else [()] * (len(names) + 1)
+        columns = {}
+        for name, column in zip(names, values[1:]):
+            kind = COLUMNS[table][name]
+            if kind == 'category':
+                columns[name] = self._encode(table, name, column)
+            elif kind == 'date':
+                columns[name] = np.array(column, dtype='datetime64[D]')
+            else:
+                columns[name] = np.array(column, dtype=np.int32)
+        return ColumnTable(np.array(values[0], dtype=np.int64), columns)
+
+    def _encode(self, table, name, values):
+        dictionary = self.dictionaries.setdefault((table, name), [])
+        codes = self._codes.setdefault((table, name), {})
+        # fixed-width strings sort far faster than Python objects
+        uniques, inverse = np.unique(np.array(values, dtype=str), return_inverse=True)
+        for value in uniques.tolist():
+            if value not in codes:
+                codes[value] = len(dictionary)
+                dictionary.append(value)
+        mapping = np.array([codes[value] for value in uniques.tolist()], dtype=np.int32)
+        return mapping[inverse.reshape(-1)]
+
+    def field(self, tables, table, name):
+        """(values, dictionary or None, mask of rows that have a value or None) for a field of ``table``"""
+        if name not in FIELDS.get(table, ()):
+            raise ValueError(f"{table} fields are: {', '.join(FIELDS[table])}")
+        data = tables[table]
+        if table == 'course' and name in FIELDS['teacher']:
+            # inner join on course.teacher_id; both sides are sorted by id
+            teachers = tables['teacher']
+            values, dictionary, _ = self.field(tables, 'teacher', name)
+            if not len(teachers):
+                return np.zeros(len(data), dtype=values.dtype), dictionary, np.zeros(len(data), dtype=bool)
+            teacher_ids = data.columns['teacher_id']
+            positions = np.minimum(np.searchsorted(teachers.ids, teacher_ids), len(teachers) - 1)
+            return values[positions], dictionary, teachers.ids[positions] == teacher_ids
+        if name in data.columns:
+            return data.columns[name], self.dictionaries.get((table, name)), None
+        if name == 'tenure':
+            bands = np.searchsorted(TENURE_BANDS, data.columns['experience'], side='right') - 1
+            return np.maximum(bands, 0), TENURE_LABELS, None
+        born = data.columns['date_of_birth']
+        birth_year = born.astype('datetime64[Y]').astype(np.int64) + 1970
+        if name == 'birth_year':
+            return birth_year, None, None
+        # age: whole years, one less if this year's birthday is still to come
+        today = np.datetime64(date.today(), 'D')
+        this_year = today.astype('datetime64[Y]')
+        day_of_year = (born - born.astype('datetime64[Y]')).astype(np.int64)
+        before_birthday = (today - this_year).astype(np.int64) < day_of_year
+        return this_year.astype(np.int64) + 1970 - birth_year - before_birthday, None, None
+
+    def _measure(self, tables, table, name):
+        values, dictionary, mask = self.field(tables, table, name)
+        if dictionary is not None:
+            raise ValueError(f"{name} is not numeric")
+        return values.astype(np.int64), mask
+
+    def _aggregate(self, rows, keys, aggregates, measures, mask):
+        """Group ``rows`` rows by ``keys`` [(name, codes, dictionary)] and compute ``aggregates``"""
+        if mask is not None:
+            keys = [(name, values[mask], dictionary) for name, values, dictionary in keys]
+            measures = {name: values[mask] for name, values in measures.items()}
+            rows = int(mask.sum())
+        if not rows:
+            return []
+        # pack each row's key values into one integer, so grouping is a 1-D unique
+        combined = np.zeros(rows, dtype=np.int64)
+        bounds = []
+        for _, values, _ in keys:
+            low, high = int(values.min()), int(values.max())
+            bounds.append((low, high - low + 1))
+            combined = combined * (high - low + 1) + (values - low)
+        packed, inverse = np.unique(combined, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        groups = np.zeros((len(packed), len(keys)), dtype=np.int64)
+        for position in range(len(keys) - 1, -1, -1):
+            low, span = bounds[position]
+            packed, groups[:, position] = np.divmod(packed, span)
+            groups[:, position] += low
+        counts = np.bincount(inverse, minlength=len(groups))
+        order = np.argsort(inverse, kind='stable')
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        results = []
+        for function, name in aggregates:
+            if function == 'count':
+                results.append(('count', counts))
+                continue
+            ordered = measures[name][order]
+            if function in ('sum', 'avg'):
+                totals = np.add.reduceat(ordered, starts)
+                results.append((f"{function}_{name}", totals if function == 'sum' else np.round(totals / counts, 4)))
+            else:
+                reduce = np.minimum if function == 'min' else np.maximum
+                results.append((f"{function}_{name}", reduce.reduceat(ordered, starts)))
+        output = []
+        for number, group in enumerate(groups):
+            row = {name: dictionary[code] if dictionary is not None else _python(code)
+                   for (name, _, dictionary), code in zip(keys, group)}
+            row.update((name, _python(values[number])) for name, values in results)
+            output.append(row)
+        output.sort(key=lambda row: tuple(row[name] for name, _, _ in keys))
+        return output
+
+    def group_by(self, table, by=(), aggregates=('count',)):
+        """Rows of ``table`` grouped by the ``by`` fields, with an entry per aggregate spec (see parse_aggregate)"""
+        tables = self.tables
+        if table not in FIELDS:
+            raise ValueError(f"table must be one of: {', '.join(FIELDS)}")
+        aggregates = [parse_aggregate(spec) for spec in aggregates] or [('count', None)]
+        keys, mask = [], None
+        for name in by:
+            values, dictionary, valid = self.field(tables, table, name)
+            keys.append((name, values, dictionary))
+            mask = _combine(mask, valid)
+        measures = {}
+        for _, name in aggregates:
+            if name and name not in measures:
+                measures[name], valid = self._measure(tables, table, name)
+                mask = _combine(mask, valid)
+        return self._aggregate(len(tables[table]), keys, aggregates, measures, mask)
+
+    def histogram(self, table, name, by=(), bins=10, width=None):
+        """Counts of ``name`` in equal-width bins, per group of the ``by`` fields; empty bins are left out"""
+        tables = self.tables
+        if table not in FIELDS:
+            raise ValueError(f"table must be one of: {', '.join(FIELDS)}")
+        values, mask = self._measure(tables, table, name)
+        keys = []
+        for key in by:
+            key_values, dictionary, valid = self.field(tables, table, key)
+            keys.append((key, key_values, dictionary))
+            mask = _combine(mask, valid)
+        present = values if mask is None else values[mask]
+        if not len(present):
+            return []
+        low, high = int(present.min()), int(present.max())
+        if width is None:
+            width = max(1, -(-(high - low + 1) // max(1, bins)))
+        if width < 1:
+            raise ValueError("width must be a positive integer")
+        keys.append(('bin', (values - low) // width, None))
+        rows = self._aggregate(len(tables[table]), keys, [('count', None)], {}, mask)
+        for row in rows:
+            start = low + row.pop('bin') * width
+            count = row.pop('count')
+            row.update({'bin_start': start, 'bin_end': start + width, 'count': count})
+        return rows
+
+    def status(self):
+        tables = self.tables
+        return {
+            'tables': {
+                table: dict(self.loads.get(table, {}), rows=len(data), bytes=data.nbytes)
+                for table, data in tables.items()
+            },
+            'fields': FIELDS,
+            'aggregates': list(AGGREGATES),
+        }
+
+
+def _combine(mask, valid):
+    if valid is None:
+        return mask
+    return valid if mask is None else mask & valid
+
+
+def _change_revision(conn):
+    """The newest change_log revision, or None without a change log"""
+    try:
+        row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'change_log'").fetchone()
+    except Exception:
+        return None
+    return row[0] if row else 0
+
+
+def _changed_ids(conn, table, since, until, limit):
+    """Ids of ``table`` rows written or deleted with since < revision <= until, at most ``limit``;
+    None if tombstones from after ``since`` have been pruned, so deletions may be missing"""
+    try:
+        pruned = conn.execute("SELECT revision FROM change_pruned WHERE entity = ?", (table,)).fetchone()
+        if pruned and pruned[0] > since:
+            return None
+        cursor = conn.execute("SELECT row_id FROM change_log WHERE entity = ? AND revision > ? AND revision <= ? "
+                              "ORDER BY revision LIMIT ?", (table, since, until, limit))
+    except Exception:
+        return None
+    return np.unique(np.fromiter(itertools.chain.from_iterable(cursor), dtype=np.int64))
+
+
+def split_names(text):
+    return [name.strip() for name in (text or '').split(',') if name.strip()]
+
+
+def main():
+    from run_sql import FORMATS, choose_database, connect, write_rows
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--db', help="SQLite database file to use instead of the latest snapshot")
+    common.add_argument('--live', action='store_true', help="use the live school.db instead of the latest snapshot")
+    common.add_argument('--format', choices=FORMATS, default='table', help="output format (default: table)")
+    parser = argparse.ArgumentParser(description="Vectorized breakdowns of the school database")
+    commands = parser.add_subparsers(dest='command', required=True)
+    group = commands.add_parser('groupby', parents=[common], help="aggregate a table by one or more fields")
+    group.add_argument('table', choices=FIELDS)
+    group.add_argument('--by', default='', help="comma-separated fields to group by")
+    group.add_argument('--agg', default='count', help="comma-separated aggregates: count, sum:<field>, avg:<field>, ...")
+    histogram = commands.add_parser('histogram', parents=[common], help="distribution of a numeric field")
+    histogram.add_argument('table', choices=FIELDS)
+    histogram.add_argument('field')
+    histogram.add_argument('--by', default='', help="comma-separated fields to split the distribution by")
+    histogram.add_argument('--bins', type=int, default=10, help="number of bins (default: 10)")
+    histogram.add_argument('--width', type=int, help="bin width, instead of --bins")
+    commands.add_parser('status', parents=[common], help="show what the column store holds")
+    args = parser.parse_args()
+    if not AVAILABLE:
+        parser.exit(1, "analytics.py needs NumPy: pip install numpy\n")
+
+    conn = connect(choose_database(args.db, args.live))
+    store = ColumnStore().refresh(conn)
+    started = time.perf_counter()
+    if args.command == 'status':
+        for table, load in store.status()['tables'].items():
+            print(f"{table:<8} {load['rows']:>9} rows {load['bytes'] / 1e6:>8.2f} MB   loaded in {load['ms']} ms")
+        return
+    try:
+        if args.command == 'groupby':
+            rows = store.group_by(args.table, split_names(args.by), split_names(args.agg))
+        else:
+            rows = store.histogram(args.table, args.field, split_names(args.by), args.bins, args.width)
+    except ValueError as e:
+        parser.exit(2, f"{e}\n")
+    elapsed = time.perf_counter() - started
+    if rows:
+        columns = list(rows[0])
+        write_rows(columns, [[tuple(row[column] for column in columns) for row in rows]], args.format)
+    if args.format == 'table':
+        print(f"\n{len(rows)} rows in {elapsed * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
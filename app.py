@@ -1,20 +1,218 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, g, send_file, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
-from datetime import datetime
+from flask.json.provider import DefaultJSONProvider
+from functools import wraps
+from sqlalchemy import bindparam, delete, event, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+import click
+import csv
+import io
+import itertools
+import json
 import os
+import random
+import re
+import shutil
+import socket
+import tempfile
+import threading
+
+import analytics
+from changes import current_revision, install_changes, prune_tombstones, pruned_revision, read_all_changes, read_changes
+from enrollments import install_enrollments, read_credits
+from events import Event, EventBus
+from jobs import JobPool
+import metrics
+from migrations import upgrade as upgrade_schema
+from reports import REPORTS, ensure_fresh, install_reports, list_reports, read_report, refresh_report
+from response_cache import CachedResponse, ResponseCache, install_versions, read_versions
+from serialization import dumps, json_column, rows_to_dicts
+from snapshots import take_snapshot
+from search import KINDS as SEARCH_KINDS, install_search, search
+from stats import install_stats, read_courses_per_teacher, read_stats
 
 app = Flask(__name__)
-CORS(app)
+CORS(app, expose_headers=['X-Next-Cursor', 'X-Revision'])
 
 # Database configuration
 basedir = os.path.abspath(os.path.dirname(__file__))
-app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{os.path.join(basedir, "school.db")}'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get(
+    'SCHOOL_DATABASE_URI', f'sqlite:///{os.path.join(basedir, "school.db")}'
+)
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+# Database profile: 'development' keeps SQLite defaults; 'production' (SCHOOL_DB_PROFILE=production)
+# turns on WAL journaling and tuned pragmas, sizes the connection pool and serializes writes
+app.config['DB_PROFILE'] = os.environ.get('SCHOOL_DB_PROFILE', 'development')
+app.config['SQLITE_PRAGMAS'] = {}
+app.config['SERIALIZE_WRITES'] = False
+app.config['WRITE_LOCK_TIMEOUT'] = float(os.environ.get('SCHOOL_WRITE_LOCK_TIMEOUT', '30'))
+if app.config['DB_PROFILE'] == 'production':
+    app.config['SQLITE_PRAGMAS'] = {
+        'journal_mode': 'WAL',       # readers no longer block behind the writer
+        'synchronous': 'NORMAL',     # fsync at checkpoints only; safe with WAL
+        'cache_size': -64000,        # 64 MB page cache per connection
+        'mmap_size': 268435456,      # memory-map up to 256 MB of the file
+        'busy_timeout': 5000,        # wait up to 5 s for another process's lock
+        'temp_store': 'MEMORY',
+    }
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        'pool_size': int(os.environ.get('SCHOOL_DB_POOL_SIZE', '10')),
+        'max_overflow': int(os.environ.get('SCHOOL_DB_MAX_OVERFLOW', '5')),
+        'pool_timeout': 30,
+        'connect_args': {'timeout': 5, 'check_same_thread': False},
+    }
+    app.config['SERIALIZE_WRITES'] = True
+# Send an X-Query-Count header with every response (SCHOOL_QUERY_COUNT=1)
+app.config['QUERY_COUNT_HEADER'] = os.environ.get('SCHOOL_QUERY_COUNT') == '1'
+
+# Request instrumentation (see metrics.py): SCHOOL_PROFILING=1 adds Server-Timing headers and
+# /api/metrics; SCHOOL_PROFILE_SLOWEST=N also keeps cProfile output for the N slowest requests
+app.config['PROFILING'] = os.environ.get('SCHOOL_PROFILING') == '1'
+app.config['PROFILE_SLOWEST'] = int(os.environ.get('SCHOOL_PROFILE_SLOWEST', '0'))
+app.config['PROFILE_SAMPLE_RATE'] = float(os.environ.get('SCHOOL_PROFILE_SAMPLE_RATE', '1.0'))
+app.config['PROFILE_DIR'] = os.environ.get('SCHOOL_PROFILE_DIR')
+
 db = SQLAlchemy(app)
 
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in app.config['SQLITE_PRAGMAS'].items():
+        cursor.execute(f'PRAGMA {name}={value}')
+    cursor.close()
+
+with app.app_context():
+    if db.engine.dialect.name == 'sqlite':
+        event.listen(db.engine, 'connect', _apply_sqlite_pragmas)
+
+# Write serialization: in the production profile POST/PUT/PATCH/DELETE requests take a
+# lock, so concurrent writers in this process queue here instead of failing with 'database
+# is locked'. It is per process: the workers serve.py forks each have their own, and
+# writers in different workers only wait on SQLite's lock, up to busy_timeout.
+WRITE_METHODS = {'POST', 'PUT', 'PATCH', 'DELETE'}
+# endpoints that read a large body before writing; they call acquire_write_lock themselves
+LATE_LOCK_ENDPOINTS = {'submit_job'}
+_write_lock = threading.Lock()
+
+def acquire_write_lock():
+    """Hold the writer lock until the request ends; False if it could not be had in time"""
+    if not app.config['SERIALIZE_WRITES'] or g.get('holds_write_lock'):
+        return True
+    if not _write_lock.acquire(timeout=app.config['WRITE_LOCK_TIMEOUT']):
+        return False
+    g.holds_write_lock = True
+    return True
+
+def write_lock_busy_response():
+    return jsonify({'error': 'Database busy, try again'}), 503
+
+@app.before_request
+def _acquire_write_lock():
+    if request.method in WRITE_METHODS and request.endpoint not in LATE_LOCK_ENDPOINTS:
+        if not acquire_write_lock():
+            return write_lock_busy_response()
+
+@app.teardown_request
+def _release_write_lock(exc):
+    if g.pop('holds_write_lock', False):
+        _write_lock.release()
+
+# Request instrumentation
+request_metrics = metrics.Metrics()
+slowest_profiles = metrics.SlowestProfiles(app.config['PROFILE_SLOWEST'], app.config['PROFILE_DIR'])
+
+class TimedJSONProvider(DefaultJSONProvider):
+    def response(self, *args, **kwargs):
+        with metrics.timed('serialize'):
+            return super().response(*args, **kwargs)
+
+app.json = TimedJSONProvider(app)
+
+@app.before_request
+def _start_profiling():
+    if app.config['PROFILING'] or app.config['PROFILE_SLOWEST']:
+        profile = app.config['PROFILE_SLOWEST'] > 0 and random.random() < app.config['PROFILE_SAMPLE_RATE']
+        metrics.start_request(profile=profile)
+
+@app.after_request
+def _record_profiling(response):
+    stats = metrics.finish_request()
+    if stats is None:
+        return response
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    if app.config['PROFILING']:
+        response.headers['Server-Timing'] = stats.server_timing()
+        request_metrics.observe(request.method, route, response.status_code, stats)
+    if stats.profiler is not None:
+        slowest_profiles.add(request.method, request.path, stats)
+    return response
+
+@app.teardown_request
+def _stop_profiling(exc):
+    metrics.finish_request()
+
+# Query counting: wrap code in count_queries() to see how many SQL statements it runs
+_active_counters = threading.local()
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self.statements = []
+
+def _counter_stack():
+    stack = getattr(_active_counters, 'stack', None)
+    if stack is None:
+        stack = _active_counters.stack = []
+    return stack
+
+@contextmanager
+def count_queries():
+    """Count the SQL statements executed by this thread inside the block.
+
+    Usage in tests:
+        with count_queries() as counter:
+            client.get('/api/courses')
+        assert counter.count == 1
+    """
+    counter = QueryCounter()
+    _counter_stack().append(counter)
+    try:
+        yield counter
+    finally:
+        _counter_stack().remove(counter)
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    for counter in getattr(_active_counters, 'stack', ()):
+        counter.count += 1
+        counter.statements.append(statement)
+
+@app.before_request
+def _start_query_count():
+    if app.config['QUERY_COUNT_HEADER']:
+        g.query_counter = QueryCounter()
+        _counter_stack().append(g.query_counter)
+
+@app.after_request
+def _add_query_count_header(response):
+    if 'query_counter' in g:
+        response.headers['X-Query-Count'] = str(g.query_counter.count)
+    return response
+
+@app.teardown_request
+def _stop_query_count(exc):
+    counter = g.pop('query_counter', None)
+    if counter is not None:
+        _counter_stack().remove(counter)
+
 # Database Models
+# Indexes declared here must match migrations.py, which adds them to existing databases
 class Student(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -22,7 +220,15 @@ class Student(db.Model):
     phone = db.Column(db.String(20), nullable=False)
     grade = db.Column(db.String(10), nullable=False)
     date_of_birth = db.Column(db.Date, nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+
+    __table_args__ = (
+        # grade filters and per-grade date_of_birth stats
+        db.Index('ix_student_grade_dob', 'grade', 'date_of_birth'),
+        # NOCASE matches LIKE's case-insensitivity, so prefix searches can use it
+        db.Index('ix_student_name', name.collate('NOCASE')),
+    )
 
     def to_dict(self):
         return {
@@ -32,7 +238,8 @@ class Student(db.Model):
             'phone': self.phone,
             'grade': self.grade,
             'date_of_birth': self.date_of_birth.isoformat() if self.date_of_birth else None,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'version': self.version
         }
 
 class Teacher(db.Model):
@@ -40,9 +247,14 @@ class Teacher(db.Model):
     name = db.Column(db.String(100), nullable=False)
     email = db.Column(db.String(100), unique=True, nullable=False)
     phone = db.Column(db.String(20), nullable=False)
-    subject = db.Column(db.String(50), nullable=False)
-    experience = db.Column(db.Integer, nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    subject = db.Column(db.String(50), nullable=False, index=True)
+    experience = db.Column(db.Integer, nullable=False, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+
+    __table_args__ = (
+        db.Index('ix_teacher_name', name.collate('NOCASE')),
+    )
 
     def to_dict(self):
         return {
@@ -52,7 +264,8 @@ class Teacher(db.Model):
             'phone': self.phone,
             'subject': self.subject,
             'experience': self.experience,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'version': self.version
         }
 
 class Course(db.Model):
@@ -60,10 +273,17 @@ class Course(db.Model):
     name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text)
     teacher_id = db.Column(db.Integer, db.ForeignKey('teacher.id'), nullable=False)
-    credits = db.Column(db.Integer, nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    credits = db.Column(db.Integer, nullable=False, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
 
-    teacher = db.relationship('Teacher', backref=db.backref('courses', lazy=True))
+    __table_args__ = (
+        # teacher lookups and covering SUM(credits) per teacher
+        db.Index('ix_course_teacher_credits', 'teacher_id', 'credits'),
+    )
+
+    # Joined eager load: course lists and detail reads fetch the teacher in the same SELECT
+    teacher = db.relationship('Teacher', lazy='joined', backref=db.backref('courses', lazy=True))
 
     def to_dict(self):
         return {
@@ -73,130 +293,1472 @@ class Course(db.Model):
             'teacher_id': self.teacher_id,
             'teacher_name': self.teacher.name if self.teacher else None,
             'credits': self.credits,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'version': self.version
+        }
+
+class Enrollment(db.Model):
+    # the primary key (student_id, course_id) serves a student's courses, the index a course's roster
+    student_id = db.Column(db.Integer, db.ForeignKey('student.id'), primary_key=True)
+    course_id = db.Column(db.Integer, db.ForeignKey('course.id'), primary_key=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_enrollment_course_student', 'course_id', 'student_id'),
+        {'sqlite_with_rowid': False},
+    )
+
+class Job(db.Model):
+    """A background job (see jobs.py); params and result are JSON"""
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)
+    params = db.Column(db.Text, nullable=False, default='{}')
+    status = db.Column(db.String(10), nullable=False, default='queued')
+    total = db.Column(db.Integer)
+    processed = db.Column(db.Integer, nullable=False, default=0)
+    result = db.Column(db.Text)
+    error = db.Column(db.Text)
+    worker = db.Column(db.String(100))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        # claiming the oldest queued job
+        db.Index('ix_job_status_id', 'status', 'id'),
+    )
+
+    def to_dict(self):
+        end = self.finished_at or datetime.utcnow()
+        elapsed = (end - self.started_at).total_seconds() if self.started_at else None
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'params': json.loads(self.params),
+            'status': self.status,
+            'total': self.total,
+            'processed': self.processed,
+            'progress': round(self.processed / self.total, 4) if self.total else None,
+            'rows_per_second': round(self.processed / elapsed, 1) if elapsed else None,
+            'result': json.loads(self.result) if self.result else None,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
         }
 
+# Trigger-maintained tables: /api/stats summaries (stats.py), the search index (search.py),
+# the entity versions that key the response cache (response_cache.py), the materialized
+# reports (reports.py) and per-student credit totals (enrollments.py).
+# They are created alongside the models, and filled from the base tables when first created.
+def _table_exists(connection, name):
+    return connection.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+    ).first() is not None
+
+@event.listens_for(db.metadata, 'after_create')
+def _install_derived_tables(target, connection, **kw):
+    install_stats(connection, rebuild=not _table_exists(connection, 'stats_course_subject'))
+    install_search(connection, rebuild=not _table_exists(connection, 'search_index'))
+    install_versions(connection)
+    install_reports(connection.connection.driver_connection,
+                    rebuild=not _table_exists(connection, 'report_state'))
+    install_enrollments(connection, rebuild=not _table_exists(connection, 'student_credits'))
+    install_changes(connection, rebuild=not _table_exists(connection, 'change_log'))
+
+@app.cli.command('rebuild-stats')
+def rebuild_stats_command():
+    """Recompute the /api/stats summary tables and student credit totals from the base tables."""
+    with db.engine.begin() as connection:
+        install_stats(connection, rebuild=True)
+        install_enrollments(connection, rebuild=True)
+    print("Statistics rebuilt.")
+
+@app.cli.command('rebuild-search')
+def rebuild_search_command():
+    """Repopulate the full-text search index from the base tables."""
+    with db.engine.begin() as connection:
+        install_search(connection, rebuild=True)
+    print("Search index rebuilt.")
+
+@app.cli.command('prune-changes')
+@click.option('--days', default=30, show_default=True, help="Keep tombstones of rows deleted this recently.")
+def prune_changes_command(days):
+    """Delete old tombstones from the change log; clients that synced before them reload in full."""
+    before = (datetime.utcnow() - timedelta(days=days)).isoformat()
+    with db.engine.begin() as connection:
+        removed = prune_tombstones(connection, before)
+    print(f"Pruned {removed} tombstones.")
+
+@app.cli.command('refresh-reports')
+def refresh_reports_command():
+    """Recompute every materialized report (see reports.py)."""
+    with db.engine.begin() as connection:
+        for name in REPORTS:
+            refresh_report(connection.connection.driver_connection, name)
+    print("Reports refreshed.")
+
+def apply_migrations():
+    """Create missing tables, then bring existing ones up to date (see migrations.py)"""
+    db.create_all()
+    connection = db.engine.raw_connection()
+    try:
+        return upgrade_schema(connection.driver_connection)
+    finally:
+        connection.close()
+
+@app.cli.command('db-upgrade')
+def db_upgrade_command():
+    """Create tables and apply pending schema migrations."""
+    applied = apply_migrations()
+    print(f"Applied migrations: {applied}" if applied else "Database is up to date.")
+
+# Response cache: GET responses are cached per path and entity versions, and served with ETags.
+# Versions live in the database, so every worker process sees every write.
+app.config['RESPONSE_CACHE_SIZE'] = int(os.environ.get('SCHOOL_RESPONSE_CACHE_SIZE', '256'))
+response_cache = ResponseCache(app.config['RESPONSE_CACHE_SIZE'])
+
+# Responses that include another entity's data depend on its version too
+CACHE_DEPENDENCIES = {
+    'student': ('student',),
+    'teacher': ('teacher',),
+    'course': ('course', 'teacher'),
+    'snapshot': ('student', 'teacher', 'course'),
+    'roster': ('enrollment', 'student'),
+    'enrolled_courses': ('enrollment', 'course', 'teacher'),
+    'credits': ('enrollment', 'course'),
+}
+
+def cached_response(resource):
+    """Cache a GET view's 200 responses and answer If-None-Match with 304 Not Modified.
+
+    ``resource`` names the CACHE_DEPENDENCIES entry whose versions key the cache.
+    """
+    entities = CACHE_DEPENDENCIES[resource]
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            versions = read_versions(db.session.connection())
+            key = response_cache.key(request.full_path, entities, versions)
+            entry = response_cache.get(key)
+            if entry is None:
+                response = app.make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.is_streamed:
+                    return response
+                headers = {name: value for name, value in response.headers.items() if name.startswith('X-')}
+                entry = CachedResponse(response.get_data(), response.mimetype, headers)
+                response_cache.set(key, entry)
+            response = Response(entry.body, mimetype=entry.mimetype, headers=entry.headers)
+            response.set_etag(entry.etag)
+            response.headers['Cache-Control'] = 'no-cache'
+            return response.make_conditional(request)
+        return wrapper
+    return decorator
+
+# Request validation: each schema maps a field name to a parser that raises ValueError
+def text_field(max_length=None, required=True):
+    def parse(value):
+        if value is None or (isinstance(value, str) and not value.strip()):
+            if required:
+                raise ValueError('is required')
+            return None
+        if not isinstance(value, str):
+            raise ValueError('must be a string')
+        if max_length and len(value) > max_length:
+            raise ValueError(f'must be at most {max_length} characters')
+        return value
+    return parse
+
+def int_field(value):
+    if isinstance(value, bool):
+        raise ValueError('must be an integer')
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError('must be an integer')
+
+def date_field(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        raise ValueError('must be a date in YYYY-MM-DD format')
+
+STUDENT_SCHEMA = {
+    'name': text_field(100),
+    'email': text_field(100),
+    'phone': text_field(20),
+    'grade': text_field(10),
+    'date_of_birth': date_field,
+}
+
+TEACHER_SCHEMA = {
+    'name': text_field(100),
+    'email': text_field(100),
+    'phone': text_field(20),
+    'subject': text_field(50),
+    'experience': int_field,
+}
+
+COURSE_SCHEMA = {
+    'name': text_field(100),
+    'description': text_field(required=False),
+    'teacher_id': int_field,
+    'credits': int_field,
+}
+
+def validate_row(schema, data, partial=False):
+    """Return the parsed column values for ``data`` or raise ValueError naming the bad field.
+
+    With ``partial`` (PATCH) only the fields present in ``data`` are parsed and returned.
+    """
+    if not isinstance(data, dict):
+        raise ValueError('Expected a JSON object')
+    values = {}
+    for name, parse in schema.items():
+        if partial and name not in data:
+            continue
+        try:
+            values[name] = parse(data.get(name))
+        except ValueError as e:
+            raise ValueError(f'{name}: {e}')
+    return values
+
+# List endpoint helpers: keyset pagination, field projection and filters
+MAX_PAGE_SIZE = 1000
+
+def parse_datetime_arg(value):
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid datetime: {value}")
+
+def parse_int_arg(value):
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"Invalid integer: {value}")
+
+def json_response(data):
+    with metrics.timed('serialize'):
+        body = dumps(data)
+    return Response(body, mimetype='application/json')
+
+def row_columns(model):
+    """Columns a list row exposes, by name: the table's plus courses' teacher_name"""
+    columns = {column.name: column for column in model.__table__.c}
+    if model is Course:
+        columns['teacher_name'] = Teacher.__table__.c.name
+    return columns
+
+def row_select(model, names):
+    """SELECT the named row columns as JSON-ready values (see serialization.py)"""
+    columns = row_columns(model)
+    query = select(*[json_column(columns[name], name) for name in names])
+    if 'teacher_name' in names:
+        query = query.select_from(Course).outerjoin(Teacher, Course.teacher_id == Teacher.id)
+    return query
+
+def created_filters(model):
+    return {
+        'created_after': lambda query, value: query.filter(model.created_at > parse_datetime_arg(value)),
+        'created_before': lambda query, value: query.filter(model.created_at < parse_datetime_arg(value)),
+    }
+
+def apply_filters(query, filters):
+    for arg, apply_filter in filters.items():
+        value = request.args.get(arg)
+        if value:
+            query = apply_filter(query, value)
+    return query
+
+def list_response(model, filters, scope=None, key=None):
+    """Serve a list endpoint with ?limit=&cursor=&fields= and the model's filters.
+
+    Rows are returned in id order. When more rows remain, the id to pass as the
+    next ``cursor`` is sent in the ``X-Next-Cursor`` header, so the body stays a
+    plain JSON array. ``scope`` narrows the query (a roster joins enrollment and
+    keeps one course's rows) and ``key`` is the id column to order and page by.
+    Unscoped lists send the change log revision they are current to in
+    ``X-Revision``, to pass as ``since`` to the model's changes endpoint.
+    """
+    key = model.id if key is None else key
+    try:
+        names = list(row_columns(model))
+        fields = request.args.get('fields')
+        if fields:
+            requested = [name.strip() for name in fields.split(',') if name.strip()]
+            unknown = [name for name in requested if name not in names]
+            if unknown:
+                raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+            names = requested if 'id' in requested else ['id'] + requested
+        query = apply_filters(row_select(model, names), filters)
+        if scope is not None:
+            query = scope(query)
+
+        cursor = request.args.get('cursor')
+        if cursor:
+            query = query.where(key > parse_int_arg(cursor))
+
+        limit = request.args.get('limit')
+        if limit:
+            limit = parse_int_arg(limit)
+            if not 1 <= limit <= MAX_PAGE_SIZE:
+                raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    query = query.order_by(key)
+    if limit:
+        query = query.limit(limit + 1)
+    # read before the rows: a change committed in between is sent again rather than missed
+    revision = current_revision(db.session.connection()) if scope is None else None
+    rows = db.session.execute(query).all()
+
+    next_cursor = None
+    if limit and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = rows[-1].id
+
+    response = json_response(rows_to_dicts(names, rows))
+    if next_cursor is not None:
+        response.headers['X-Next-Cursor'] = str(next_cursor)
+    if revision is not None:
+        response.headers['X-Revision'] = str(revision)
+    return response
+
+def load_rows(model, ids):
+    """The rows with these ids as the list endpoint returns them, by id; missing ids are left out"""
+    if not ids:
+        return {}
+    names = list(row_columns(model))
+    query = row_select(model, names).where(model.id.in_(ids))
+    return {row['id']: row for row in rows_to_dicts(names, db.session.execute(query).all())}
+
+def changes_response(model):
+    """Serve a model's changes after ?since=<revision>, oldest first, at most ?limit= of them.
+
+    Each change is an upsert carrying the row as the list endpoint returns it, or
+    a delete carrying just the id; a row changed several times appears once.
+    ``revision`` in the body is the ``since`` for the next call, and ``more`` says
+    whether to make it straight away. A ``since`` older than the pruned
+    tombstones gets 410 Gone: the client must reload the list.
+    """
+    try:
+        since = parse_int_arg(request.args.get('since', '0'))
+        limit = parse_int_arg(request.args.get('limit', str(MAX_PAGE_SIZE)))
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    connection = db.session.connection()
+    entity = model.__tablename__
+    # read first, so a change committed while the entries are read is left for the next call
+    revision = current_revision(connection)
+    if 0 < since < pruned_revision(connection, entity):
+        return jsonify({'error': 'Changes this old have been pruned; reload the full list',
+                        'revision': revision}), 410
+    entries = read_changes(connection, entity, since, revision, limit + 1)
+    more = len(entries) > limit
+    entries = entries[:limit]
+    if more:
+        revision = entries[-1][0]
+
+    rows = load_rows(model, [row_id for _, row_id, deleted, _ in entries if not deleted])
+    changes = []
+    for entry_revision, row_id, deleted, changed_at in entries:
+        change = {'revision': entry_revision, 'id': row_id, 'changed_at': changed_at}
+        if deleted or row_id not in rows:
+            change['op'] = 'delete'
+        else:
+            change.update(op='upsert', row=rows[row_id])
+        changes.append(change)
+    return json_response({'changes': changes, 'revision': revision, 'more': more})
+
+STUDENT_FILTERS = {
+    'grade': lambda query, value: query.filter(Student.grade == value),
+    **created_filters(Student),
+}
+
+TEACHER_FILTERS = {
+    'subject': lambda query, value: query.filter(Teacher.subject == value),
+    **created_filters(Teacher),
+}
+
+COURSE_FILTERS = {
+    'teacher_id': lambda query, value: query.filter(Course.teacher_id == parse_int_arg(value)),
+    'subject': lambda query, value: query.filter(Course.teacher.has(Teacher.subject == value)),
+    **created_filters(Course),
+}
+
+# Streaming export: rows are read in keyset chunks and written out as they arrive
+EXPORT_CHUNK_SIZE = 1000
+
+EXPORT_FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+def export_body(model, filters, export_format, on_rows=None):
+    """Return a generator encoding every row matching the request's filters as CSV or NDJSON.
+
+    Each chunk is a separate ``WHERE id > last ORDER BY id LIMIT n`` query, so
+    memory use does not depend on table size and no read stays open between
+    chunks. ``on_rows(n)`` is called after each chunk of ``n`` rows.
+    """
+    names = list(row_columns(model))
+    query = apply_filters(row_select(model, names), filters)
+
+    def chunks():
+        last_id = 0
+        while True:
+            rows = db.session.execute(
+                query.where(model.id > last_id).order_by(model.id).limit(EXPORT_CHUNK_SIZE)
+            ).all()
+            if not rows:
+                return
+            last_id = rows[-1].id
+            yield rows
+            if on_rows:
+                on_rows(len(rows))
+
+    def generate_csv():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(names)
+        yield buffer.getvalue()
+        for rows in chunks():
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(rows)
+            yield buffer.getvalue()
+
+    def generate_ndjson():
+        for rows in chunks():
+            yield b''.join(dumps(item) + b'\n' for item in rows_to_dicts(names, rows))
+
+    return generate_csv() if export_format == 'csv' else generate_ndjson()
+
+def export_response(model, filters):
+    """Stream every matching row as CSV or NDJSON (?format=csv|ndjson)"""
+    export_format = request.args.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': 'format must be csv or ndjson'}), 400
+    try:
+        body = export_body(model, filters, export_format)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    response = Response(stream_with_context(body), mimetype=EXPORT_FORMATS[export_format])
+    response.headers['Content-Disposition'] = f'attachment; filename={model.__tablename__}.{export_format}'
+    return response
+
+# Snapshot: all three entity lists fetched concurrently, each on its own pooled connection.
+# SQLite releases the GIL while it reads, so the queries overlap instead of running back to back.
+SNAPSHOT_ENTITIES = {'students': Student, 'teachers': Teacher, 'courses': Course}
+read_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get('SCHOOL_READ_THREADS', '4')), thread_name_prefix='school-read'
+)
+
+def fetch_rows(model, limit=None):
+    names = list(row_columns(model))
+    query = row_select(model, names).order_by(model.id)
+    if limit:
+        query = query.limit(limit)
+    with app.app_context():
+        with db.engine.connect() as connection:
+            return rows_to_dicts(names, connection.execute(query).all())
+
+# Bulk endpoint helpers: validate every row, then write in batched executemany statements
+BULK_BATCH_SIZE = 500
+
+NDJSON_MIMETYPES = ('application/x-ndjson', 'application/ndjson')
+
+def parse_ndjson(lines):
+    """Yield the item on each non-blank line, or a ValueError for a line that is not valid JSON"""
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            yield ValueError(f'Invalid JSON: {e}')
+
+_JSON_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+def parse_json_array(f, chunk_size=1 << 16):
+    """Yield the items of the JSON array in the text file ``f`` one at a time, reading it in chunks,
+    so a large upload never has to fit in memory; raises ValueError if it is not a valid JSON array"""
+    decoder = json.JSONDecoder()
+    buffer, position, eof = '', 0, False
+
+    def more():
+        nonlocal buffer, position, eof
+        data = f.read(chunk_size)
+        eof = not data
+        buffer, position = buffer[position:] + data, 0
+        return not eof
+
+    def next_char():
+        nonlocal position
+        while True:
+            position = _JSON_WHITESPACE.match(buffer, position).end()
+            if position < len(buffer):
+                return buffer[position]
+            if not more():
+                return ''
+
+    if next_char() != '[':
+        raise ValueError('Expected a JSON array or an NDJSON body')
+    position += 1
+    closed = next_char() == ']'
+    if closed:
+        position += 1
+    while not closed:
+        next_char()
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+            # a number that ends the buffer may continue in the next chunk
+            complete = end < len(buffer) or eof
+        except json.JSONDecodeError as e:
+            if eof:
+                raise ValueError(f'Invalid JSON: {e}')
+            complete = False
+        if not complete:
+            more()
+            continue
+        position = end
+        yield item
+        separator = next_char()
+        if separator not in (',', ']'):
+            raise ValueError("Invalid JSON: expected ',' or ']' between array items")
+        position += 1
+        closed = separator == ']'
+    # only whitespace may follow; anything else is a truncated or concatenated upload
+    if next_char():
+        raise ValueError('Invalid JSON: unexpected data after the array')
+
+def read_bulk_items():
+    """Read a JSON array or NDJSON request body as a list of items.
+
+    NDJSON lines that are not valid JSON become ValueError items so they are
+    reported as row errors instead of failing the whole request.
+    """
+    if request.mimetype in NDJSON_MIMETYPES:
+        return list(parse_ndjson(request.get_data(as_text=True).splitlines()))
+    items = request.get_json(silent=True)
+    if not isinstance(items, list):
+        raise ValueError('Expected a JSON array or an NDJSON body')
+    return items
+
+def chunked(values, size=BULK_BATCH_SIZE):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+def existing_values(column, values):
+    found = set()
+    for chunk in chunked(values):
+        found.update(value for (value,) in db.session.query(column).filter(column.in_(chunk)))
+    return found
+
+def check_emails(model):
+    def check(rows, upsert):
+        errors = {}
+        if upsert:
+            return errors
+        seen = set()
+        for position, row in enumerate(rows):
+            if row['email'] in seen:
+                errors[position] = 'email: duplicated in request'
+            seen.add(row['email'])
+        taken = existing_values(model.email, seen)
+        for position, row in enumerate(rows):
+            if row['email'] in taken:
+                errors.setdefault(position, 'email: already exists')
+        return errors
+    return check
+
+def check_course_teachers(rows, upsert):
+    # rows from a PATCH may leave teacher_id out
+    known = existing_values(Teacher.id, {row['teacher_id'] for row in rows if 'teacher_id' in row})
+    return {position: 'teacher_id: no such teacher'
+            for position, row in enumerate(rows) if 'teacher_id' in row and row['teacher_id'] not in known}
+
+def bulk_write(model, schema, upsert_key, check_rows, items, upsert=False, first_row=0):
+    """Insert (or with ``upsert``, insert-or-update on ``upsert_key``) a batch of items.
+
+    Invalid rows are reported as ``{'row': index, 'error': message}``, numbered
+    from ``first_row``, and skipped; valid rows are written in a single
+    transaction. Returns ``(written, errors)``.
+    """
+    rows, indexes, errors = [], [], []
+    for index, item in enumerate(items, first_row):
+        try:
+            if isinstance(item, Exception):
+                raise item
+            values = validate_row(schema, item)
+            if upsert and upsert_key == 'id' and item.get('id') is not None:
+                values['id'] = int_field(item['id'])
+        except ValueError as e:
+            errors.append({'row': index, 'error': str(e)})
+            continue
+        rows.append(values)
+        indexes.append(index)
+
+    rejected = check_rows(rows, upsert)
+    errors.extend({'row': indexes[position], 'error': message} for position, message in rejected.items())
+    rows = [row for position, row in enumerate(rows) if position not in rejected]
+
+    table = model.__table__
+    # executemany needs uniform parameter sets, so rows with and without a key are sent separately
+    for has_key in (True, False):
+        group = [row for row in rows if (upsert_key in row) == has_key]
+        for batch in chunked(group):
+            if upsert and has_key:
+                statement = sqlite_insert(table)
+                statement = statement.on_conflict_do_update(
+                    index_elements=[upsert_key],
+                    set_={**{name: statement.excluded[name] for name in batch[0] if name != upsert_key},
+                          'version': table.c.version + 1}
+                )
+            else:
+                statement = table.insert()
+            db.session.execute(statement, batch)
+    db.session.commit()
+
+    errors.sort(key=lambda error: error['row'])
+    return len(rows), errors
+
+def bulk_write_response(model, schema, upsert_key, check_rows):
+    """Serve a bulk endpoint: a JSON array or NDJSON body, ?upsert=1 to update existing rows"""
+    try:
+        items = read_bulk_items()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    upsert = request.args.get('upsert') in ('1', 'true')
+    written, errors = bulk_write(model, schema, upsert_key, check_rows, items, upsert)
+    return jsonify({'written': written, 'errors': errors})
+
+def bulk_delete_response(model, blocked=None):
+    """Delete the ids in the JSON array body. ``blocked(ids)`` returns {id: error} for ids that
+    must not be deleted; those are left in place and reported, as bulk writes report bad rows."""
+    ids = request.get_json(silent=True)
+    if not isinstance(ids, list) or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+        return jsonify({'error': 'Expected a JSON array of ids'}), 400
+    deleted = 0
+    errors = []
+    for chunk in chunked(sorted(set(ids))):
+        refused = blocked(chunk) if blocked else {}
+        errors.extend({'id': row_id, 'error': error} for row_id, error in sorted(refused.items()))
+        chunk = [row_id for row_id in chunk if row_id not in refused]
+        deleted += model.query.filter(model.id.in_(chunk)).delete(synchronize_session=False)
+    db.session.commit()
+    return jsonify({'deleted': deleted, 'errors': errors})
+
+# Optimistic locking: every update bumps the row's version. A client sends the version it
+# last read (If-Match header or a "version" field); the UPDATE matches the row only if it
+# is still at that version, so a concurrent edit gets 409 instead of being overwritten.
+def expected_version(data=None):
+    value = request.headers.get('If-Match', '').strip()
+    if value and value != '*':
+        value = value.removeprefix('W/').strip('"')
+    elif isinstance(data, dict) and data.get('version') is not None:
+        value = data['version']
+    else:
+        return None
+    try:
+        return int_field(value)
+    except ValueError as e:
+        raise ValueError(f'version: {e}')
+
+def versioned(statement, model, row_id, version):
+    statement = statement.where(model.id == row_id)
+    if version is not None:
+        statement = statement.where(model.version == version)
+    return statement.execution_options(synchronize_session=False)
+
+def conflict_response(model, row_id):
+    db.session.rollback()
+    current = model.query.get_or_404(row_id)
+    return jsonify({
+        'error': f'{model.__name__} was changed by another request; reload and try again',
+        'version': current.version,
+    }), 409
+
+def update_response(model, schema, row_id, check_rows=None):
+    """PUT replaces every field, PATCH only the fields sent, each in one UPDATE statement.
+    ``check_rows`` is a bulk_write check, applied to the fields sent."""
+    data = request.get_json()
+    try:
+        values = validate_row(schema, data, partial=request.method == 'PATCH')
+        version = expected_version(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if not values:
+        return jsonify({'error': 'No fields to update'}), 400
+    errors = check_rows([values], False) if check_rows else {}
+    if errors:
+        return jsonify({'error': errors[0]}), 400
+    statement = versioned(update(model), model, row_id, version).values(**values, version=model.version + 1)
+    try:
+        updated = db.session.execute(statement).rowcount
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': 'email: already exists'}), 409
+    if updated == 0:
+        return conflict_response(model, row_id)
+    db.session.commit()
+    return jsonify(db.session.get(model, row_id).to_dict())
+
+def delete_response(model, row_id):
+    try:
+        version = expected_version()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if db.session.execute(versioned(delete(model), model, row_id, version)).rowcount == 0:
+        return conflict_response(model, row_id)
+    db.session.commit()
+    return '', 204
+
 # API Routes for Students
 @app.route('/api/students', methods=['GET'])
+@cached_response('student')
 def get_students():
-    students = Student.query.all()
-    return jsonify([student.to_dict() for student in students])
+    return list_response(Student, STUDENT_FILTERS)
+
+@app.route('/api/students/changes', methods=['GET'])
+@cached_response('student')
+def get_student_changes():
+    return changes_response(Student)
+
+@app.route('/api/students/<int:student_id>', methods=['GET'])
+@cached_response('student')
+def get_student(student_id):
+    student = Student.query.get_or_404(student_id)
+    return jsonify(student.to_dict())
 
 @app.route('/api/students', methods=['POST'])
 def create_student():
-    data = request.get_json()
-    student = Student(
-        name=data['name'],
-        email=data['email'],
-        phone=data['phone'],
-        grade=data['grade'],
-        date_of_birth=datetime.strptime(data['date_of_birth'], '%Y-%m-%d').date()
-    )
+    try:
+        student = Student(**validate_row(STUDENT_SCHEMA, request.get_json()))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     db.session.add(student)
     db.session.commit()
     return jsonify(student.to_dict()), 201
 
-@app.route('/api/students/<int:student_id>', methods=['PUT'])
+@app.route('/api/students/export', methods=['GET'])
+def export_students():
+    return export_response(Student, STUDENT_FILTERS)
+
+@app.route('/api/students/bulk', methods=['POST'])
+def bulk_write_students():
+    return bulk_write_response(Student, STUDENT_SCHEMA, 'email', check_emails(Student))
+
+@app.route('/api/students/bulk', methods=['DELETE'])
+def bulk_delete_students():
+    return bulk_delete_response(Student)
+
+@app.route('/api/students/<int:student_id>', methods=['PUT', 'PATCH'])
 def update_student(student_id):
-    student = Student.query.get_or_404(student_id)
-    data = request.get_json()
-    student.name = data['name']
-    student.email = data['email']
-    student.phone = data['phone']
-    student.grade = data['grade']
-    student.date_of_birth = datetime.strptime(data['date_of_birth'], '%Y-%m-%d').date()
-    db.session.commit()
-    return jsonify(student.to_dict())
+    return update_response(Student, STUDENT_SCHEMA, student_id)
 
 @app.route('/api/students/<int:student_id>', methods=['DELETE'])
 def delete_student(student_id):
-    student = Student.query.get_or_404(student_id)
-    db.session.delete(student)
-    db.session.commit()
-    return '', 204
+    return delete_response(Student, student_id)
+
+def teachers_with_courses(teacher_ids):
+    """{teacher id: error} for the teachers among ``teacher_ids`` who still teach a course"""
+    query = (select(Course.teacher_id, db.func.count()).where(Course.teacher_id.in_(teacher_ids))
+             .group_by(Course.teacher_id))
+    return {teacher_id: f'Teacher still teaches {courses} course(s); reassign or delete them first'
+            for teacher_id, courses in db.session.execute(query)}
 
 # API Routes for Teachers
 @app.route('/api/teachers', methods=['GET'])
+@cached_response('teacher')
 def get_teachers():
-    teachers = Teacher.query.all()
-    return jsonify([teacher.to_dict() for teacher in teachers])
+    return list_response(Teacher, TEACHER_FILTERS)
+
+@app.route('/api/teachers/changes', methods=['GET'])
+@cached_response('teacher')
+def get_teacher_changes():
+    return changes_response(Teacher)
+
+@app.route('/api/teachers/<int:teacher_id>', methods=['GET'])
+@cached_response('teacher')
+def get_teacher(teacher_id):
+    teacher = Teacher.query.get_or_404(teacher_id)
+    return jsonify(teacher.to_dict())
 
 @app.route('/api/teachers', methods=['POST'])
 def create_teacher():
-    data = request.get_json()
-    teacher = Teacher(
-        name=data['name'],
-        email=data['email'],
-        phone=data['phone'],
-        subject=data['subject'],
-        experience=data['experience']
-    )
+    try:
+        teacher = Teacher(**validate_row(TEACHER_SCHEMA, request.get_json()))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     db.session.add(teacher)
     db.session.commit()
     return jsonify(teacher.to_dict()), 201
 
-@app.route('/api/teachers/<int:teacher_id>', methods=['PUT'])
+@app.route('/api/teachers/export', methods=['GET'])
+def export_teachers():
+    return export_response(Teacher, TEACHER_FILTERS)
+
+@app.route('/api/teachers/bulk', methods=['POST'])
+def bulk_write_teachers():
+    return bulk_write_response(Teacher, TEACHER_SCHEMA, 'email', check_emails(Teacher))
+
+@app.route('/api/teachers/bulk', methods=['DELETE'])
+def bulk_delete_teachers():
+    return bulk_delete_response(Teacher, teachers_with_courses)
+
+@app.route('/api/teachers/<int:teacher_id>', methods=['PUT', 'PATCH'])
 def update_teacher(teacher_id):
-    teacher = Teacher.query.get_or_404(teacher_id)
-    data = request.get_json()
-    teacher.name = data['name']
-    teacher.email = data['email']
-    teacher.phone = data['phone']
-    teacher.subject = data['subject']
-    teacher.experience = data['experience']
-    db.session.commit()
-    return jsonify(teacher.to_dict())
+    return update_response(Teacher, TEACHER_SCHEMA, teacher_id)
 
 @app.route('/api/teachers/<int:teacher_id>', methods=['DELETE'])
 def delete_teacher(teacher_id):
-    teacher = Teacher.query.get_or_404(teacher_id)
-    db.session.delete(teacher)
-    db.session.commit()
-    return '', 204
+    refused = teachers_with_courses([teacher_id])
+    if refused:
+        return jsonify({'error': refused[teacher_id]}), 409
+    return delete_response(Teacher, teacher_id)
 
 # API Routes for Courses
 @app.route('/api/courses', methods=['GET'])
+@cached_response('course')
 def get_courses():
-    courses = Course.query.all()
-    return jsonify([course.to_dict() for course in courses])
+    return list_response(Course, COURSE_FILTERS)
+
+@app.route('/api/courses/changes', methods=['GET'])
+@cached_response('course')
+def get_course_changes():
+    return changes_response(Course)
+
+@app.route('/api/courses/<int:course_id>', methods=['GET'])
+@cached_response('course')
+def get_course(course_id):
+    course = Course.query.get_or_404(course_id)
+    return jsonify(course.to_dict())
 
 @app.route('/api/courses', methods=['POST'])
 def create_course():
-    data = request.get_json()
-    course = Course(
-        name=data['name'],
-        description=data['description'],
-        teacher_id=data['teacher_id'],
-        credits=data['credits']
-    )
+    try:
+        values = validate_row(COURSE_SCHEMA, request.get_json())
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    # /api/stats counts courses per teacher, so a course must belong to one that exists
+    errors = check_course_teachers([values], False)
+    if errors:
+        return jsonify({'error': errors[0]}), 400
+    course = Course(**values)
     db.session.add(course)
     db.session.commit()
     return jsonify(course.to_dict()), 201
 
-@app.route('/api/courses/<int:course_id>', methods=['PUT'])
+@app.route('/api/courses/export', methods=['GET'])
+def export_courses():
+    return export_response(Course, COURSE_FILTERS)
+
+@app.route('/api/courses/bulk', methods=['POST'])
+def bulk_write_courses():
+    return bulk_write_response(Course, COURSE_SCHEMA, 'id', check_course_teachers)
+
+@app.route('/api/courses/bulk', methods=['DELETE'])
+def bulk_delete_courses():
+    return bulk_delete_response(Course)
+
+@app.route('/api/courses/<int:course_id>', methods=['PUT', 'PATCH'])
 def update_course(course_id):
-    course = Course.query.get_or_404(course_id)
-    data = request.get_json()
-    course.name = data['name']
-    course.description = data['description']
-    course.teacher_id = data['teacher_id']
-    course.credits = data['credits']
-    db.session.commit()
-    return jsonify(course.to_dict())
+    return update_response(Course, COURSE_SCHEMA, course_id, check_course_teachers)
 
 @app.route('/api/courses/<int:course_id>', methods=['DELETE'])
 def delete_course(course_id):
-    course = Course.query.get_or_404(course_id)
-    db.session.delete(course)
+    return delete_response(Course, course_id)
+
+# Enrollments: bulk enroll/unenroll, rosters and per-student credit totals
+ENROLLMENT_SCHEMA = {
+    'student_id': int_field,
+    'course_id': int_field,
+}
+
+def read_enrollments():
+    """Validate a bulk enrollment body; returns (rows, errors) with unknown students and courses rejected"""
+    rows, indexes, errors = [], [], []
+    for index, item in enumerate(read_bulk_items()):
+        try:
+            if isinstance(item, Exception):
+                raise item
+            rows.append(validate_row(ENROLLMENT_SCHEMA, item))
+            indexes.append(index)
+        except ValueError as e:
+            errors.append({'row': index, 'error': str(e)})
+    students = existing_values(Student.id, {row['student_id'] for row in rows})
+    courses = existing_values(Course.id, {row['course_id'] for row in rows})
+    valid = []
+    for index, row in zip(indexes, rows):
+        if row['student_id'] not in students:
+            errors.append({'row': index, 'error': 'student_id: no such student'})
+        elif row['course_id'] not in courses:
+            errors.append({'row': index, 'error': 'course_id: no such course'})
+        else:
+            valid.append(row)
+    errors.sort(key=lambda error: error['row'])
+    return valid, errors
+
+@app.route('/api/enrollments', methods=['POST'])
+def enroll_students():
+    try:
+        rows, errors = read_enrollments()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    # already-enrolled pairs are skipped, so retrying a request is harmless
+    statement = sqlite_insert(Enrollment.__table__).on_conflict_do_nothing()
+    enrolled = sum(db.session.execute(statement, batch).rowcount for batch in chunked(rows))
     db.session.commit()
-    return '', 204
+    return jsonify({'enrolled': enrolled, 'errors': errors})
+
+@app.route('/api/enrollments', methods=['DELETE'])
+def unenroll_students():
+    try:
+        rows, errors = read_enrollments()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    table = Enrollment.__table__
+    statement = table.delete().where(table.c.student_id == bindparam('student_id'),
+                                     table.c.course_id == bindparam('course_id'))
+    unenrolled = sum(db.session.execute(statement, batch).rowcount for batch in chunked(rows))
+    db.session.commit()
+    return jsonify({'unenrolled': unenrolled, 'errors': errors})
+
+@app.route('/api/courses/<int:course_id>/students', methods=['GET'])
+@cached_response('roster')
+def get_course_students(course_id):
+    Course.query.get_or_404(course_id)
+    return list_response(
+        Student, STUDENT_FILTERS,
+        scope=lambda query: query.join(Enrollment, Enrollment.student_id == Student.id)
+                                 .where(Enrollment.course_id == course_id),
+        key=Enrollment.student_id,
+    )
+
+@app.route('/api/students/<int:student_id>/courses', methods=['GET'])
+@cached_response('enrolled_courses')
+def get_student_courses(student_id):
+    Student.query.get_or_404(student_id)
+    return list_response(
+        Course, COURSE_FILTERS,
+        scope=lambda query: query.join(Enrollment, Enrollment.course_id == Course.id)
+                                 .where(Enrollment.student_id == student_id),
+        key=Enrollment.course_id,
+    )
+
+@app.route('/api/students/<int:student_id>/credits', methods=['GET'])
+@cached_response('credits')
+def get_student_credits(student_id):
+    Student.query.get_or_404(student_id)
+    return jsonify(read_credits(db.session.connection(), student_id))
+
+# Combined read of every entity for the database viewers
+@app.route('/api/snapshot', methods=['GET'])
+@cached_response('snapshot')
+def get_snapshot():
+    try:
+        entities = request.args.get('entities')
+        entities = entities.split(',') if entities else list(SNAPSHOT_ENTITIES)
+        unknown = [entity for entity in entities if entity not in SNAPSHOT_ENTITIES]
+        if unknown:
+            raise ValueError(f"Unknown entities: {', '.join(unknown)}")
+        limit = request.args.get('limit')
+        limit = parse_int_arg(limit) if limit else None
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    futures = {entity: read_executor.submit(fetch_rows, SNAPSHOT_ENTITIES[entity], limit) for entity in entities}
+    return json_response({entity: future.result() for entity, future in futures.items()})
+
+# Aggregate statistics for the dashboard
+@app.route('/api/stats', methods=['GET'])
+def get_stats():
+    return jsonify(read_stats(db.session.connection()))
+
+@app.route('/api/stats/teachers', methods=['GET'])
+def get_teacher_stats():
+    """Course count and credits per teacher, most courses first, a page of ?limit= at a time;
+    the next page's ?cursor= is sent in X-Next-Cursor"""
+    try:
+        limit = parse_int_arg(request.args.get('limit', '50'))
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+        after = None
+        if request.args.get('cursor'):
+            after = [parse_int_arg(part) for part in request.args['cursor'].split(',')]
+            if len(after) != 2:
+                raise ValueError("cursor must be <courses>,<teacher_id>")
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    rows = read_courses_per_teacher(db.session.connection(), limit, after)
+    response = jsonify(rows)
+    if len(rows) == limit:
+        response.headers['X-Next-Cursor'] = f"{rows[-1]['courses']},{rows[-1]['teacher_id']}"
+    return response
+
+# Materialized reports (reports.py): served from their result tables, and recomputed on read
+# once they have been stale for SCHOOL_REPORT_MAX_STALENESS seconds, or at once if stored empty
+app.config['REPORT_MAX_STALENESS'] = float(os.environ.get('SCHOOL_REPORT_MAX_STALENESS', '60'))
+
+def session_sqlite():
+    """The sqlite3 connection underneath the current session's transaction"""
+    return db.session.connection().connection.driver_connection
+
+@app.route('/api/reports', methods=['GET'])
+def get_reports():
+    return jsonify(list_reports(session_sqlite()))
+
+@app.route('/api/reports/<name>', methods=['GET'])
+def get_report(name):
+    if name not in REPORTS:
+        return jsonify({'error': f"Unknown report: {name}"}), 404
+    if ensure_fresh(session_sqlite(), name, app.config['REPORT_MAX_STALENESS']):
+        db.session.commit()
+    return jsonify(read_report(session_sqlite(), name))
+
+@app.route('/api/reports/<name>/refresh', methods=['POST'])
+def refresh_report_now(name):
+    if name not in REPORTS:
+        return jsonify({'error': f"Unknown report: {name}"}), 404
+    refresh_report(session_sqlite(), name)
+    db.session.commit()
+    return jsonify(read_report(session_sqlite(), name))
+
+# Vectorized breakdowns over an in-memory column store (needs NumPy, see analytics.py)
+analytics_store = analytics.ColumnStore() if analytics.AVAILABLE else None
+
+def analytics_response(run):
+    """Refresh the column store and return ``run(store)`` as JSON"""
+    if analytics_store is None:
+        return jsonify({'error': 'Analytics needs NumPy; install it with pip install numpy'}), 503
+    try:
+        return jsonify(run(analytics_store.refresh(session_sqlite())))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/analytics', methods=['GET'])
+def get_analytics_status():
+    return analytics_response(lambda store: store.status())
+
+@app.route('/api/analytics/<table>/groupby', methods=['GET'])
+def get_analytics_groupby(table):
+    by = analytics.split_names(request.args.get('by'))
+    aggregates = analytics.split_names(request.args.get('agg', 'count'))
+    return analytics_response(lambda store: store.group_by(table, by, aggregates))
+
+@app.route('/api/analytics/<table>/histogram/<field>', methods=['GET'])
+def get_analytics_histogram(table, field):
+    def run(store):
+        width = request.args.get('width')
+        return store.histogram(table, field, analytics.split_names(request.args.get('by')),
+                               parse_int_arg(request.args.get('bins', '10')),
+                               parse_int_arg(width) if width else None)
+    return analytics_response(run)
+
+# Full-text search across students, teachers and courses
+@app.route('/api/search', methods=['GET'])
+def search_entities():
+    text = request.args.get('q', '')
+    kind = request.args.get('type')
+    if kind and kind not in SEARCH_KINDS:
+        return jsonify({'error': f"type must be one of: {', '.join(SEARCH_KINDS)}"}), 400
+    try:
+        limit = parse_int_arg(request.args.get('limit', '20'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    limit = max(1, min(limit, 100))
+    return jsonify(search(db.session.connection(), text, kind, limit))
+
+# Instrumentation endpoints (SCHOOL_PROFILING=1 / SCHOOL_PROFILE_SLOWEST=N)
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    if not app.config['PROFILING']:
+        return jsonify({'error': 'Profiling is disabled; set SCHOOL_PROFILING=1'}), 404
+    return Response(request_metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/metrics/profiles', methods=['GET'])
+def get_profiles():
+    if not app.config['PROFILE_SLOWEST']:
+        return jsonify({'error': 'Profiling is disabled; set SCHOOL_PROFILE_SLOWEST=N'}), 404
+    return jsonify(slowest_profiles.slowest())
+
+# Background jobs: imports, exports and report refreshes run on a bounded pool of worker
+# threads (SCHOOL_JOB_WORKERS per process, 0 to run them only in `flask run-jobs`),
+# claimed from the job table so any server process can pick up any job
+app.config['JOB_WORKERS'] = int(os.environ.get('SCHOOL_JOB_WORKERS', '2'))
+app.config['JOB_DIR'] = os.environ.get('SCHOOL_JOB_DIR', os.path.join(basedir, 'job_files'))
+# a running job whose heartbeat is older than this is assumed dead and run again
+app.config['JOB_STALE_AFTER'] = int(os.environ.get('SCHOOL_JOB_STALE_AFTER', '600'))
+# point-in-time copies read by run_sql.py and view_database.py (see snapshots.py)
+app.config['SNAPSHOT_DIR'] = os.environ.get('SCHOOL_SNAPSHOT_DIR', os.path.join(basedir, 'snapshots'))
+app.config['SNAPSHOT_KEEP'] = int(os.environ.get('SCHOOL_SNAPSHOT_KEEP', '3'))
+IMPORT_CHUNK_SIZE = 5000
+MAX_JOB_ERRORS = 1000
+
+IMPORT_ENTITIES = {
+    'students': lambda: (Student, STUDENT_SCHEMA, 'email', check_emails(Student)),
+    'teachers': lambda: (Teacher, TEACHER_SCHEMA, 'email', check_emails(Teacher)),
+    'courses': lambda: (Course, COURSE_SCHEMA, 'id', check_course_teachers),
+}
+EXPORT_ENTITIES = {
+    'students': (Student, STUDENT_FILTERS),
+    'teachers': (Teacher, TEACHER_FILTERS),
+    'courses': (Course, COURSE_FILTERS),
+}
+
+def job_path(job_id, name):
+    directory = os.path.join(app.config['JOB_DIR'], str(job_id))
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, name)
+
+def import_job(job, params, progress):
+    model, schema, upsert_key, check_rows = IMPORT_ENTITIES[params['entity']]()
+    upsert = params.get('upsert') in ('1', 'true')
+    path = job_path(job.id, params['upload'])
+    # NDJSON items are read a line at a time and JSON arrays an item at a time; the first
+    # pass counts them, so a malformed array fails before any row is written
+    if params['upload'].endswith('.ndjson'):
+        parse = parse_ndjson
+        with open(path, encoding='utf-8') as f:
+            total = sum(1 for line in f if line.strip())
+    else:
+        parse = parse_json_array
+        with open(path, encoding='utf-8') as f:
+            total = sum(1 for _ in parse_json_array(f))
+    progress(0, total=total)
+    written, errors, error_count, processed = 0, [], 0, 0
+    with open(path, encoding='utf-8') as f:
+        items = parse(f)
+        # each chunk is its own transaction, so progress is visible and writers are not blocked for long
+        while True:
+            chunk = list(itertools.islice(items, IMPORT_CHUNK_SIZE))
+            if not chunk:
+                break
+            chunk_written, chunk_errors = bulk_write(model, schema, upsert_key, check_rows, chunk, upsert, processed)
+            written += chunk_written
+            error_count += len(chunk_errors)
+            errors.extend(chunk_errors[:MAX_JOB_ERRORS - len(errors)])
+            processed += len(chunk)
+            progress(processed)
+    return {'written': written, 'error_count': error_count, 'errors': errors}
+
+def export_job(job, params, progress):
+    model, filters = EXPORT_ENTITIES[params['entity']]
+    export_format = params.get('format', 'csv')
+    name = f'{model.__tablename__}.{export_format}'
+    processed = 0
+
+    def on_rows(count):
+        nonlocal processed
+        processed += count
+        progress(processed)
+
+    # the filters are read from request.args, so run with the job's params as the query string
+    with app.test_request_context(query_string=params):
+        query = apply_filters(select(db.func.count()).select_from(model), filters)
+        progress(0, total=db.session.execute(query).scalar())
+        path = job_path(job.id, name)
+        with (open(path, 'w', newline='') if export_format == 'csv' else open(path, 'wb')) as f:
+            for part in export_body(model, filters, export_format, on_rows):
+                f.write(part)
+    return {'file': name, 'rows': processed, 'download': f'/api/jobs/{job.id}/result'}
+
+def refresh_reports_job(job, params, progress):
+    names = [params['report']] if params.get('report') else list(REPORTS)
+    progress(0, total=len(names))
+    for number, name in enumerate(names, 1):
+        refresh_report(session_sqlite(), name)
+        db.session.commit()
+        progress(number)
+    return {'refreshed': names}
+
+def snapshot_job(job, params, progress):
+    progress(0, total=1)
+    path = take_snapshot(db.engine.url.database, app.config['SNAPSHOT_DIR'], app.config['SNAPSHOT_KEEP'])
+    progress(1)
+    return {'snapshot': path, 'bytes': os.path.getsize(path)}
+
+# kind -> (handler(job, params, progress), params it requires -> allowed values or None for any)
+JOB_KINDS = {
+    'import': (import_job, {'entity': IMPORT_ENTITIES}),
+    'export': (export_job, {'entity': EXPORT_ENTITIES}),
+    'refresh_reports': (refresh_reports_job, {}),
+    'snapshot': (snapshot_job, {}),
+}
+
+def claim_job():
+    """Mark the oldest queued (or abandoned) job as running by this process; returns its id or None"""
+    now = datetime.utcnow()
+    abandoned = now - timedelta(seconds=app.config['JOB_STALE_AFTER'])
+    with app.app_context():
+        candidate = (
+            select(Job.id)
+            .where((Job.status == 'queued') | ((Job.status == 'running') & (Job.heartbeat_at < abandoned)))
+            .order_by(Job.id).limit(1).scalar_subquery()
+        )
+        statement = (
+            update(Job).where(Job.id == candidate)
+            .values(status='running', worker=f'{socket.gethostname()}:{os.getpid()}', started_at=now,
+                    heartbeat_at=now, processed=0)
+            .returning(Job.id).execution_options(synchronize_session=False)
+        )
+        job_id = db.session.execute(statement).scalar()
+        db.session.commit()
+        return job_id
+
+def run_job(job_id):
+    with app.app_context():
+        job = db.session.get(Job, job_id)
+        handler, _ = JOB_KINDS[job.kind]
+
+        def progress(processed, total=None):
+            values = {'processed': processed, 'heartbeat_at': datetime.utcnow()}
+            if total is not None:
+                values['total'] = total
+            db.session.execute(update(Job).where(Job.id == job_id).values(**values)
+                               .execution_options(synchronize_session=False))
+            db.session.commit()
+
+        params = json.loads(job.params)
+        values = {'status': 'succeeded', 'error': None}
+        try:
+            values['result'] = json.dumps(handler(job, params, progress))
+        except Exception as e:
+            db.session.rollback()
+            if not isinstance(e, ValueError):
+                app.logger.exception("Job %s failed", job_id)
+            values = {'status': 'failed', 'error': str(e)}
+        db.session.execute(update(Job).where(Job.id == job_id).values(finished_at=datetime.utcnow(), **values)
+                           .execution_options(synchronize_session=False))
+        db.session.commit()
+        # an upload is only needed until its job has run; a job abandoned midway is run again with it
+        if params.get('upload'):
+            try:
+                os.remove(job_path(job_id, params['upload']))
+            except FileNotFoundError:
+                pass
+
+job_pool = JobPool(claim_job, run_job, workers=app.config['JOB_WORKERS'])
+
+@app.before_request
+def _start_job_workers():
+    # started lazily so that CLI commands, the reloader parent and a preforking master run no jobs
+    job_pool.start()
+
+@app.cli.command('prune-jobs')
+@click.option('--days', default=7, show_default=True, help="Keep jobs that finished this recently.")
+def prune_jobs_command(days):
+    """Delete finished jobs older than this, with their files, and files left by jobs never queued."""
+    before = datetime.utcnow() - timedelta(days=days)
+    finished = select(Job.id).where(Job.status.in_(('succeeded', 'failed')), Job.finished_at < before)
+    job_ids = db.session.execute(finished).scalars().all()
+    for chunk in chunked(job_ids):
+        db.session.execute(delete(Job).where(Job.id.in_(chunk)))
+    db.session.commit()
+    orphans = []
+    if os.path.isdir(app.config['JOB_DIR']):
+        # an upload whose request failed leaves a directory with no job row
+        known = set(db.session.execute(select(Job.id)).scalars()) | set(job_ids)
+        cutoff = (datetime.now() - timedelta(days=days)).timestamp()
+        orphans = [int(name) for name in os.listdir(app.config['JOB_DIR'])
+                   if name.isdigit() and int(name) not in known
+                   and os.path.getmtime(os.path.join(app.config['JOB_DIR'], name)) < cutoff]
+    for job_id in job_ids + orphans:
+        shutil.rmtree(os.path.join(app.config['JOB_DIR'], str(job_id)), ignore_errors=True)
+    print(f"Pruned {len(job_ids)} jobs and {len(orphans)} leftover upload directories.")
+
+@app.cli.command('run-jobs')
+@click.option('--workers', default=2, help='Jobs to run at once.')
+def run_jobs_command(workers):
+    """Run background jobs until interrupted."""
+    job_pool.workers = workers
+    job_pool.start()
+    print(f"Running jobs with {workers} workers; press Ctrl+C to stop.")
+    try:
+        job_pool.join()
+    except KeyboardInterrupt:
+        job_pool.stop()
+
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """Queue a job described by the query string; an import's rows are the request body"""
+    params = request.args.to_dict()
+    kind = params.get('kind')
+    if kind not in JOB_KINDS:
+        return jsonify({'error': f"kind must be one of: {', '.join(JOB_KINDS)}"}), 400
+    _, required = JOB_KINDS[kind]
+    for name, allowed in required.items():
+        if params.get(name) not in allowed:
+            return jsonify({'error': f"{name} must be one of: {', '.join(allowed)}"}), 400
+    if kind == 'export':
+        if params.get('format', 'csv') not in EXPORT_FORMATS:
+            return jsonify({'error': 'format must be csv or ndjson'}), 400
+        model, filters = EXPORT_ENTITIES[params['entity']]
+        try:
+            apply_filters(select(model.id), filters)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+    if kind == 'refresh_reports' and params.get('report') and params['report'] not in REPORTS:
+        return jsonify({'error': f"Unknown report: {params['report']}"}), 404
+    upload = None
+    if kind == 'import':
+        params['upload'] = 'upload.ndjson' if request.mimetype in NDJSON_MIMETYPES else 'upload.json'
+        # stream the body to disk before taking any lock; it is parsed by the job, not by this request
+        os.makedirs(app.config['JOB_DIR'], exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=app.config['JOB_DIR'], prefix='upload-', delete=False) as f:
+            shutil.copyfileobj(request.stream, f, 1 << 20)
+            upload = f.name
+
+    try:
+        if not acquire_write_lock():
+            return write_lock_busy_response()
+        job = Job(kind=kind, params=json.dumps(params))
+        db.session.add(job)
+        db.session.flush()
+        if upload:
+            os.replace(upload, job_path(job.id, params['upload']))
+            upload = None
+        db.session.commit()
+    finally:
+        if upload:
+            os.remove(upload)
+    job_pool.notify()
+    response = jsonify(job.to_dict())
+    response.headers['Location'] = f'/api/jobs/{job.id}'
+    return response, 202
+
+@app.route('/api/jobs', methods=['GET'])
+def get_jobs():
+    query = Job.query
+    if request.args.get('status'):
+        query = query.filter(Job.status == request.args['status'])
+    return jsonify([job.to_dict() for job in query.order_by(Job.id.desc()).limit(50)])
+
+@app.route('/api/jobs/<int:job_id>', methods=['GET'])
+def get_job(job_id):
+    return jsonify(Job.query.get_or_404(job_id).to_dict())
+
+@app.route('/api/jobs/<int:job_id>/result', methods=['GET'])
+def get_job_result(job_id):
+    job = Job.query.get_or_404(job_id)
+    result = json.loads(job.result) if job.result else {}
+    if job.status != 'succeeded' or 'file' not in result:
+        return jsonify({'error': 'This job has no result file'}), 404
+    return send_file(job_path(job.id, result['file']), as_attachment=True, download_name=result['file'])
+
+# Live updates: GET /api/events streams each change to students, teachers and courses as a
+# server-sent event (see events.py). Every worker process publishes to its own subscribers.
+app.config['EVENT_QUEUE_SIZE'] = int(os.environ.get('SCHOOL_EVENT_QUEUE_SIZE', '256'))
+app.config['EVENT_POLL_INTERVAL'] = float(os.environ.get('SCHOOL_EVENT_POLL_INTERVAL', '1'))
+# an idle stream sends a comment this often, so a client that has gone away is noticed
+app.config['EVENT_KEEPALIVE'] = float(os.environ.get('SCHOOL_EVENT_KEEPALIVE', '15'))
+
+EVENT_ENTITIES = {'students': Student, 'teachers': Teacher, 'courses': Course}
+
+def sse_frame(event, data, event_id=None):
+    frame = b'event: %s\ndata: %s\n\n' % (event.encode(), data)
+    return b'id: %d\n' % event_id + frame if event_id is not None else frame
+
+def read_events(since, limit):
+    """Events for the change_log entries after revision ``since``; run by the event bus thread"""
+    with app.app_context():
+        connection = db.session.connection()
+        revision = current_revision(connection)
+        if since is None:
+            return [], revision
+        entries = read_all_changes(connection, since, revision, limit)
+        if len(entries) == limit:
+            revision = entries[-1][0]
+        names = {model.__tablename__: name for name, model in EVENT_ENTITIES.items()}
+        rows = {
+            entity: load_rows(EVENT_ENTITIES[name], [row_id for _, e, row_id, op, _ in entries
+                                                     if e == entity and op != 'delete'])
+            for entity, name in names.items()
+        }
+        events = []
+        for entry_revision, entity, row_id, op, changed_at in entries:
+            row = rows[entity].get(row_id)
+            change = {'entity': names[entity], 'revision': entry_revision, 'id': row_id,
+                      'changed_at': changed_at, 'op': 'delete' if row is None else op}
+            if row is not None:
+                change['row'] = row
+            events.append(Event(entity, entry_revision, sse_frame(change['op'], dumps(change), entry_revision)))
+        return events, revision
+
+event_bus = EventBus(read_events, queue_size=app.config['EVENT_QUEUE_SIZE'],
+                     poll_interval=app.config['EVENT_POLL_INTERVAL'])
+
+@app.after_request
+def _publish_events(response):
+    # writes made here are published at once; those of other processes within the poll interval
+    if request.method in WRITE_METHODS and response.status_code < 400:
+        event_bus.notify()
+    return response
+
+@app.route('/api/events', methods=['GET'])
+def stream_events():
+    """Stream changes as server-sent events, limited to ?entities=students,teachers,courses.
+
+    The stream opens with a ``ready`` event carrying the current revision, then
+    sends a ``create``, ``update`` or ``delete`` event for each later change,
+    shaped like a /changes entry plus its entity. A client that falls too far
+    behind gets a ``dropped`` event and the stream ends; on reconnecting it
+    should catch up from its last revision through /api/<entity>/changes.
+    """
+    entities = None
+    if request.args.get('entities'):
+        names = request.args['entities'].split(',')
+        if not set(names) <= set(EVENT_ENTITIES):
+            return jsonify({'error': f"entities must be among: {', '.join(EVENT_ENTITIES)}"}), 400
+        entities = {EVENT_ENTITIES[name].__tablename__ for name in names}
+    subscription = event_bus.subscribe(entities)
+    if subscription is None:
+        return jsonify({'error': 'Server is shutting down'}), 503
+    keepalive = app.config['EVENT_KEEPALIVE']
+
+    def stream():
+        try:
+            yield sse_frame('ready', dumps({'revision': subscription.revision}))
+            while True:
+                event = subscription.get(keepalive)
+                if event is not None:
+                    yield event.frame
+                elif subscription.dropped:
+                    yield sse_frame('dropped', dumps({'error': 'Too far behind; catch up through /changes'}))
+                    return
+                elif subscription.closed:
+                    return
+                else:
+                    yield b': keep-alive\n\n'
+        finally:
+            event_bus.unsubscribe(subscription)
+
+    response = Response(stream(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # stop proxies such as nginx from buffering the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
 
 # Health check endpoint
 @app.route('/api/health', methods=['GET'])
 def health_check():
     return jsonify({'status': 'healthy', 'message': 'School Management API is running'})
 
+# Readiness probe: unlike /api/health, reports ready only once startup warm-up has finished
+app_ready = threading.Event()
+
+@app.route('/api/ready', methods=['GET'])
+def readiness_check():
+    if not app_ready.is_set():
+        return jsonify({'status': 'starting'}), 503
+    return jsonify({'status': 'ready'})
+
 if __name__ == '__main__':
     with app.app_context():
-        db.create_all()
+        apply_migrations()
+    app_ready.set()
     app.run(debug=True, port=5000)
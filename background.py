@@ -0,0 +1,65 @@
+"""
+Per-process background threads for the job queue (jobs.py) and the event bus
+(events.py).
+
+serve.py forks its worker processes, and threads do not survive fork, so
+threads started in the parent are not running in a child. A
+BackgroundThreads object remembers the process that started it: running is
+False in any other process, and start() starts fresh threads there.
+"""
+
+import os
+import threading
+
+
+class BackgroundThreads:
+    name = 'school-background'
+
+    def __init__(self, workers=1):
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        self._pid = None
+
+    @property
+    def running(self):
+        return self._pid == os.getpid() and any(thread.is_alive() for thread in self._threads)
+
+    def start(self):
+        """Start the threads in this process, if they are not running already"""
+        if self.workers <= 0 or self.running:
+            return
+        with self._lock:
+            if self.running or not self._starting():
+                return
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._threads = [
+                threading.Thread(target=self._loop, name=f'{self.name}-{number}', daemon=True)
+                for number in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+
+    def notify(self):
+        self._wakeup.set()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def join(self):
+        for thread in self._threads:
+            thread.join()
+
+    def _starting(self):
+        """Called with the lock held before the threads start; reset any state left from another
+        process here, or return False not to start them"""
+        return True
+
+    def _loop(self):
+        raise NotImplementedError
@@ -0,0 +1,381 @@
+"""
+Load-testing harness for the Flask API.
+
+For each scale it builds (or reuses) a synthetic database with that many
+students, plus one teacher per 20 students and three courses per teacher,
+then replays a weighted mix of list, detail, search, stats, create, update
+and delete requests from several threads, either through the Flask test
+client or over HTTP against a local threaded WSGI server.
+
+Results are written as JSON: per scale and per operation the request count,
+errors (5xx), rejections (4xx, e.g. deleting a teacher who still teaches),
+throughput, latency percentiles and average SQL statements per request (from
+the X-Query-Count header). Only successful requests count towards requests,
+throughput and latency. Pass --baseline with an earlier
+results file to fail when throughput or p99 latency regress.
+
+    python benchmarks/load.py --scales 10000 100000 --seconds 30 --threads 8 --output load.json
+    python benchmarks/load.py --scales 10000 --server --baseline load.json --tolerance 0.2
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DATA_DIR = os.path.join(ROOT, 'benchmarks', 'data')
+
+GRADES = ['9th', '10th', '11th', '12th']
+SUBJECTS = ['Mathematics', 'Physics', 'Chemistry', 'Biology', 'English', 'History', 'Geography', 'Art']
+FIRST_NAMES = ['John', 'Maria', 'Wei', 'Aisha', 'Carlos', 'Priya', 'Olga', 'Kwame', 'Yuki', 'Liam']
+LAST_NAMES = ['Smith', 'Garcia', 'Chen', 'Khan', 'Silva', 'Patel', 'Ivanova', 'Mensah', 'Sato', 'Brown']
+
+# operation -> (weight, entities it applies to)
+DEFAULT_MIX = {
+    'list': 30,
+    'detail': 25,
+    'search': 10,
+    'stats': 5,
+    'create': 10,
+    'update': 15,
+    'delete': 5,
+}
+ENTITIES = ['students', 'teachers', 'courses']
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def person_name(rng):
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+# Data generation
+
+def generate_database(path, students, seed=42):
+    """Create ``path`` with the app's schema and fill it with synthetic rows"""
+    env = dict(os.environ, SCHOOL_DATABASE_URI=f'sqlite:///{path}')
+    subprocess.run(
+        [sys.executable, '-c', 'from app import app, apply_migrations\n'
+                               'with app.app_context(): apply_migrations()'],
+        cwd=ROOT, env=env, check=True,
+    )
+    rng = random.Random(seed)
+    teachers = max(1, students // 20)
+    courses = teachers * 3
+    now = datetime.utcnow()
+
+    def created():
+        return (now - timedelta(seconds=rng.randint(0, 365 * 86400))).isoformat(sep=' ', timespec='microseconds')
+
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("PRAGMA journal_mode=MEMORY")
+    with conn:
+        conn.executemany(
+            "INSERT INTO teacher (id, name, email, phone, subject, experience, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            ((i, person_name(rng), f"teacher{i}@school.test", '555-0100', rng.choice(SUBJECTS),
+              rng.randint(0, 35), created()) for i in range(1, teachers + 1)),
+        )
+        conn.executemany(
+            "INSERT INTO course (id, name, description, teacher_id, credits, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+            ((i, f"{rng.choice(SUBJECTS)} {i}", f"Course number {i}", rng.randint(1, teachers),
+              rng.randint(1, 5), created()) for i in range(1, courses + 1)),
+        )
+        conn.executemany(
+            "INSERT INTO student (id, name, email, phone, grade, date_of_birth, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            ((i, person_name(rng), f"student{i}@school.test", '555-0101', rng.choice(GRADES),
+              (date(2005, 1, 1) + timedelta(days=rng.randint(0, 5 * 365))).isoformat(), created())
+             for i in range(1, students + 1)),
+        )
+    conn.execute("ANALYZE")
+    conn.close()
+
+
+def database_for_scale(data_dir, students, rebuild=False):
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f'school_{students}.db')
+    if rebuild or not os.path.exists(path):
+        if os.path.exists(path):
+            os.remove(path)
+        started = time.perf_counter()
+        generate_database(path, students)
+        print(f"Generated {path} in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    return path
+
+
+# Workload
+
+class Workload:
+    def __init__(self, mix, counts, rng, thread_number):
+        self.operations = list(mix)
+        self.weights = [mix[name] for name in self.operations]
+        self.counts = counts
+        self.rng = rng
+        self.thread_number = thread_number
+        self.sequence = 0
+
+    def body(self, entity):
+        self.sequence += 1
+        rng = self.rng
+        email = f"load{self.thread_number}-{self.sequence}-{rng.random():.6f}@school.test"
+        if entity == 'students':
+            return {'name': person_name(rng), 'email': email, 'phone': '555-0199',
+                    'grade': rng.choice(GRADES), 'date_of_birth': '2008-05-05'}
+        if entity == 'teachers':
+            return {'name': person_name(rng), 'email': email, 'phone': '555-0199',
+                    'subject': rng.choice(SUBJECTS), 'experience': rng.randint(0, 35)}
+        return {'name': f"{rng.choice(SUBJECTS)} Seminar", 'description': 'Load test course',
+                'teacher_id': rng.randint(1, self.counts['teachers']), 'credits': rng.randint(1, 5)}
+
+    def next_request(self):
+        """Return (operation name, method, path, JSON body or None)"""
+        rng = self.rng
+        operation = rng.choices(self.operations, self.weights)[0]
+        entity = rng.choice(ENTITIES)
+        row_id = rng.randint(1, self.counts[entity])
+        if operation == 'list':
+            return f'list_{entity}', 'GET', f'/api/{entity}?limit=50&cursor={rng.randint(0, self.counts[entity])}', None
+        if operation == 'detail':
+            return f'detail_{entity}', 'GET', f'/api/{entity}/{row_id}', None
+        if operation == 'search':
+            return 'search', 'GET', f'/api/search?q={rng.choice(FIRST_NAMES)[:rng.randint(2, 4)]}', None
+        if operation == 'stats':
+            return 'stats', 'GET', '/api/stats', None
+        if operation == 'create':
+            return f'create_{entity}', 'POST', f'/api/{entity}', self.body(entity)
+        if operation == 'update':
+            return f'update_{entity}', 'PUT', f'/api/{entity}/{row_id}', self.body(entity)
+        return f'delete_{entity}', 'DELETE', f'/api/{entity}/{row_id}', None
+
+
+class TestClientTransport:
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, body):
+        response = self.client.open(path, method=method, json=body)
+        return response.status_code, int(response.headers.get('X-Query-Count', 0))
+
+
+class HTTPTransport:
+    def __init__(self, port):
+        self.connection = http.client.HTTPConnection('127.0.0.1', port)
+
+    def request(self, method, path, body):
+        headers = {}
+        payload = None
+        if body is not None:
+            payload = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        self.connection.request(method, path, payload, headers)
+        response = self.connection.getresponse()
+        response.read()
+        return response.status, int(response.getheader('X-Query-Count', 0))
+
+
+def run_scale(args, mix):
+    """Replay the workload against the database in SCHOOL_DATABASE_URI; print results as JSON"""
+    sys.path.insert(0, ROOT)
+    from app import app, db, Course, Student, Teacher
+
+    app.config['QUERY_COUNT_HEADER'] = True
+    with app.app_context():
+        counts = {
+            'students': db.session.query(db.func.max(Student.id)).scalar() or 1,
+            'teachers': db.session.query(db.func.max(Teacher.id)).scalar() or 1,
+            'courses': db.session.query(db.func.max(Course.id)).scalar() or 1,
+        }
+
+    server = None
+    if args.server:
+        from werkzeug.serving import make_server
+        server = make_server('127.0.0.1', 0, app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    samples = {}
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + args.seconds
+
+    def worker(number):
+        workload = Workload(mix, counts, random.Random(args.seed + number), number)
+        transport = HTTPTransport(server.server_port) if server else TestClientTransport(app)
+        local = {}
+        while time.perf_counter() < stop_at:
+            name, method, path, body = workload.next_request()
+            started = time.perf_counter()
+            try:
+                status, statements = transport.request(method, path, body)
+            except Exception:
+                status, statements = 599, 0
+            elapsed = time.perf_counter() - started
+            entry = local.setdefault(name, {'latencies': [], 'errors': 0, 'rejected': 0, 'statements': 0})
+            if status >= 500:
+                entry['errors'] += 1
+            elif status >= 400:
+                entry['rejected'] += 1
+            else:
+                entry['latencies'].append(elapsed)
+                entry['statements'] += statements
+        with lock:
+            for name, entry in local.items():
+                merged = samples.setdefault(name, {'latencies': [], 'errors': 0, 'rejected': 0, 'statements': 0})
+                merged['latencies'] += entry['latencies']
+                merged['errors'] += entry['errors']
+                merged['rejected'] += entry['rejected']
+                merged['statements'] += entry['statements']
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if server:
+        server.shutdown()
+
+    operations = {}
+    for name, entry in sorted(samples.items()):
+        latencies = entry['latencies']
+        operations[name] = {
+            'requests': len(latencies),
+            'errors': entry['errors'],
+            'rejected': entry['rejected'],
+            'throughput': round(len(latencies) / args.seconds, 1),
+            'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+            'p90_ms': round(percentile(latencies, 0.90) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+            'max_ms': round(max(latencies, default=0) * 1000, 2),
+            'sql_per_request': round(entry['statements'] / len(latencies), 2) if latencies else 0,
+        }
+    total = sum(entry['requests'] for entry in operations.values())
+    print(json.dumps({
+        'throughput': round(total / args.seconds, 1),
+        'errors': sum(entry['errors'] for entry in operations.values()),
+        'rejected': sum(entry['rejected'] for entry in operations.values()),
+        'operations': operations,
+    }))
+
+
+# Regression check
+
+def compare(results, baseline, tolerance):
+    """Return descriptions of operations whose throughput or p99 regressed beyond ``tolerance``"""
+    regressions = []
+    for scale, current in results['scales'].items():
+        previous = baseline.get('scales', {}).get(scale)
+        if not previous:
+            continue
+        for name, now in current['operations'].items():
+            before = previous['operations'].get(name)
+            if not before or not before['requests'] or not now['requests']:
+                continue
+            if now['throughput'] < before['throughput'] * (1 - tolerance):
+                regressions.append(f"{scale} {name}: throughput {before['throughput']} -> {now['throughput']}")
+            if now['p99_ms'] > before['p99_ms'] * (1 + tolerance) and now['p99_ms'] - before['p99_ms'] > 1:
+                regressions.append(f"{scale} {name}: p99 {before['p99_ms']}ms -> {now['p99_ms']}ms")
+    return regressions
+
+
+def parse_mix(text):
+    mix = dict(DEFAULT_MIX)
+    if text:
+        for part in text.split(','):
+            name, _, weight = part.partition('=')
+            if name not in DEFAULT_MIX:
+                raise SystemExit(f"Unknown operation in --mix: {name}")
+            mix[name] = float(weight)
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', type=int, nargs='+', default=[10000, 100000],
+                        help='students per generated database (e.g. 10000 100000 1000000)')
+    parser.add_argument('--seconds', type=float, default=20)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--mix', help='operation weights, e.g. list=40,detail=30,create=5 (default: %s)'
+                        % ','.join(f'{k}={v}' for k, v in DEFAULT_MIX.items()))
+    parser.add_argument('--server', action='store_true', help='send requests over HTTP to a local WSGI server')
+    parser.add_argument('--profile', default='development', help='SCHOOL_DB_PROFILE for the run')
+    parser.add_argument('--no-cache', action='store_true', help='disable the response cache')
+    parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR, help='where generated databases are kept')
+    parser.add_argument('--rebuild', action='store_true', help='regenerate databases even if they exist')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='write JSON results to this file (default: stdout)')
+    parser.add_argument('--baseline', help='earlier results file to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed regression ratio (default: 0.2)')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    mix = parse_mix(args.mix)
+
+    if args.worker:
+        run_scale(args, mix)
+        return
+
+    results = {
+        'started_at': datetime.utcnow().isoformat(timespec='seconds'),
+        'settings': {'seconds': args.seconds, 'threads': args.threads, 'mix': mix,
+                     'server': args.server, 'profile': args.profile, 'cache': not args.no_cache},
+        'scales': {},
+    }
+    for students in args.scales:
+        source = database_for_scale(args.data_dir, students, args.rebuild)
+        # run against a copy so writes don't change the database the next run starts from
+        work_copy = source + '.run'
+        conn = sqlite3.connect(source)
+        target = sqlite3.connect(work_copy)
+        conn.backup(target)
+        target.close()
+        conn.close()
+        env = dict(os.environ, SCHOOL_DATABASE_URI=f'sqlite:///{work_copy}', SCHOOL_DB_PROFILE=args.profile)
+        if args.no_cache:
+            env['SCHOOL_RESPONSE_CACHE_SIZE'] = '0'
+        command = [sys.executable, __file__, '--worker', '--seconds', str(args.seconds),
+                   '--threads', str(args.threads), '--seed', str(args.seed)]
+        if args.mix:
+            command += ['--mix', args.mix]
+        if args.server:
+            command.append('--server')
+        try:
+            output = subprocess.run(command, env=env, check=True, capture_output=True, text=True).stdout
+        finally:
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(work_copy + suffix):
+                    os.remove(work_copy + suffix)
+        results['scales'][str(students)] = json.loads(output.strip().splitlines()[-1])
+        scale = results['scales'][str(students)]
+        print(f"{students} students: {scale['throughput']} req/s, {scale['errors']} errors, "
+              f"{scale['rejected']} rejected", file=sys.stderr)
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get('settings') != results['settings']:
+            print("WARNING: baseline was recorded with different settings", file=sys.stderr)
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""
+Microbenchmark: ORM to_dict() + jsonify versus the column-tuple serialization path.
+
+For each size, seeds a fresh database with that many students (and courses,
+each pointing at one of 100 teachers), then times serializing the whole table
+both ways.
+
+    python benchmarks/serialization.py --sizes 1000 10000 100000 --repeat 3
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def best_of(repeat, function):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def run_worker(args):
+    sys.path.insert(0, ROOT)
+    from flask import jsonify
+    from app import Course, Student, Teacher, app, db, json_response, row_columns, row_select
+    from serialization import JSON_BACKEND, rows_to_dicts
+
+    size = args.size
+    with app.app_context():
+        db.create_all()
+        now = datetime.utcnow()
+        db.session.execute(Teacher.__table__.insert(), [
+            {'name': f'Teacher {i}', 'email': f't{i}@school.test', 'phone': '555-0100',
+             'subject': 'Mathematics', 'experience': i % 30, 'created_at': now}
+            for i in range(100)
+        ])
+        db.session.execute(Student.__table__.insert(), [
+            {'name': f'Student {i}', 'email': f's{i}@school.test', 'phone': '555-0100',
+             'grade': f'{9 + i % 4}th', 'date_of_birth': date(2008, 1 + i % 12, 1 + i % 28), 'created_at': now}
+            for i in range(size)
+        ])
+        db.session.execute(Course.__table__.insert(), [
+            {'name': f'Course {i}', 'description': 'A course', 'teacher_id': 1 + i % 100,
+             'credits': 1 + i % 5, 'created_at': now}
+            for i in range(size)
+        ])
+        db.session.commit()
+
+    results = []
+    for model in (Student, Course):
+        def orm_path():
+            with app.test_request_context():
+                db.session.expunge_all()
+                jsonify([row.to_dict() for row in model.query.all()]).get_data()
+
+        def column_path():
+            with app.test_request_context():
+                names = list(row_columns(model))
+                rows = db.session.execute(row_select(model, names).order_by(model.id)).all()
+                json_response(rows_to_dicts(names, rows)).get_data()
+
+        with app.app_context():
+            orm = best_of(args.repeat, orm_path)
+            columns = best_of(args.repeat, column_path)
+        results.append({
+            'entity': model.__tablename__,
+            'rows': size,
+            'json_backend': JSON_BACKEND,
+            'to_dict_ms': round(orm * 1000, 1),
+            'columns_ms': round(columns * 1000, 1),
+            'speedup': round(orm / columns, 2),
+        })
+    print(json.dumps(results))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', action='store_true', help='print machine-readable results only')
+    parser.add_argument('--size', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.size:
+        run_worker(args)
+        return
+
+    results = []
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            env = dict(os.environ, SCHOOL_DATABASE_URI=f"sqlite:///{os.path.join(directory, 'bench.db')}")
+            output = subprocess.run(
+                [sys.executable, __file__, '--size', str(size), '--repeat', str(args.repeat)],
+                env=env, check=True, capture_output=True, text=True,
+            ).stdout
+            results.extend(json.loads(output.strip().splitlines()[-1]))
+
+    if args.json:
+        print(json.dumps(results))
+        return
+    columns = list(results[0])
+    print(" | ".join(columns))
+    print("-" * len(" | ".join(columns)))
+    for result in results:
+        print(" | ".join(str(result[column]) for column in columns))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""
+Mixed read/write throughput benchmark for the SQLite database profiles.
+
+Runs the same concurrent workload against a fresh database once with the
+development profile (SQLite defaults) and once with SCHOOL_DB_PROFILE=production,
+then prints throughput, latency percentiles and error counts for each.
+
+    python benchmarks/sqlite_profile.py --threads 16 --seconds 10 --write-ratio 0.2
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROFILES = ['development', 'production']
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run_worker(args):
+    """Run the workload in this process against the database named by the environment"""
+    sys.path.insert(0, ROOT)
+    from app import app, db
+
+    with app.app_context():
+        db.create_all()
+    client = app.test_client()
+    client.post('/api/students/bulk', json=[
+        {'name': f'Student {i}', 'email': f'seed{i}@school.test', 'phone': '555-0100',
+         'grade': f'{9 + i % 4}th', 'date_of_birth': '2008-01-01'}
+        for i in range(args.rows)
+    ])
+
+    stop_at = time.perf_counter() + args.seconds
+    results = {'reads': [], 'writes': [], 'errors': 0}
+    lock = threading.Lock()
+
+    def worker(number):
+        rng = random.Random(number)
+        thread_client = app.test_client()
+        reads, writes, errors, sequence = [], [], 0, 0
+        while time.perf_counter() < stop_at:
+            started = time.perf_counter()
+            if rng.random() < args.write_ratio:
+                sequence += 1
+                if rng.random() < 0.5:
+                    response = thread_client.post('/api/students', json={
+                        'name': 'New Student', 'email': f'w{number}-{sequence}@school.test',
+                        'phone': '555-0101', 'grade': '10th', 'date_of_birth': '2008-02-02'})
+                else:
+                    response = thread_client.put(f'/api/students/{rng.randint(1, args.rows)}', json={
+                        'name': 'Edited Student', 'email': f'e{number}-{sequence}@school.test',
+                        'phone': '555-0102', 'grade': '11th', 'date_of_birth': '2008-03-03'})
+                bucket = writes
+            else:
+                response = thread_client.get(f'/api/students?limit=50&cursor={rng.randint(0, args.rows)}')
+                bucket = reads
+            if response.status_code >= 500:
+                errors += 1
+            else:
+                bucket.append(time.perf_counter() - started)
+        with lock:
+            results['reads'].extend(reads)
+            results['writes'].extend(writes)
+            results['errors'] += errors
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    completed = len(results['reads']) + len(results['writes'])
+    print(json.dumps({
+        'profile': app.config['DB_PROFILE'],
+        'ops_per_second': round(completed / args.seconds, 1),
+        'reads': len(results['reads']),
+        'writes': len(results['writes']),
+        'errors': results['errors'],
+        'read_p50_ms': round(percentile(results['reads'], 0.50) * 1000, 2),
+        'read_p99_ms': round(percentile(results['reads'], 0.99) * 1000, 2),
+        'write_p50_ms': round(percentile(results['writes'], 0.50) * 1000, 2),
+        'write_p99_ms': round(percentile(results['writes'], 0.99) * 1000, 2),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--write-ratio', type=float, default=0.2)
+    parser.add_argument('--rows', type=int, default=5000, help='students seeded before the run')
+    parser.add_argument('--json', action='store_true', help='print machine-readable results only')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args)
+        return
+
+    results = []
+    for profile in PROFILES:
+        with tempfile.TemporaryDirectory() as directory:
+            env = dict(os.environ,
+                       SCHOOL_DB_PROFILE=profile,
+                       SCHOOL_DATABASE_URI=f"sqlite:///{os.path.join(directory, 'bench.db')}")
+            output = subprocess.run(
+                [sys.executable, __file__, '--worker', '--threads', str(args.threads),
+                 '--seconds', str(args.seconds), '--write-ratio', str(args.write_ratio),
+                 '--rows', str(args.rows)],
+                env=env, check=True, capture_output=True, text=True,
+            ).stdout
+            results.append(json.loads(output.strip().splitlines()[-1]))
+
+    if args.json:
+        print(json.dumps(results))
+        return
+    columns = list(results[0])
+    print(" | ".join(columns))
+    print("-" * len(" | ".join(columns)))
+    for result in results:
+        print(" | ".join(str(result[column]) for column in columns))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""
+Change tracking behind the /api/<entity>/changes delta sync endpoints.
+
+Triggers record every insert, update and delete of a student, teacher or course
+in change_log, which holds one entry per row: a change replaces the row's
+entry with a new one, numbered from a single revision sequence shared by all
+three tables. A deleted row's entry stays behind as a tombstone. A client
+that remembers the highest revision it has seen asks for the entries after
+it, which reads only what changed since, however large the tables are.
+
+Each entry also says whether the row was created, updated or deleted, for
+the /api/events stream (see events.py). Renaming a teacher changes the
+teacher_name of their courses, so it records a change for each of those
+courses too. Tombstones older than a retention
+period can be pruned; change_pruned then remembers the newest revision
+removed, so a client that synced before it knows to reload in full.
+"""
+
+from triggers import NOW, create_triggers
+
+
+CHANGE_TABLES = [
+    # AUTOINCREMENT: revisions are never reused, even after the newest entry is replaced
+    """CREATE TABLE IF NOT EXISTS change_log (
+        revision INTEGER PRIMARY KEY AUTOINCREMENT,
+        entity VARCHAR(20) NOT NULL,
+        row_id INTEGER NOT NULL,
+        deleted BOOLEAN NOT NULL DEFAULT 0,
+        op VARCHAR(6) NOT NULL DEFAULT 'update',
+        changed_at VARCHAR(30) NOT NULL,
+        UNIQUE (entity, row_id)
+    )""",
+    "CREATE INDEX IF NOT EXISTS ix_change_log_entity_revision ON change_log (entity, revision)",
+    """CREATE TABLE IF NOT EXISTS change_pruned (
+        entity VARCHAR(20) PRIMARY KEY,
+        revision INTEGER NOT NULL
+    )""",
+]
+
+TRACKED = ('student', 'teacher', 'course')
+
+
+# An explicit DELETE and INSERT rather than INSERT OR REPLACE: the conflict clause of the
+# statement that fires a trigger overrides the trigger's own, so OR REPLACE would fail in
+# triggers fired by the bulk endpoints' INSERT ... ON CONFLICT DO UPDATE
+def _record(entity, row_id, op, condition='1'):
+    return f"""
+        DELETE FROM change_log WHERE entity = '{entity}' AND row_id = {row_id} AND {condition};
+        INSERT INTO change_log (entity, row_id, deleted, op, changed_at)
+            SELECT '{entity}', {row_id}, {int(op == 'delete')}, '{op}', {NOW} WHERE {condition};"""
+
+
+# (trigger name, timing/event, body)
+_TRIGGERS = [
+    trigger
+    for table in TRACKED
+    for trigger in [
+        (f'change_{table}_insert', f'AFTER INSERT ON {table}', _record(table, 'NEW.id', 'create')),
+        (f'change_{table}_update', f'AFTER UPDATE ON {table}',
+         _record(table, 'OLD.id', 'delete', 'OLD.id IS NOT NEW.id') + _record(table, 'NEW.id', 'update')),
+        (f'change_{table}_delete', f'AFTER DELETE ON {table}', _record(table, 'OLD.id', 'delete')),
+    ]
+] + [
+    ('change_teacher_name_courses', 'AFTER UPDATE OF name ON teacher WHEN OLD.name IS NOT NEW.name', f"""
+        DELETE FROM change_log WHERE entity = 'course' AND row_id IN (SELECT id FROM course WHERE teacher_id = NEW.id);
+        INSERT INTO change_log (entity, row_id, deleted, op, changed_at)
+            SELECT 'course', id, 0, 'update', {NOW} FROM course WHERE teacher_id = NEW.id;"""),
+]
+
+TRIGGERS = create_triggers(_TRIGGERS)
+TRIGGER_NAMES = [name for name, _, _ in _TRIGGERS]
+
+REBUILD = ["DELETE FROM change_log"] + [
+    f"""INSERT INTO change_log (entity, row_id, deleted, op, changed_at)
+        SELECT '{table}', id, 0, 'create', {NOW} FROM {table} ORDER BY id"""
+    for table in TRACKED
+]
+
+
+def install_changes(connection, rebuild=False):
+    """Create change_log and its triggers on a SQLAlchemy connection; with rebuild, log every existing row"""
+    for statement in CHANGE_TABLES + TRIGGERS:
+        connection.exec_driver_sql(statement)
+    if rebuild:
+        for statement in REBUILD:
+            connection.exec_driver_sql(statement)
+
+
+def current_revision(connection):
+    row = connection.exec_driver_sql("SELECT seq FROM sqlite_sequence WHERE name = 'change_log'").first()
+    return row[0] if row else 0
+
+
+def pruned_revision(connection, entity):
+    row = connection.exec_driver_sql("SELECT revision FROM change_pruned WHERE entity = ?", (entity,)).first()
+    return row[0] if row else 0
+
+
+def read_changes(connection, entity, since, until, limit):
+    """Entries of ``entity`` with since < revision <= until, oldest first:
+    [(revision, row_id, deleted, changed_at)]"""
+    return connection.exec_driver_sql(
+        "SELECT revision, row_id, deleted, changed_at FROM change_log "
+        "WHERE entity = ? AND revision > ? AND revision <= ? ORDER BY revision LIMIT ?",
+        (entity, since, until, limit)).all()
+
+
+def read_all_changes(connection, since, until, limit):
+    """Entries of every entity with since < revision <= until, oldest first:
+    [(revision, entity, row_id, op, changed_at)]"""
+    return connection.exec_driver_sql(
+        "SELECT revision, entity, row_id, op, changed_at FROM change_log "
+        "WHERE revision > ? AND revision <= ? ORDER BY revision LIMIT ?",
+        (since, until, limit)).all()
+
+
+def prune_tombstones(connection, before):
+    """Delete tombstones changed before the ISO timestamp ``before``; returns how many were removed"""
+    connection.exec_driver_sql(
+        "INSERT INTO change_pruned (entity, revision) "
+        "SELECT entity, MAX(revision) FROM change_log WHERE deleted AND changed_at < ? GROUP BY entity "
+        "ON CONFLICT(entity) DO UPDATE SET revision = MAX(revision, excluded.revision)", (before,))
+    return connection.exec_driver_sql(
+        "DELETE FROM change_log WHERE deleted AND changed_at < ?", (before,)).rowcount
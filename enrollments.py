@@ -0,0 +1,70 @@
+"""
+Triggers and summary table for student enrollments.
+
+Per-student totals (number of courses and credits) live in student_credits,
+kept up to date by triggers on enrollment and course, so a student's credit
+load is a primary-key lookup however many enrollments there are. Deleting a
+student or a course removes their enrollments, which keeps the totals right.
+Enrollment rows are only ever inserted and deleted, never updated.
+"""
+
+from triggers import create_triggers
+
+
+SUMMARY_TABLE = """CREATE TABLE IF NOT EXISTS student_credits (
+    student_id INTEGER PRIMARY KEY,
+    courses INTEGER NOT NULL DEFAULT 0,
+    credits INTEGER NOT NULL DEFAULT 0
+)"""
+
+COURSE_CREDITS = "COALESCE((SELECT credits FROM course WHERE id = {}.course_id), 0)"
+
+# (trigger name, timing/event, body)
+_TRIGGERS = [
+    ('enrollment_insert', 'AFTER INSERT ON enrollment', f"""
+        INSERT INTO student_credits (student_id, courses, credits)
+            VALUES (NEW.student_id, 1, {COURSE_CREDITS.format('NEW')})
+            ON CONFLICT(student_id) DO UPDATE SET courses = courses + 1, credits = credits + excluded.credits;"""),
+    ('enrollment_delete', 'AFTER DELETE ON enrollment', f"""
+        UPDATE student_credits SET courses = courses - 1, credits = credits - {COURSE_CREDITS.format('OLD')}
+            WHERE student_id = OLD.student_id;"""),
+    ('enrollment_course_credits', 'AFTER UPDATE OF credits ON course WHEN OLD.credits IS NOT NEW.credits', """
+        UPDATE student_credits SET credits = credits + NEW.credits - OLD.credits
+            WHERE student_id IN (SELECT student_id FROM enrollment WHERE course_id = NEW.id);"""),
+    # BEFORE: the course row must still exist while enrollment_delete reads its credits
+    ('enrollment_course_delete', 'BEFORE DELETE ON course', """
+        DELETE FROM enrollment WHERE course_id = OLD.id;"""),
+    ('enrollment_student_delete', 'AFTER DELETE ON student', """
+        DELETE FROM enrollment WHERE student_id = OLD.id;
+        DELETE FROM student_credits WHERE student_id = OLD.id;"""),
+]
+
+TRIGGERS = create_triggers(_TRIGGERS)
+
+REBUILD = [
+    "DELETE FROM student_credits",
+    """INSERT INTO student_credits (student_id, courses, credits)
+        SELECT e.student_id, COUNT(*), COALESCE(SUM(c.credits), 0)
+        FROM enrollment e LEFT JOIN course c ON c.id = e.course_id GROUP BY e.student_id""",
+]
+
+
+def install_enrollments(connection, rebuild=False):
+    """Create the student_credits table and the enrollment triggers on a SQLAlchemy connection"""
+    for statement in [SUMMARY_TABLE] + TRIGGERS:
+        connection.exec_driver_sql(statement)
+    if rebuild:
+        rebuild_credits(connection)
+
+
+def rebuild_credits(connection):
+    """Recompute student_credits from the enrollment and course tables"""
+    for statement in REBUILD:
+        connection.exec_driver_sql(statement)
+
+
+def read_credits(connection, student_id):
+    row = connection.exec_driver_sql(
+        "SELECT courses, credits FROM student_credits WHERE student_id = ?", (student_id,)).first()
+    courses, credits = row if row else (0, 0)
+    return {'student_id': student_id, 'courses': courses, 'credits': credits}
@@ -0,0 +1,158 @@
+"""
+Publish/subscribe behind the /api/events server-sent events stream.
+
+Every write to a student, teacher or course is recorded in change_log (see
+changes.py), whichever process, job or script made it. An EventBus runs one
+thread per process that reads the entries added since it last looked and
+publishes them to that process's subscribers: straight away when notify() is
+called after a write in this process, otherwise within the poll interval. It
+reads nothing while no one is subscribed, and each event is read and encoded
+once however many subscribers receive it.
+
+Each subscriber has a bounded queue. One that falls so far behind that its
+queue fills up is dropped, rather than holding events in memory without
+limit: its stream ends with a ``dropped`` event, and the client catches up
+through /api/<entity>/changes when it reconnects. An idle subscriber is just
+a thread waiting on its own condition, woken only by events it asked for.
+"""
+
+import collections
+import logging
+import threading
+
+from background import BackgroundThreads
+
+logger = logging.getLogger(__name__)
+
+# change_log entries read per poll; after a full batch the next poll follows straight away
+BATCH = 500
+
+Event = collections.namedtuple('Event', 'entity revision frame')
+
+
+class Subscription:
+    def __init__(self, entities, revision, size):
+        self.entities = entities    # set of entities to receive, or None for all
+        self.revision = revision    # events up to this revision are not delivered
+        self.dropped = False        # the queue overflowed; no further events are delivered
+        self.closed = False         # the bus was closed
+        self._size = size
+        self._events = collections.deque()
+        self._ready = threading.Condition(threading.Lock())
+
+    def wants(self, event):
+        return event.revision > self.revision and (self.entities is None or event.entity in self.entities)
+
+    def put(self, event):
+        """Queue ``event``; returns False, having dropped the subscriber, if the queue is full"""
+        with self._ready:
+            if len(self._events) >= self._size:
+                self.dropped = True
+                self._events.clear()
+            else:
+                self._events.append(event)
+            self._ready.notify()
+            return not self.dropped
+
+    def get(self, timeout):
+        """The next event, or None if none arrives within ``timeout`` seconds or the subscription has ended"""
+        with self._ready:
+            if not (self._events or self.dropped or self.closed):
+                self._ready.wait(timeout)
+            if self.dropped or self.closed or not self._events:
+                return None
+            return self._events.popleft()
+
+    def close(self):
+        with self._ready:
+            self.closed = True
+            self._ready.notify()
+
+
+class EventBus(BackgroundThreads):
+    name = 'school-events'
+
+    def __init__(self, read, queue_size=256, poll_interval=1.0):
+        """``read(since, limit)`` returns ``(events, revision)``: at most ``limit`` events after
+        revision ``since``, oldest first, and the revision read up to"""
+        super().__init__(workers=1)
+        self.read = read
+        self.queue_size = queue_size
+        self.poll_interval = poll_interval
+        self.revision = None    # published up to here; None while no one is subscribed
+        self.dropped = 0
+        self.closed = False
+        self._subscribers = set()
+
+    def subscribe(self, entities=None):
+        """Subscribe to events of ``entities`` (all if None) after the current revision, which
+        is the subscription's ``revision``; returns None once the bus is closed"""
+        self.start()
+        with self._lock:
+            if self.closed:
+                return None
+            if self.revision is None:
+                self.revision = self.read(None, 0)[1]
+            subscription = Subscription(entities, self.revision, self.queue_size)
+            self._subscribers.add(subscription)
+            if len(self._subscribers) == 1:
+                # the thread sleeps without a timeout while no one is subscribed
+                self._wakeup.set()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def notify(self):
+        """Publish changes straight away, e.g. after a write in this process"""
+        if self._subscribers:
+            self._wakeup.set()
+
+    def close(self):
+        """End every subscription and stop the thread, e.g. before the server shuts down"""
+        with self._lock:
+            self.closed = True
+            for subscription in self._subscribers:
+                subscription.close()
+            self._subscribers.clear()
+        self.stop(timeout=0)
+
+    def status(self):
+        return {'subscribers': len(self._subscribers), 'dropped': self.dropped, 'revision': self.revision}
+
+    def _starting(self):
+        if self.closed:
+            return False
+        # subscribers and the revision belong to the process that started the thread
+        self._subscribers.clear()
+        self.revision = None
+        return True
+
+    def _loop(self):
+        while not self._stop.is_set():
+            # with no one subscribed there is nothing to publish, so sleep until someone is
+            if self._wakeup.wait(self.poll_interval if self._subscribers else None):
+                self._wakeup.clear()
+            try:
+                self._poll()
+            except Exception:
+                logger.exception("Could not publish changes")
+
+    def _poll(self):
+        with self._lock:
+            if not self._subscribers:
+                self.revision = None
+                return
+            since = self.revision
+        # only this thread moves the revision on while anyone is subscribed, so it is still ``since`` below
+        events, revision = self.read(since, BATCH)
+        if len(events) == BATCH:
+            self._wakeup.set()
+        with self._lock:
+            for event in events:
+                for subscription in [s for s in self._subscribers if s.wants(event)]:
+                    if not subscription.put(event):
+                        self._subscribers.discard(subscription)
+                        self.dropped += 1
+            self.revision = revision
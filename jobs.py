@@ -0,0 +1,43 @@
+"""
+Worker threads for the background job queue.
+
+Jobs are rows in the job table of school.db (see the Job model in app.py). A
+JobPool runs a fixed number of threads per process; each repeatedly claims the
+oldest queued job with a single UPDATE, so several server processes can share
+one queue without handing out a job twice, and runs it. Idle threads sleep
+until notify() is called for a job submitted in this process, or until the
+poll interval passes for jobs submitted elsewhere.
+"""
+
+import logging
+
+from background import BackgroundThreads
+
+logger = logging.getLogger(__name__)
+
+
+class JobPool(BackgroundThreads):
+    name = 'school-job'
+
+    def __init__(self, claim, run, workers=2, poll_interval=2.0):
+        """``claim()`` returns the id of a job it has marked running, or None; ``run(job_id)`` runs it"""
+        super().__init__(workers)
+        self.claim = claim
+        self.run = run
+        self.poll_interval = poll_interval
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                job_id = self.claim()
+            except Exception:
+                logger.exception("Could not claim a job")
+                job_id = None
+            if job_id is None:
+                if self._wakeup.wait(self.poll_interval):
+                    self._wakeup.clear()
+                continue
+            try:
+                self.run(job_id)
+            except Exception:
+                logger.exception("Job %s crashed", job_id)
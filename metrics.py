@@ -0,0 +1,220 @@
+"""
+Opt-in request instrumentation (SCHOOL_PROFILING=1).
+
+For every request this records wall time, the number of SQL statements and
+the time spent in them, JSON serialization time and commit time. The figures
+are sent back in a Server-Timing header and aggregated per route into
+Prometheus-style histograms for /api/metrics.
+
+With SCHOOL_PROFILE_SLOWEST=N, requests are also run under cProfile (a
+SCHOOL_PROFILE_SAMPLE_RATE fraction of them, 1.0 by default) and the
+profiles of the N slowest are kept for /api/metrics/profiles, and written
+to SCHOOL_PROFILE_DIR as .prof files when that is set.
+"""
+
+import cProfile
+import heapq
+import io
+import itertools
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_current = threading.local()
+
+
+class RequestStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.serialize_time = 0.0
+        self.commit_time = 0.0
+        self.profiler = None
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self):
+        return ', '.join([
+            f'sql;dur={self.sql_time * 1000:.2f};desc="{self.sql_count} statements"',
+            f'serialize;dur={self.serialize_time * 1000:.2f}',
+            f'commit;dur={self.commit_time * 1000:.2f}',
+            f'total;dur={self.elapsed * 1000:.2f}',
+        ])
+
+
+def current():
+    return getattr(_current, 'stats', None)
+
+
+def start_request(profile=False):
+    stats = _current.stats = RequestStats()
+    if profile:
+        stats.profiler = cProfile.Profile()
+        stats.profiler.enable()
+    return stats
+
+
+def finish_request():
+    stats = getattr(_current, 'stats', None)
+    _current.stats = None
+    if stats is not None and stats.profiler is not None:
+        stats.profiler.disable()
+    return stats
+
+
+@contextmanager
+def timed(phase):
+    """Add the time spent in the block to the current request's ``<phase>_time``"""
+    stats = current()
+    if stats is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        setattr(stats, f'{phase}_time', getattr(stats, f'{phase}_time') + time.perf_counter() - started)
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current() is not None:
+        conn.info.setdefault('profiling_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current()
+    started = conn.info.get('profiling_started')
+    if stats is not None and started:
+        stats.sql_count += 1
+        stats.sql_time += time.perf_counter() - started.pop()
+
+
+@event.listens_for(Session, 'before_commit')
+def _before_commit(session):
+    if current() is not None:
+        session.info['profiling_commit_started'] = time.perf_counter()
+
+
+@event.listens_for(Session, 'after_commit')
+def _after_commit(session):
+    stats = current()
+    started = session.info.pop('profiling_commit_started', None)
+    if stats is not None and started is not None:
+        stats.commit_time += time.perf_counter() - started
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+        self.total += value
+        self.count += 1
+
+
+class Metrics:
+    """Per-route aggregates, rendered in the Prometheus text exposition format"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._latency = {}
+        self._requests = {}
+        self._totals = {}
+
+    def observe(self, method, route, status, stats):
+        labels = (method, route)
+        with self._lock:
+            self._latency.setdefault(labels, Histogram(self.buckets)).observe(stats.elapsed)
+            key = labels + (str(status),)
+            self._requests[key] = self._requests.get(key, 0) + 1
+            totals = self._totals.setdefault(labels, {'sql_statements': 0, 'sql_seconds': 0.0,
+                                                      'serialize_seconds': 0.0, 'commit_seconds': 0.0})
+            totals['sql_statements'] += stats.sql_count
+            totals['sql_seconds'] += stats.sql_time
+            totals['serialize_seconds'] += stats.serialize_time
+            totals['commit_seconds'] += stats.commit_time
+
+    def render(self):
+        def label_text(method, route, **extra):
+            pairs = [('method', method), ('route', route)] + list(extra.items())
+            return ','.join(f'{name}="{value}"' for name, value in pairs)
+
+        lines = [
+            '# HELP school_request_duration_seconds Request wall time by route',
+            '# TYPE school_request_duration_seconds histogram',
+        ]
+        with self._lock:
+            for (method, route), histogram in sorted(self._latency.items()):
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    lines.append(f'school_request_duration_seconds_bucket{{{label_text(method, route, le=bound)}}} {count}')
+                lines.append(f'school_request_duration_seconds_bucket{{{label_text(method, route, le="+Inf")}}} {histogram.count}')
+                lines.append(f'school_request_duration_seconds_sum{{{label_text(method, route)}}} {histogram.total:.6f}')
+                lines.append(f'school_request_duration_seconds_count{{{label_text(method, route)}}} {histogram.count}')
+            lines += ['# HELP school_requests_total Requests by route and status',
+                      '# TYPE school_requests_total counter']
+            for (method, route, status), count in sorted(self._requests.items()):
+                lines.append(f'school_requests_total{{{label_text(method, route, status=status)}}} {count}')
+            for name, help_text in [
+                ('sql_statements', 'SQL statements executed'),
+                ('sql_seconds', 'Time spent executing SQL'),
+                ('serialize_seconds', 'Time spent encoding JSON'),
+                ('commit_seconds', 'Time spent in session commits, including the flush'),
+            ]:
+                lines += [f'# HELP school_{name}_total {help_text}', f'# TYPE school_{name}_total counter']
+                for (method, route), totals in sorted(self._totals.items()):
+                    lines.append(f'school_{name}_total{{{label_text(method, route)}}} {totals[name]:g}')
+        return '\n'.join(lines) + '\n'
+
+
+class SlowestProfiles:
+    """Keep the cProfile output of the N slowest profiled requests"""
+
+    def __init__(self, keep, directory=None):
+        self.keep = keep
+        self.directory = directory
+        self._heap = []
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+
+    def add(self, method, path, stats):
+        duration = stats.elapsed
+        with self._lock:
+            if len(self._heap) >= self.keep and duration <= self._heap[0][0]:
+                return
+            output = io.StringIO()
+            pstats.Stats(stats.profiler, stream=output).sort_stats('cumulative').print_stats(30)
+            entry = {'method': method, 'path': path, 'duration_ms': round(duration * 1000, 2),
+                     'sql_statements': stats.sql_count, 'profile': output.getvalue()}
+            item = (duration, next(self._sequence), entry)
+            if len(self._heap) < self.keep:
+                heapq.heappush(self._heap, item)
+            else:
+                heapq.heapreplace(self._heap, item)
+            if self.directory:
+                os.makedirs(self.directory, exist_ok=True)
+                name = f"{int(time.time() * 1000)}-{method}-{path.strip('/').replace('/', '_') or 'root'}.prof"
+                stats.profiler.dump_stats(os.path.join(self.directory, name))
+
+    def slowest(self):
+        with self._lock:
+            return [entry for _, _, entry in sorted(self._heap, reverse=True)]
@@ -0,0 +1,183 @@
+"""
+Versioned schema migrations for school.db.
+
+db.create_all() only creates missing tables; it never adds indexes or columns
+to a database that already exists. Each migration here is applied once, in
+order, and recorded in the schema_migrations table. Migrations are written to
+be safe on databases that create_all() has just built with the current models.
+
+Usage:
+    python migrations.py                 # apply pending migrations to school.db
+    python migrations.py status          # list applied and pending migrations
+    python migrations.py check           # EXPLAIN QUERY PLAN the run_sql.py quick commands
+    python migrations.py --db other.db upgrade
+"""
+
+import argparse
+import sqlite3
+import sys
+from datetime import datetime
+
+
+def column_exists(conn, table, column):
+    return any(row[1] == column for row in conn.execute(f"PRAGMA table_info({table})"))
+
+
+def add_column(conn, table, column, definition):
+    if not column_exists(conn, table, column):
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+def hot_query_indexes(conn):
+    # created by create_all() before this migration, from index=True on student.grade and
+    # course.teacher_id; the composite indexes below lead with the same columns
+    conn.execute("DROP INDEX IF EXISTS ix_student_grade")
+    conn.execute("DROP INDEX IF EXISTS ix_course_teacher_id")
+    for statement in [
+        "CREATE INDEX IF NOT EXISTS ix_student_grade_dob ON student (grade, date_of_birth)",
+        'CREATE INDEX IF NOT EXISTS ix_student_name ON student (name COLLATE "NOCASE")',
+        "CREATE INDEX IF NOT EXISTS ix_student_created_at ON student (created_at)",
+        "CREATE INDEX IF NOT EXISTS ix_teacher_subject ON teacher (subject)",
+        "CREATE INDEX IF NOT EXISTS ix_teacher_experience ON teacher (experience)",
+        'CREATE INDEX IF NOT EXISTS ix_teacher_name ON teacher (name COLLATE "NOCASE")',
+        "CREATE INDEX IF NOT EXISTS ix_teacher_created_at ON teacher (created_at)",
+        "CREATE INDEX IF NOT EXISTS ix_course_teacher_credits ON course (teacher_id, credits)",
+        "CREATE INDEX IF NOT EXISTS ix_course_credits ON course (credits)",
+        "CREATE INDEX IF NOT EXISTS ix_course_created_at ON course (created_at)",
+    ]:
+        conn.execute(statement)
+    conn.execute("ANALYZE")
+
+
+def row_versions(conn):
+    for table in ('student', 'teacher', 'course'):
+        add_column(conn, table, 'version', "INTEGER NOT NULL DEFAULT 1")
+
+
+def change_log_ops(conn):
+    # a change_log created by create_all() already has the column and current triggers
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'change_log'").fetchone():
+        return
+    from changes import TRIGGER_NAMES, TRIGGERS
+
+    add_column(conn, 'change_log', 'op', "VARCHAR(6) NOT NULL DEFAULT 'update'")
+    conn.execute("UPDATE change_log SET op = 'delete' WHERE deleted AND op != 'delete'")
+    # the triggers are created IF NOT EXISTS, so the ones that leave op out must go first
+    for name in TRIGGER_NAMES:
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+    for statement in TRIGGERS:
+        conn.execute(statement)
+
+
+# (version, name, function taking a sqlite3 connection)
+MIGRATIONS = [
+    (1, 'hot query indexes', hot_query_indexes),
+    (2, 'row versions for optimistic locking', row_versions),
+    (3, 'change log operations for /api/events', change_log_ops),
+]
+
+
+def applied_versions(conn):
+    conn.execute("""CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        name VARCHAR(100) NOT NULL,
+        applied_at DATETIME NOT NULL
+    )""")
+    return {row[0] for row in conn.execute("SELECT version FROM schema_migrations")}
+
+
+def upgrade(conn, verbose=False):
+    """Apply every pending migration, each in its own transaction. Returns the versions applied."""
+    done = applied_versions(conn)
+    conn.commit()
+    applied = []
+    for version, name, migrate in MIGRATIONS:
+        if version in done:
+            continue
+        try:
+            migrate(conn)
+            conn.execute(
+                "INSERT INTO schema_migrations (version, name, applied_at) VALUES (?, ?, ?)",
+                (version, name, datetime.utcnow().isoformat(sep=' ')),
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append(version)
+        if verbose:
+            print(f"Applied migration {version}: {name}")
+    return applied
+
+
+def status(conn):
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'schema_migrations'").fetchone()
+    done = {row[0] for row in conn.execute("SELECT version FROM schema_migrations")} if exists else set()
+    for version, name, _ in MIGRATIONS:
+        print(f"  {version:>3}  {'applied' if version in done else 'pending':<8} {name}")
+
+
+def full_scans(conn, query):
+    """Return the EXPLAIN QUERY PLAN steps of ``query`` that scan a whole table without an index"""
+    plan = conn.execute(f"EXPLAIN QUERY PLAN {query}").fetchall()
+    return [row[3] for row in plan if row[3].startswith('SCAN ') and ' INDEX ' not in row[3]]
+
+
+# Quick commands that return one row per table row by design, with the tables (or
+# aliases, as EXPLAIN QUERY PLAN names them) they are expected to scan. A join may be
+# planned from either side, so each entry lists the alternatives; one must cover the scans.
+EXPECTED_FULL_SCANS = {
+    'courses_with_teachers': [{'c'}, {'t'}],
+    'teacher_workload': [{'t'}],
+    'all_data': [{'student', 'teacher', 'course'}],
+}
+
+
+def unexpected_scans(command, scans):
+    """The scans in ``scans`` that no alternative in EXPECTED_FULL_SCANS for ``command`` allows"""
+    scanned = {scan.split()[1] for scan in scans}
+    alternatives = EXPECTED_FULL_SCANS.get(command, [set()])
+    allowed = next((tables for tables in alternatives if scanned <= tables), None)
+    if allowed is not None:
+        return []
+    # report the scans outside the alternative that allows the most of them
+    allowed = max(alternatives, key=lambda tables: len(scanned & tables))
+    return [scan for scan in scans if scan.split()[1] not in allowed]
+
+
+def check_query_plans(conn):
+    """Flag unexpected full table scans in the run_sql.py quick commands. Returns the number flagged."""
+    from run_sql import QUICK_COMMANDS
+
+    flagged = 0
+    for command, (_, queries) in QUICK_COMMANDS.items():
+        scans = [scan for _, query in queries for scan in full_scans(conn, query)]
+        unexpected = unexpected_scans(command, scans)
+        print(f"{'FULL SCAN' if unexpected else 'ok':<10} {command}")
+        for scan in scans:
+            print(f"           {scan}{'' if scan in unexpected else ' (expected)'}")
+        flagged += len(unexpected)
+    return flagged
+
+
+def main():
+    parser = argparse.ArgumentParser(description="School database migrations")
+    parser.add_argument('command', nargs='?', default='upgrade', choices=['upgrade', 'status', 'check'])
+    parser.add_argument('--db', default='school.db', help="SQLite database file (default: school.db)")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    try:
+        if args.command == 'upgrade':
+            if not upgrade(conn, verbose=True):
+                print("Database is up to date.")
+        elif args.command == 'status':
+            status(conn)
+        elif args.command == 'check':
+            sys.exit(1 if check_query_plans(conn) else 0)
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
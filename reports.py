@@ -0,0 +1,142 @@
+"""
+Materialized reports behind the run_sql.py quick commands and /api/reports.
+
+Each report is defined once, in REPORTS, by the query that computes it. Its
+result is stored in a report_<name> table, and report_state records when it
+was last refreshed. SQLite triggers on the tables a report reads stamp
+stale_since on the first write that affects it, so a reader can tell how old
+the stored result is and refresh it only when it has to.
+
+Functions take a DB-API sqlite3 connection and leave committing to the caller.
+"""
+
+from collections import namedtuple
+
+from triggers import NOW
+
+Report = namedtuple('Report', 'name description query sources')
+
+# sources: table -> columns whose update changes the result (insert and delete always do)
+REPORTS = {report.name: report for report in [
+    Report('students_by_grade', "Show students grouped by grade",
+           "SELECT grade, COUNT(*) as student_count FROM student GROUP BY grade ORDER BY grade;",
+           {'student': ['grade']}),
+    Report('teacher_workload', "Show teacher course assignments",
+           "SELECT t.name as teacher, t.subject, COUNT(c.id) as courses_teaching, SUM(c.credits) as total_credits "
+           "FROM teacher t LEFT JOIN course c ON t.id = c.teacher_id GROUP BY t.id ORDER BY courses_teaching DESC;",
+           {'teacher': ['name', 'subject'], 'course': ['teacher_id', 'credits']}),
+    Report('student_stats', "Show detailed student statistics by grade",
+           "SELECT grade, COUNT(*) as students, MIN(date_of_birth) as youngest, MAX(date_of_birth) as oldest "
+           "FROM student GROUP BY grade ORDER BY grade;",
+           {'student': ['grade', 'date_of_birth']}),
+    Report('course_stats', "Show course statistics by subject",
+           "SELECT t.subject, COUNT(c.id) as courses, AVG(c.credits) as avg_credits, SUM(c.credits) as total_credits "
+           "FROM teacher t LEFT JOIN course c ON t.id = c.teacher_id GROUP BY t.subject ORDER BY courses DESC;",
+           {'teacher': ['subject'], 'course': ['teacher_id', 'credits']}),
+]}
+
+STATE_TABLE = """CREATE TABLE IF NOT EXISTS report_state (
+    name VARCHAR(50) PRIMARY KEY,
+    refreshed_at VARCHAR(30),
+    stale_since VARCHAR(30),
+    refresh_ms REAL
+)"""
+
+
+def report_table(name):
+    return f"report_{name}"
+
+
+def materialized_query(name):
+    return f"SELECT * FROM {report_table(name)} ORDER BY rowid"
+
+
+def _triggers(report):
+    mark_stale = (f"UPDATE report_state SET stale_since = {NOW} "
+                  f"WHERE name = '{report.name}' AND stale_since IS NULL;")
+    for table, columns in report.sources.items():
+        for event in ('INSERT', 'DELETE', f"UPDATE OF {', '.join(columns)}"):
+            trigger = f"report_stale_{report.name}_{table}_{event.split()[0].lower()}"
+            yield f"CREATE TRIGGER IF NOT EXISTS {trigger} AFTER {event} ON {table} BEGIN {mark_stale} END"
+
+
+def install_reports(conn, rebuild=False):
+    """Create report_state and the staleness triggers; with rebuild, materialize every report"""
+    conn.execute(STATE_TABLE)
+    for report in REPORTS.values():
+        conn.execute("INSERT OR IGNORE INTO report_state (name) VALUES (?)", (report.name,))
+        for statement in _triggers(report):
+            conn.execute(statement)
+    if rebuild:
+        for name in REPORTS:
+            refresh_report(conn, name)
+
+
+def reports_installed(conn):
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'report_state'").fetchone() is not None
+
+
+def refresh_report(conn, name):
+    """Recompute a report into its table and clear its staleness stamp"""
+    report = REPORTS[name]
+    # the UPDATE opens the transaction (and takes the write lock) before the DDL, so readers
+    # never see the table missing and no write can land between the query and the new stamp
+    conn.execute("UPDATE report_state SET refreshed_at = NULL WHERE name = ?", (name,))
+    started = conn.execute("SELECT julianday('now')").fetchone()[0]
+    conn.execute(f"DROP TABLE IF EXISTS {report_table(name)}")
+    conn.execute(f"CREATE TABLE {report_table(name)} AS {report.query.rstrip(';')}")
+    conn.execute(f"""UPDATE report_state SET refreshed_at = {NOW}, stale_since = NULL,
+                     refresh_ms = (julianday('now') - ?) * 86400000 WHERE name = ?""", (started, name))
+
+
+def report_state(conn, name):
+    """Return (refreshed_at, stale_since, seconds stale) for a report, or None if it has never been refreshed"""
+    row = conn.execute(
+        "SELECT refreshed_at, stale_since, (julianday('now') - julianday(stale_since)) * 86400 "
+        "FROM report_state WHERE name = ?", (name,)).fetchone()
+    return row if row and row[0] else None
+
+
+def ensure_fresh(conn, name, max_staleness=None):
+    """Refresh a report that was never materialized, that is stale and stored empty, or that has
+    been stale for at least max_staleness seconds.
+
+    Returns True if it was refreshed (the caller should commit).
+    """
+    state = report_state(conn, name)
+    if (state is None
+            or (state[1] is not None and is_empty(conn, name))
+            or (max_staleness is not None and state[2] is not None and state[2] >= max_staleness)):
+        refresh_report(conn, name)
+        return True
+    return False
+
+
+def is_empty(conn, name):
+    # e.g. materialized when the database was created, before any rows were written
+    return conn.execute(f"SELECT 1 FROM {report_table(name)} LIMIT 1").fetchone() is None
+
+
+def read_report(conn, name):
+    report = REPORTS[name]
+    refreshed_at, stale_since, _ = report_state(conn, name)
+    cursor = conn.execute(materialized_query(name))
+    columns = [description[0] for description in cursor.description]
+    return {
+        'name': name,
+        'description': report.description,
+        'refreshed_at': refreshed_at,
+        'stale_since': stale_since,
+        'rows': [dict(zip(columns, row)) for row in cursor],
+    }
+
+
+def list_reports(conn):
+    state = {row[0]: row[1:] for row in conn.execute(
+        "SELECT name, refreshed_at, stale_since, refresh_ms FROM report_state")}
+    return [
+        dict(zip(('name', 'description', 'refreshed_at', 'stale_since', 'refresh_ms'),
+                 (name, report.description) + tuple(state.get(name, (None, None, None)))))
+        for name, report in REPORTS.items()
+    ]
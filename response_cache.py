@@ -0,0 +1,86 @@
+"""
+In-process LRU cache for API responses.
+
+Every entity (student, teacher, course, enrollment) has a version counter in the
+entity_version table, bumped by triggers on every insert, update and delete.
+Cached entries are keyed by the request path together with the versions of
+the entities the response depends on, so a write anywhere (any worker
+process, a bulk import, or run_sql.py) makes the old entries unreachable;
+they are then evicted as the LRU fills up.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+VERSIONED_TABLES = ('student', 'teacher', 'course', 'enrollment')
+
+VERSION_TABLE = """CREATE TABLE IF NOT EXISTS entity_version (
+    entity VARCHAR(20) PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0
+)"""
+
+VERSION_TRIGGERS = [
+    f"CREATE TRIGGER IF NOT EXISTS version_{table}_{action.lower()} AFTER {action} ON {table} BEGIN "
+    f"UPDATE entity_version SET version = version + 1 WHERE entity = '{table}'; END"
+    for table in VERSIONED_TABLES
+    for action in ('INSERT', 'UPDATE', 'DELETE')
+]
+
+
+def install_versions(connection):
+    """Create the entity_version table and its triggers on a SQLAlchemy connection"""
+    connection.exec_driver_sql(VERSION_TABLE)
+    for table in VERSIONED_TABLES:
+        connection.exec_driver_sql(
+            "INSERT OR IGNORE INTO entity_version (entity, version) VALUES (?, 0)", (table,)
+        )
+    for statement in VERSION_TRIGGERS:
+        connection.exec_driver_sql(statement)
+
+
+def read_versions(connection):
+    return dict(connection.exec_driver_sql("SELECT entity, version FROM entity_version").all())
+
+
+class CachedResponse:
+    def __init__(self, body, mimetype, headers):
+        self.body = body
+        self.mimetype = mimetype
+        self.headers = headers
+        self.etag = hashlib.sha1(body).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, path, entities, versions):
+        return (path,) + tuple(versions.get(entity, 0) for entity in entities)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def set(self, key, entry):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
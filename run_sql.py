@@ -1,42 +1,232 @@
+"""
+Run SQL against the school database.
+
+Usage:
+    python run_sql.py                                   # interactive mode
+    python run_sql.py students_by_grade                 # a quick command
+    python run_sql.py "SELECT * FROM student" --limit 100 --offset 200
+    python run_sql.py "SELECT * FROM student" --format csv > students.csv
+    python run_sql.py --script nightly.sql --output-dir reports --format csv --jobs 4
+    python run_sql.py --live "UPDATE course SET credits = 4 WHERE id = 7"
+
+Rows are fetched in batches and written as they arrive, so large results never
+have to fit in memory. Queries read the latest snapshot (see snapshots.py) when
+there is one, so they never contend with the server; --live or --db reads and
+writes the database itself.
+"""
+
+import argparse
+import csv
+import json
+import os
 import sqlite3
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from pathlib import Path
+
+from reports import REPORTS, ensure_fresh, materialized_query, report_state, reports_installed
+from snapshots import SNAPSHOT_DIR, describe, latest_snapshot, snapshot_uri
+
+DATABASE = 'school.db'
+FETCH_SIZE = 500
+FORMATS = ('table', 'csv', 'jsonl')
+EXTENSIONS = {'table': 'txt', 'csv': 'csv', 'jsonl': 'jsonl'}
+READ_KEYWORDS = ('select', 'with', 'values', 'explain')
+STATEMENT_CACHE_SIZE = 256
+# Per-connection settings: a 64 MB page cache, memory-mapped reads and in-memory
+# temp tables for sorts and GROUP BY. journal_mode is left as the database has it.
+SESSION_PRAGMAS = {'cache_size': -65536, 'mmap_size': 268435456, 'temp_store': 'MEMORY'}
+
+def report_command(name):
+    return (REPORTS[name].description, [(None, REPORTS[name].query)])
+
+# Quick commands: name -> (description, [(section title, query), ...]). Those defined in
+# reports.py are read from their materialized tables (see execute_quick_command).
+QUICK_COMMANDS = {
+    'students_by_grade': report_command('students_by_grade'),
+    'teachers_by_subject': ("Show teachers grouped by subject", [
+        (None, "SELECT subject, COUNT(*) as teacher_count FROM teacher GROUP BY subject ORDER BY subject;"),
+    ]),
+    'courses_with_teachers': ("Show courses with teacher details", [
+        (None, "SELECT c.name as course_name, c.credits, t.name as teacher_name, t.subject FROM course c JOIN teacher t ON c.teacher_id = t.id;"),
+    ]),
+    'recent_students': ("Show students added in last 7 days", [
+        (None, "SELECT name, grade, email, created_at FROM student WHERE created_at >= date('now', '-7 days') ORDER BY created_at DESC;"),
+    ]),
+    'teacher_workload': report_command('teacher_workload'),
+    'student_stats': report_command('student_stats'),
+    'course_stats': report_command('course_stats'),
+    'all_data': ("Show all students, teachers, and courses", [
+        ("ALL STUDENTS", "SELECT * FROM student;"),
+        ("ALL TEACHERS", "SELECT * FROM teacher;"),
+        ("ALL COURSES", "SELECT * FROM course;"),
+    ]),
+}
+
+def paged_query(query, limit=None, offset=0):
+    """Wrap a SELECT in LIMIT/OFFSET so SQLite stops early; returns (sql, paged)"""
+    body = query.strip().rstrip(';').strip()
+    if (limit is None and not offset) or not body or body.split(None, 1)[0].lower() not in ('select', 'with', 'values'):
+        return query, False
+    # the newline keeps a trailing -- comment from swallowing the closing parenthesis
+    return f"SELECT * FROM ({body}\n) LIMIT {-1 if limit is None else int(limit)} OFFSET {int(offset)}", True
+
+
+def iter_batches(cursor, limit=None, offset=0, batch_size=FETCH_SIZE):
+    """Yield rows from an executed cursor in fetchmany() batches, skipping offset rows and stopping after limit"""
+    skipped = returned = 0
+    while limit is None or returned < limit:
+        batch = cursor.fetchmany(batch_size)
+        if not batch:
+            return
+        if skipped < offset:
+            drop = min(offset - skipped, len(batch))
+            skipped += drop
+            batch = batch[drop:]
+        if limit is not None:
+            batch = batch[:limit - returned]
+        if batch:
+            returned += len(batch)
+            yield batch
+
+
+def write_rows(columns, batches, fmt='table', out=None):
+    """Write batches of rows as they arrive and return how many were written.
+
+    ``table`` pads columns to the widths of the header and the first batch, so
+    output starts before the whole result has been read; ``csv`` writes a header
+    row; ``jsonl`` writes one JSON object per row.
+    """
+    out = out or sys.stdout
+    count = 0
+    if fmt == 'csv':
+        writer = csv.writer(out)
+        writer.writerow(columns)
+        for batch in batches:
+            writer.writerows(batch)
+            count += len(batch)
+    elif fmt == 'jsonl':
+        for batch in batches:
+            out.writelines(json.dumps(dict(zip(columns, row)), default=str) + "\n" for row in batch)
+            count += len(batch)
+    else:
+        widths = None
+        for batch in batches:
+            if widths is None:
+                widths = [max([len(name)] + [len(str(row[i])) for row in batch]) for i, name in enumerate(columns)]
+                header = " | ".join(name.ljust(width) for name, width in zip(columns, widths))
+                out.write(header.rstrip() + "\n")
+                out.write("-" * len(header) + "\n")
+            for row in batch:
+                out.write(" | ".join(str(cell).ljust(width) for cell, width in zip(row, widths)).rstrip() + "\n")
+            count += len(batch)
+    out.flush()
+    return count
+
+
+def choose_database(database=None, live=False):
+    """The database to use: --db or the live one if asked for, else the latest snapshot if there is one"""
+    if database or live:
+        return database or DATABASE
+    snapshot = latest_snapshot()
+    if snapshot is None:
+        print(f"(no snapshot in {SNAPSHOT_DIR}/, using the live {DATABASE}; take one with python snapshots.py)",
+              file=sys.stderr)
+        return DATABASE
+    print(f"(reading snapshot {describe(snapshot)}; use --live for the live database)", file=sys.stderr)
+    return snapshot_uri(snapshot)
+
+
+def is_snapshot(database):
+    return database.startswith('file:') and 'mode=ro' in database
 
-def run_sql_query(query):
-    """Run a custom SQL query on the school database"""
+
+def connect(database=DATABASE, read_only=False):
+    """Open a connection with a larger statement cache and the session pragmas"""
+    if is_snapshot(database):
+        conn = sqlite3.connect(database, uri=True, cached_statements=STATEMENT_CACHE_SIZE, check_same_thread=False)
+    elif read_only:
+        # mode=ro: SQLite itself rejects writes, and the connection may be closed from another thread
+        conn = sqlite3.connect(f"{Path(database).resolve().as_uri()}?mode=ro", uri=True, timeout=5,
+                               cached_statements=STATEMENT_CACHE_SIZE, check_same_thread=False)
+    else:
+        conn = sqlite3.connect(database, timeout=5, cached_statements=STATEMENT_CACHE_SIZE)
+    for name, value in SESSION_PRAGMAS.items():
+        conn.execute(f"PRAGMA {name}={value}")
+    return conn
+
+
+def run_sql_query(query, limit=None, offset=0, fmt='table', database=DATABASE, batch_size=FETCH_SIZE,
+                  conn=None, timer=False):
+    """Run a custom SQL query on the school database, streaming the results.
+
+    Pass ``conn`` to reuse an open connection (and its page and statement
+    caches); otherwise one is opened and closed around the query.
+    """
+    # keep csv/jsonl output on stdout machine-readable
+    info = sys.stdout if fmt == 'table' else sys.stderr
+    own_connection = conn is None
     try:
-        conn = sqlite3.connect('school.db')
+        if own_connection:
+            conn = connect(database)
         cursor = conn.cursor()
-        
-        print(f"Running query: {query}")
-        print("-" * 50)
-        
-        cursor.execute(query)
-        results = cursor.fetchall()
-        
-        if results:
-            # Get column names
-            column_names = [description[0] for description in cursor.description]
-            print(" | ".join(column_names))
-            print("-" * (len(" | ".join(column_names))))
-            
-            for row in results:
-                print(" | ".join(str(cell) for cell in row))
-            
-            print(f"\nQuery returned {len(results)} rows.")
+
+        print(f"Running query: {query}", file=info)
+        print("-" * 50, file=info)
+
+        started = time.perf_counter()
+        sql, paged = paged_query(query, limit, offset)
+        cursor.execute(sql)
+
+        count = 0
+        if cursor.description is None:
+            conn.commit()
+            print("Query executed successfully. No results returned.", file=info)
         else:
-            print("Query executed successfully. No results returned.")
-            
-        conn.close()
-        
+            column_names = [description[0] for description in cursor.description]
+            if paged:
+                batches = iter_batches(cursor, batch_size=batch_size)
+            else:
+                batches = iter_batches(cursor, limit, offset, batch_size)
+            count = write_rows(column_names, batches, fmt)
+            if count:
+                print(f"\nQuery returned {count} rows.", file=info)
+            else:
+                print("Query executed successfully. No results returned.", file=info)
+        cursor.close()
+
+        if timer:
+            elapsed = time.perf_counter() - started
+            rate = count / elapsed if elapsed else 0
+            print(f"Run time: {elapsed * 1000:.1f} ms ({count} rows, {rate:,.0f} rows/s)", file=info)
+
     except Exception as e:
-        print(f"Error executing query: {e}")
+        hint = " (this is a read-only snapshot; use --live to write)" if 'readonly' in str(e) else ""
+        print(f"Error executing query: {e}{hint}", file=info)
+    finally:
+        if own_connection and conn is not None:
+            conn.close()
+
+def explain_query(query, conn):
+    """Print the EXPLAIN QUERY PLAN of a query as an indented tree, marking full table scans"""
+    depths = {}
+    for node, parent, _, detail in conn.execute(f"EXPLAIN QUERY PLAN {query.strip().rstrip(';')}"):
+        depths[node] = depths.get(parent, -1) + 1
+        full_scan = detail.startswith('SCAN ') and ' INDEX ' not in detail
+        print(f"{'  ' * depths[node]}{detail}{'   <- full table scan' if full_scan else ''}")
 
-def interactive_mode():
-    """Interactive SQL query mode"""
+def interactive_mode(database=DATABASE, **options):
+    """Interactive SQL query mode, on one connection kept open for the whole session"""
     print("SQL Query Runner for School Management Database")
     print("=" * 50)
     print("Type 'exit' to quit, 'help' for example queries")
     print()
+
+    conn = connect(database)
+    options.update(conn=conn, database=database)
     
     while True:
         try:
@@ -44,6 +234,22 @@ def interactive_mode():
             
             if query.lower() == 'exit':
                 break
+            elif query.lower().startswith('.timer'):
+                setting = query[len('.timer'):].strip().lower()
+                options['timer'] = setting == 'on' if setting in ('on', 'off') else not options.get('timer')
+                print(f"Timer {'on' if options['timer'] else 'off'}")
+            elif query.lower().startswith('.explain'):
+                target = query[len('.explain'):].strip()
+                if target.lower() in QUICK_COMMANDS:
+                    for title, command_query in QUICK_COMMANDS[target.lower()][1]:
+                        if title:
+                            print(f"=== {title} ===")
+                        explain_query(command_query, conn)
+                elif target:
+                    explain_query(target, conn)
+                else:
+                    print("Usage: .explain <query or quick command>")
+                print()
             elif query.lower() == 'help':
                 print("\nExample queries:")
                 print("\n=== BASIC QUERIES ===")
@@ -71,94 +277,269 @@ def interactive_mode():
                 print("  SELECT t.name as teacher, COUNT(c.id) as courses_teaching FROM teacher t LEFT JOIN course c ON t.id = c.teacher_id GROUP BY t.id;")
                 
                 print("\n=== ADVANCED QUERIES ===")
-                print("  SELECT s.grade, COUNT(*) as students, AVG(c.credits) as avg_credits FROM student s, course c GROUP BY s.grade;")
+                print("  SELECT s.grade, COUNT(*) as students, AVG(COALESCE(sc.credits, 0)) as avg_credits FROM student s LEFT JOIN student_credits sc ON sc.student_id = s.id GROUP BY s.grade;")
+                print("  SELECT c.name, COUNT(e.student_id) as enrolled FROM course c LEFT JOIN enrollment e ON e.course_id = c.id GROUP BY c.id ORDER BY enrolled DESC;")
                 print("  SELECT t.subject, COUNT(c.id) as courses, SUM(c.credits) as total_credits FROM teacher t LEFT JOIN course c ON t.id = c.teacher_id GROUP BY t.subject;")
                 print("  SELECT * FROM student WHERE created_at >= date('now', '-7 days');")
                 
                 print("\n=== QUICK COMMANDS ===")
-                print("  students_by_grade    - Show students grouped by grade")
-                print("  teachers_by_subject  - Show teachers grouped by subject")
-                print("  courses_with_teachers - Show courses with teacher details")
-                print("  recent_students     - Show students added in last 7 days")
-                print("  teacher_workload    - Show teacher course assignments")
-                print("  student_stats       - Show detailed student statistics by grade")
-                print("  course_stats        - Show course statistics by subject")
-                print("  all_data           - Show all students, teachers, and courses")
-                print()
-            elif query.lower() == 'students_by_grade':
-                run_sql_query("SELECT grade, COUNT(*) as student_count FROM student GROUP BY grade ORDER BY grade;")
-                print()
-            elif query.lower() == 'teachers_by_subject':
-                run_sql_query("SELECT subject, COUNT(*) as teacher_count FROM teacher GROUP BY subject ORDER BY subject;")
-                print()
-            elif query.lower() == 'courses_with_teachers':
-                run_sql_query("SELECT c.name as course_name, c.credits, t.name as teacher_name, t.subject FROM course c JOIN teacher t ON c.teacher_id = t.id;")
-                print()
-            elif query.lower() == 'recent_students':
-                run_sql_query("SELECT name, grade, email, created_at FROM student WHERE created_at >= date('now', '-7 days') ORDER BY created_at DESC;")
-                print()
-            elif query.lower() == 'teacher_workload':
-                run_sql_query("SELECT t.name as teacher, t.subject, COUNT(c.id) as courses_teaching, SUM(c.credits) as total_credits FROM teacher t LEFT JOIN course c ON t.id = c.teacher_id GROUP BY t.id ORDER BY courses_teaching DESC;")
-                print()
-            elif query.lower() == 'student_stats':
-                run_sql_query("SELECT grade, COUNT(*) as students, MIN(date_of_birth) as youngest, MAX(date_of_birth) as oldest FROM student GROUP BY grade ORDER BY grade;")
-                print()
-            elif query.lower() == 'course_stats':
-                run_sql_query("SELECT t.subject, COUNT(c.id) as courses, AVG(c.credits) as avg_credits, SUM(c.credits) as total_credits FROM teacher t LEFT JOIN course c ON t.id = c.teacher_id GROUP BY t.subject ORDER BY courses DESC;")
+                for name, (description, _) in QUICK_COMMANDS.items():
+                    print(f"  {name:<20} - {description}")
+
+                print("\n=== SESSION COMMANDS ===")
+                print("  .timer [on|off]      - Show execution time and rows per second after each query")
+                print("  .explain <query>     - Show the query plan of a query or quick command")
                 print()
-            elif query.lower() == 'all_data':
-                print("=== ALL STUDENTS ===")
-                run_sql_query("SELECT * FROM student;")
-                print("\n=== ALL TEACHERS ===")
-                run_sql_query("SELECT * FROM teacher;")
-                print("\n=== ALL COURSES ===")
-                run_sql_query("SELECT * FROM course;")
+            elif query.lower() in QUICK_COMMANDS:
+                execute_quick_command(query, **options)
                 print()
             elif query:
-                run_sql_query(query)
+                run_sql_query(query, **options)
                 print()
                 
-        except KeyboardInterrupt:
+        except (KeyboardInterrupt, EOFError):
             print("\nExiting...")
             break
         except Exception as e:
             print(f"Error: {e}")
 
-def execute_quick_command(command):
+    conn.close()
+
+def report_current(conn, name):
+    """Whether a report's materialized result is up to date"""
+    state = report_state(conn, name)
+    return state is not None and state[1] is None
+
+def execute_quick_command(command, **options):
     """Execute quick commands"""
-    if command.lower() == 'students_by_grade':
-        run_sql_query("SELECT grade, COUNT(*) as student_count FROM student GROUP BY grade ORDER BY grade;")
-    elif command.lower() == 'teachers_by_subject':
-        run_sql_query("SELECT subject, COUNT(*) as teacher_count FROM teacher GROUP BY subject ORDER BY subject;")
-    elif command.lower() == 'courses_with_teachers':
-        run_sql_query("SELECT c.name as course_name, c.credits, t.name as teacher_name, t.subject FROM course c JOIN teacher t ON c.teacher_id = t.id;")
-    elif command.lower() == 'recent_students':
-        run_sql_query("SELECT name, grade, email, created_at FROM student WHERE created_at >= date('now', '-7 days') ORDER BY created_at DESC;")
-    elif command.lower() == 'teacher_workload':
-        run_sql_query("SELECT t.name as teacher, t.subject, COUNT(c.id) as courses_teaching, SUM(c.credits) as total_credits FROM teacher t LEFT JOIN course c ON t.id = c.teacher_id GROUP BY t.id ORDER BY courses_teaching DESC;")
-    elif command.lower() == 'student_stats':
-        run_sql_query("SELECT grade, COUNT(*) as students, MIN(date_of_birth) as youngest, MAX(date_of_birth) as oldest FROM student GROUP BY grade ORDER BY grade;")
-    elif command.lower() == 'course_stats':
-        run_sql_query("SELECT t.subject, COUNT(c.id) as courses, AVG(c.credits) as avg_credits, SUM(c.credits) as total_credits FROM teacher t LEFT JOIN course c ON t.id = c.teacher_id GROUP BY t.subject ORDER BY courses DESC;")
-    elif command.lower() == 'all_data':
-        print("=== ALL STUDENTS ===")
-        run_sql_query("SELECT * FROM student;")
-        print("\n=== ALL TEACHERS ===")
-        run_sql_query("SELECT * FROM teacher;")
-        print("\n=== ALL COURSES ===")
-        run_sql_query("SELECT * FROM course;")
-    else:
+    entry = QUICK_COMMANDS.get(command.lower())
+    if entry is None:
         print(f"Unknown command: {command}")
-        print("Available commands: students_by_grade, teachers_by_subject, courses_with_teachers, recent_students, teacher_workload, student_stats, course_stats, all_data")
+        print(f"Available commands: {', '.join(QUICK_COMMANDS)}")
+        return
+    _, queries = entry
+    if options.get('conn') is None:
+        # one connection for all of the command's queries
+        with closing(connect(options.get('database', DATABASE))) as conn:
+            return execute_quick_command(command, conn=conn, **options)
+    info = sys.stdout if options.get('fmt', 'table') == 'table' else sys.stderr
+    refresh = options.pop('refresh', False)
+    name = command.lower()
+    conn = options['conn']
+    if is_snapshot(options.get('database', DATABASE)):
+        # a snapshot cannot be refreshed, so a report that was stale when it was taken is computed
+        if name in REPORTS and reports_installed(conn) and report_current(conn, name):
+            print(f"(materialized at {report_state(conn, name)[0]} UTC)", file=info)
+            queries = [(None, materialized_query(name))]
+    elif name in REPORTS and reports_installed(conn):
+        # read the precomputed result; it is recomputed only when missing or asked for
+        if ensure_fresh(conn, name, max_staleness=0 if refresh else None):
+            conn.commit()
+        refreshed_at, stale_since, _ = report_state(conn, name)
+        print(f"(materialized at {refreshed_at} UTC"
+              f"{f'; stale since {stale_since}, use --refresh to recompute' if stale_since else ''})", file=info)
+        queries = [(None, materialized_query(name))]
+    for number, (title, query) in enumerate(queries):
+        if title:
+            if number:
+                print(file=info)
+            print(f"=== {title} ===", file=info)
+        run_sql_query(query, **options)
 
-if __name__ == "__main__":
-    if len(sys.argv) > 1:
+def load_script(path):
+    """Split a script into (name, sql) jobs.
+
+    A line holding just a quick command name expands to that command's queries;
+    everything else is read as SQL statements terminated by semicolons.
+    """
+    if path == '-':
+        text = sys.stdin.read()
+    else:
+        with open(path, encoding='utf-8') as f:
+            text = f.read()
+    jobs, buffer = [], ''
+    for line in text.splitlines():
+        stripped = line.strip()
+        if not buffer:
+            command = stripped.rstrip(';').strip().lower()
+            if command in QUICK_COMMANDS:
+                for title, query in QUICK_COMMANDS[command][1]:
+                    jobs.append((f"{command}-{title.lower().replace(' ', '_')}" if title else command, query))
+                continue
+            if not stripped or stripped.startswith('--'):
+                continue
+        buffer += line + "\n"
+        if sqlite3.complete_statement(buffer):
+            jobs.append(('query', buffer.strip()))
+            buffer = ''
+    if buffer.strip():
+        jobs.append(('query', buffer.strip()))
+    return jobs
+
+
+def is_read_only(sql):
+    words = sql.lstrip('( \t\n').split(None, 1)
+    keyword = words[0].lower() if words else ''
+    return keyword in READ_KEYWORDS or (keyword == 'pragma' and '=' not in sql)
+
+
+def run_script(path, output_dir, workers=4, fmt='csv', database=DATABASE, batch_size=FETCH_SIZE,
+               limit=None, offset=0):
+    """Run a script of SQL statements and quick commands in one process, each result to its own file.
+
+    Every statement sees the database as running the script in order would.
+    Reads before the first write run concurrently on a pool of read-only
+    connections. The writes, with any reads between them, then run in script
+    order in a single transaction; if a write fails it is rolled back and
+    nothing after it runs. Reads after the last write run concurrently once it
+    has committed. Stale materialized reports are refreshed just before the
+    statements that read them. On a snapshot, scripts may only read, and
+    reports that were stale when it was taken are computed instead. Returns
+    the number of statements that failed.
+    """
+    jobs = load_script(path)
+    snapshot = is_snapshot(database)
+    with closing(connect(database)) as conn:
+        if reports_installed(conn):
+            jobs = [(name, materialized_query(name))
+                    if name in REPORTS and sql == REPORTS[name].query
+                    and (report_current(conn, name) or not snapshot) else (name, sql)
+                    for name, sql in jobs]
+    os.makedirs(output_dir, exist_ok=True)
+    width = len(str(len(jobs)))
+    entries = [(f"{number:0{width}d}-{name}.{EXTENSIONS[fmt]}", name, sql)
+               for number, (name, sql) in enumerate(jobs, 1)]
+    writes = [number for number, (_, _, sql) in enumerate(entries) if not is_read_only(sql)]
+    if writes and snapshot:
+        print(f"  FAILED  {entries[writes[0]][0]:<40} the script writes, which a snapshot cannot take; rerun with --live")
+        return len(writes)
+    # reads before the first write | writes and the reads between them | reads after the last write
+    first, last = (writes[0], writes[-1] + 1) if writes else (len(entries), len(entries))
+    leading, ordered, trailing = entries[:first], entries[first:last], entries[last:]
+
+    def stale_reports(phase):
+        return [] if snapshot else sorted(
+            {name for _, name, sql in phase if name in REPORTS and sql == materialized_query(name)})
+
+    def refresh(conn, names):
+        for name in names:
+            if ensure_fresh(conn, name, max_staleness=0):
+                print(f"  refreshed report {name}")
+
+    def report(output, elapsed, count=None, error=None):
+        if error is None:
+            print(f"  ok      {output:<40} {count:>8} rows {elapsed * 1000:>9.1f} ms")
+        else:
+            print(f"  FAILED  {output:<40} {error}")
+
+    def write_result(cursor, output):
+        with open(os.path.join(output_dir, output), 'w', newline='', encoding='utf-8') as out:
+            if cursor.description is None:
+                return write_rows(['changes'], [[(cursor.rowcount,)]], fmt, out)
+            column_names = [description[0] for description in cursor.description]
+            return write_rows(column_names, iter_batches(cursor, batch_size=batch_size), fmt, out)
+
+    def run_reads(phase):
+        local = threading.local()
+        opened = []
+
+        def run_read(sql, output):
+            started = time.perf_counter()
+            if not hasattr(local, 'conn'):
+                local.conn = connect(database, read_only=True)
+                opened.append(local.conn)
+            query, _ = paged_query(sql, limit, offset)
+            cursor = local.conn.execute(query)
+            try:
+                return write_result(cursor, output), time.perf_counter() - started
+            finally:
+                cursor.close()
+
+        failed = 0
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [(output, pool.submit(run_read, sql, output)) for output, _, sql in phase]
+            for output, future in futures:
+                try:
+                    count, elapsed = future.result()
+                    report(output, elapsed, count)
+                except Exception as e:
+                    report(output, 0, error=e)
+                    failed += 1
+        for conn in opened:
+            conn.close()
+        return failed
+
+    if stale_reports(leading):
+        with closing(connect(database)) as conn:
+            conn.isolation_level = None
+            conn.execute("BEGIN IMMEDIATE")
+            refresh(conn, stale_reports(leading))
+            conn.execute("COMMIT")
+    failed = run_reads(leading)
+
+    if ordered or stale_reports(trailing):
+        with closing(connect(database)) as conn:
+            conn.isolation_level = None
+            conn.execute("BEGIN IMMEDIATE")
+            for output, name, sql in ordered:
+                started = time.perf_counter()
+                read = is_read_only(sql)
+                try:
+                    if read:
+                        refresh(conn, stale_reports([(output, name, sql)]))
+                        sql, _ = paged_query(sql, limit, offset)
+                    count = write_result(conn.execute(sql), output)
+                    report(output, time.perf_counter() - started, count)
+                except Exception as e:
+                    if read:
+                        report(output, 0, error=e)
+                        failed += 1
+                        continue
+                    conn.execute("ROLLBACK")
+                    report(output, 0, error=f"{e} (transaction rolled back)")
+                    return failed + 1
+            refresh(conn, stale_reports(trailing))
+            conn.execute("COMMIT")
+
+    return failed + run_reads(trailing)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run SQL against the school database")
+    parser.add_argument('query', nargs='*', help="SQL query or quick command (omit for interactive mode)")
+    parser.add_argument('--db', help="SQLite database file to use instead of the latest snapshot")
+    parser.add_argument('--live', action='store_true', help="use the live school.db instead of the latest snapshot")
+    parser.add_argument('--limit', type=int, help="return at most this many rows")
+    parser.add_argument('--offset', type=int, default=0, help="skip this many rows first")
+    parser.add_argument('--format', choices=FORMATS, default='table', help="output format (default: table)")
+    parser.add_argument('--batch-size', type=int, default=FETCH_SIZE, help="rows fetched per batch (default: 500)")
+    parser.add_argument('--timer', action='store_true', help="show execution time and rows per second")
+    parser.add_argument('--refresh', action='store_true', help="recompute a stale materialized report before showing it")
+    parser.add_argument('--script', help="run the statements and quick commands in this file ('-' for stdin)")
+    parser.add_argument('--output-dir', default='results', help="where --script writes one file per result (default: results)")
+    parser.add_argument('--jobs', type=int, default=4, help="read-only queries run at once in --script mode (default: 4)")
+    args = parser.parse_args()
+    # recomputing a report writes it, so --refresh needs the live database
+    database = choose_database(args.db, args.live or args.refresh)
+    options = dict(limit=args.limit, offset=args.offset, fmt=args.format, database=database,
+                   batch_size=args.batch_size, timer=args.timer)
+
+    if args.script:
+        # Batch mode: one process for the whole script
+        print(f"Running {args.script} into {args.output_dir}/")
+        failed = run_script(args.script, args.output_dir, args.jobs, args.format, database, args.batch_size,
+                            args.limit, args.offset)
+        sys.exit(1 if failed else 0)
+    elif args.query:
         # Run query or command from command line
-        command = " ".join(sys.argv[1:])
-        if command.lower() in ['students_by_grade', 'teachers_by_subject', 'courses_with_teachers', 'recent_students', 'teacher_workload', 'student_stats', 'course_stats', 'all_data']:
-            execute_quick_command(command)
+        command = " ".join(args.query)
+        if command.lower() in QUICK_COMMANDS:
+            execute_quick_command(command, refresh=args.refresh, **options)
         else:
-            run_sql_query(command)
+            run_sql_query(command, **options)
     else:
         # Interactive mode
-        interactive_mode()
+        interactive_mode(**options)
+
+if __name__ == "__main__":
+    main()
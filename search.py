@@ -0,0 +1,130 @@
+"""
+Full-text search over students, teachers and courses.
+
+A single FTS5 table, search_index, holds one row per student, teacher and
+course. Its rowid encodes the entity and id (id * 4 + kind), which lets the
+triggers below find and replace a row directly whenever the base tables
+change, so the index is always in sync with create, update, delete and bulk
+writes.
+"""
+
+import re
+
+KINDS = {'student': 1, 'teacher': 2, 'course': 3}
+
+SEARCH_TABLE = """CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+    kind UNINDEXED, name, detail, tags,
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3 4'
+)"""
+
+# entity -> (table, detail expression, tags expression), written in terms of a row alias
+_SOURCES = {
+    'student': ('student', '{row}.email', '{row}.grade'),
+    'teacher': ('teacher', '{row}.email', '{row}.subject'),
+    'course': ('course', "COALESCE({row}.description, '')", "''"),
+}
+
+_WATCHED_COLUMNS = {
+    'student': 'name, email, grade',
+    'teacher': 'name, email, subject',
+    'course': 'name, description',
+}
+
+
+def _insert_sql(kind, row):
+    table, detail, tags = _SOURCES[kind]
+    return (
+        f"INSERT INTO search_index (rowid, kind, name, detail, tags) VALUES "
+        f"({row}.id * 4 + {KINDS[kind]}, '{kind}', {row}.name, "
+        f"{detail.format(row=row)}, {tags.format(row=row)});"
+    )
+
+
+def _delete_sql(kind, row):
+    return f"DELETE FROM search_index WHERE rowid = {row}.id * 4 + {KINDS[kind]};"
+
+
+TRIGGERS = []
+for _kind, (_table, _, _) in _SOURCES.items():
+    TRIGGERS += [
+        f"CREATE TRIGGER IF NOT EXISTS search_{_table}_insert AFTER INSERT ON {_table} BEGIN "
+        f"{_insert_sql(_kind, 'NEW')} END",
+        f"CREATE TRIGGER IF NOT EXISTS search_{_table}_delete AFTER DELETE ON {_table} BEGIN "
+        f"{_delete_sql(_kind, 'OLD')} END",
+        f"CREATE TRIGGER IF NOT EXISTS search_{_table}_update AFTER UPDATE OF {_WATCHED_COLUMNS[_kind]} ON {_table} BEGIN "
+        f"{_delete_sql(_kind, 'OLD')} {_insert_sql(_kind, 'NEW')} END",
+    ]
+
+
+def install_search(connection, rebuild=False):
+    """Create the search index and its triggers on a SQLAlchemy connection"""
+    connection.exec_driver_sql(SEARCH_TABLE)
+    for statement in TRIGGERS:
+        connection.exec_driver_sql(statement)
+    if rebuild:
+        rebuild_search(connection)
+
+
+def rebuild_search(connection):
+    """Repopulate the search index from the base tables"""
+    connection.exec_driver_sql("DELETE FROM search_index")
+    for kind, (table, detail, tags) in _SOURCES.items():
+        connection.exec_driver_sql(
+            f"INSERT INTO search_index (rowid, kind, name, detail, tags) "
+            f"SELECT id * 4 + {KINDS[kind]}, '{kind}', name, {detail.format(row=table)}, {tags.format(row=table)} "
+            f"FROM {table}"
+        )
+    connection.exec_driver_sql("INSERT INTO search_index (search_index) VALUES ('optimize')")
+
+
+def match_expression(text):
+    """Turn free text into an FTS5 query where every word must match as a prefix"""
+    words = re.findall(r'\w+', text, re.UNICODE)
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+# Ranking with bm25 costs time proportional to the number of matches, so very broad
+# queries (the first keystrokes of search-as-you-type) skip it: they return name
+# matches first, then matches in the other columns, in index order.
+MAX_RANKED_MATCHES = 1000
+
+
+def search(connection, text, kind=None, limit=20):
+    expression = match_expression(text)
+    if not expression:
+        return []
+    where = "search_index MATCH ?"
+    parameters = []
+    if kind:
+        where += " AND kind = ?"
+        parameters.append(kind)
+
+    def run(sql, match, *extra):
+        return connection.exec_driver_sql(sql, (match, *parameters, *extra)).all()
+
+    matches = run(
+        f"SELECT COUNT(*) FROM (SELECT rowid FROM search_index WHERE {where} LIMIT ?)",
+        expression, MAX_RANKED_MATCHES + 1,
+    )[0][0]
+    if matches <= MAX_RANKED_MATCHES:
+        rows = run(
+            f"SELECT kind, rowid / 4 AS id, name, detail FROM search_index WHERE {where} "
+            f"ORDER BY bm25(search_index, 0.0, 10.0, 2.0, 1.0) LIMIT ?",
+            expression, limit,
+        )
+    else:
+        rows = run(
+            f"SELECT kind, rowid / 4 AS id, name, detail FROM search_index WHERE {where} LIMIT ?",
+            f"name : ({expression})", limit,
+        )
+        if len(rows) < limit:
+            seen = {(row.kind, row.id) for row in rows}
+            rows += [
+                row for row in run(
+                    f"SELECT kind, rowid / 4 AS id, name, detail FROM search_index WHERE {where} LIMIT ?",
+                    expression, limit + len(rows),
+                )
+                if (row.kind, row.id) not in seen
+            ][:limit - len(rows)]
+    return [{'type': row.kind, 'id': row.id, 'name': row.name, 'detail': row.detail} for row in rows]
@@ -0,0 +1,46 @@
+"""
+Fast serialization path for list and export responses.
+
+Instead of loading ORM instances and calling to_dict() on each, the list
+endpoints select plain column tuples whose values are already JSON-ready:
+SQLite stores dates and datetimes as ISO-like text, so they are returned as
+strings without being parsed into Python objects and formatted again. The
+resulting dicts are encoded with orjson when it is installed, falling back
+to the standard library json module.
+"""
+
+import json
+
+from sqlalchemy import Date, DateTime, String, case, func, type_coerce
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+JSON_BACKEND = 'orjson' if orjson else 'json'
+
+
+def json_column(column, name=None):
+    """Select ``column`` labelled ``name`` with dates and datetimes as ISO 8601 text"""
+    name = name or column.name
+    if isinstance(column.type, DateTime):
+        # stored as 'YYYY-MM-DD HH:MM:SS.ffffff'; like datetime.isoformat() in to_dict(),
+        # leave the fraction out when it is zero
+        text = func.replace(type_coerce(column, String), ' ', 'T')
+        return case((func.substr(text, -7) == '.000000', func.substr(text, 1, func.length(text) - 7)),
+                    else_=text).label(name)
+    if isinstance(column.type, Date):
+        return type_coerce(column, String).label(name)
+    return column.label(name)
+
+
+def rows_to_dicts(names, rows):
+    return [dict(zip(names, row)) for row in rows]
+
+
+def dumps(data):
+    """Encode ``data`` as compact JSON bytes"""
+    if orjson:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(',', ':')).encode()
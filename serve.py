@@ -0,0 +1,239 @@
+"""
+Production server for the School Management API.
+
+The master process imports the app and brings the database schema up to date
+once, then forks worker processes that share one listening socket. Each
+worker fills its connection pool and response cache before it starts
+accepting requests, and /api/ready reports ready only after that.
+
+    python serve.py --workers 4 --port 5000
+
+Signals (sent to the master):
+    SIGHUP          graceful reload: the master re-executes itself (picking up
+                    new code), starts a fresh set of workers on the same socket,
+                    and stops the old ones once the new ones are ready
+    SIGTERM/SIGINT  graceful shutdown: workers finish in-flight requests, then exit
+
+Workers that die are restarted. On platforms without fork (Windows) the server
+runs as a single multi-threaded process.
+"""
+
+import argparse
+import os
+import select
+import signal
+import socket
+import sys
+import threading
+import time
+
+# serve.py is the production entry point, so default to the production database profile
+os.environ.setdefault('SCHOOL_DB_PROFILE', 'production')
+
+from werkzeug.serving import make_server  # noqa: E402
+
+from app import app, app_ready, apply_migrations, db, event_bus  # noqa: E402
+
+DEFAULT_WARMUP_PATHS = '/api/stats,/api/students?limit=50,/api/teachers?limit=50,/api/courses?limit=50'
+
+
+def log(message):
+    print(f"[{os.getpid()}] {message}", file=sys.stderr, flush=True)
+
+
+def listening_socket(host, port, backlog):
+    inherited = os.environ.pop('SCHOOL_LISTEN_FD', None)
+    if inherited:
+        sock = socket.socket(fileno=int(inherited))
+    else:
+        sock = socket.socket(socket.AF_INET6 if ':' in host else socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((host, port))
+        sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def warm_up(paths):
+    """Open every pooled connection and prime the response cache, then mark the app ready"""
+    with app.app_context():
+        pool = db.engine.pool
+        size = pool.size() if hasattr(pool, 'size') else 1
+        connections = [db.engine.connect() for _ in range(size)]
+        for connection in connections:
+            connection.exec_driver_sql("SELECT 1")
+        for connection in connections:
+            connection.close()
+    client = app.test_client()
+    for path in paths:
+        client.get(path)
+    app_ready.set()
+
+
+def serve(sock, host, port, warmup_paths, ready_fd=None):
+    """Run one worker: warm up, then serve on ``sock`` until SIGTERM/SIGINT"""
+    server = make_server(host, port, app, threaded=True, fd=sock.fileno())
+    # let in-flight requests finish on shutdown instead of being killed with the process
+    server.daemon_threads = False
+    server.block_on_close = True
+
+    def stop(signum, frame):
+        # open event streams would otherwise keep the server from finishing in-flight requests
+        event_bus.close()
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    if hasattr(signal, 'SIGHUP'):
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+
+    warm_up(warmup_paths)
+    if ready_fd is not None:
+        os.write(ready_fd, b'1')
+        os.close(ready_fd)
+    log("worker ready")
+    server.serve_forever()
+    server.server_close()
+    log("worker stopped")
+
+
+class Master:
+    def __init__(self, args, sock):
+        self.args = args
+        self.sock = sock
+        self.workers = {}       # pid -> readiness pipe read end, or None once ready
+        self.draining = set()   # old workers left over from before a reload
+        self.stopping = False
+        self.reloading = False
+
+    def spawn(self):
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            # the parent's pooled connections must not be shared with the child
+            with app.app_context():
+                db.engine.dispose(close=False)
+            try:
+                serve(self.sock, self.args.host, self.args.port, self.args.warmup_paths, write_fd)
+            finally:
+                os._exit(0)
+        os.close(write_fd)
+        self.workers[pid] = read_fd
+        return pid
+
+    def wait_ready(self, timeout):
+        deadline = time.monotonic() + timeout
+        while any(fd is not None for fd in self.workers.values()) and time.monotonic() < deadline:
+            pending = {fd: pid for pid, fd in self.workers.items() if fd is not None}
+            readable, _, _ = select.select(list(pending), [], [], 0.5)
+            for fd in readable:
+                os.read(fd, 1)
+                os.close(fd)
+                self.workers[pending[fd]] = None
+            self.reap()
+
+    def reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            if pid in self.draining:
+                self.draining.discard(pid)
+                continue
+            fd = self.workers.pop(pid, None)
+            if fd is not None:
+                os.close(fd)
+            if not self.stopping and not self.reloading:
+                log(f"worker {pid} exited with status {status}; restarting")
+                self.spawn()
+
+    def signal_all(self, pids, signum):
+        for pid in pids:
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    def reload(self):
+        """Re-execute the master with new code, keeping the socket and draining current workers"""
+        log("reloading")
+        os.environ['SCHOOL_LISTEN_FD'] = str(self.sock.fileno())
+        os.environ['SCHOOL_DRAIN_PIDS'] = ','.join(str(pid) for pid in list(self.workers) + list(self.draining))
+        for fd in self.workers.values():
+            if fd is not None:
+                os.close(fd)
+        os.execv(sys.executable, [sys.executable] + sys.argv)
+
+    def run(self):
+        def on_stop(signum, frame):
+            self.stopping = True
+
+        def on_reload(signum, frame):
+            self.reloading = True
+
+        signal.signal(signal.SIGTERM, on_stop)
+        signal.signal(signal.SIGINT, on_stop)
+        signal.signal(signal.SIGHUP, on_reload)
+
+        drain = os.environ.pop('SCHOOL_DRAIN_PIDS', '')
+        self.draining = {int(pid) for pid in drain.split(',') if pid}
+
+        for _ in range(self.args.workers):
+            self.spawn()
+        self.wait_ready(self.args.ready_timeout)
+        log(f"serving on {self.args.host}:{self.args.port} with {len(self.workers)} workers")
+        if self.draining:
+            # the new workers are serving; let the previous generation finish and exit
+            self.signal_all(self.draining, signal.SIGTERM)
+
+        while not self.stopping:
+            if self.reloading:
+                self.reload()
+            if any(fd is not None for fd in self.workers.values()):
+                self.wait_ready(0.5)
+            else:
+                time.sleep(0.5)
+            self.reap()
+
+        log("shutting down")
+        self.signal_all(list(self.workers) + list(self.draining), signal.SIGTERM)
+        deadline = time.monotonic() + self.args.graceful_timeout
+        while (self.workers or self.draining) and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.1)
+        self.signal_all(list(self.workers) + list(self.draining), signal.SIGKILL)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default=os.environ.get('SCHOOL_HOST', '127.0.0.1'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('SCHOOL_PORT', '5000')))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('SCHOOL_WORKERS', os.cpu_count() or 2)))
+    parser.add_argument('--backlog', type=int, default=2048)
+    parser.add_argument('--warmup-paths', default=os.environ.get('SCHOOL_WARMUP_PATHS', DEFAULT_WARMUP_PATHS),
+                        help='comma-separated GET paths requested by each worker before it reports ready')
+    parser.add_argument('--ready-timeout', type=float, default=60, help='seconds to wait for workers to warm up')
+    parser.add_argument('--graceful-timeout', type=float, default=30,
+                        help='seconds workers get to finish in-flight requests on shutdown')
+    args = parser.parse_args()
+    args.warmup_paths = [path for path in args.warmup_paths.split(',') if path]
+
+    # preload: the schema is created and migrated once, before any worker starts
+    with app.app_context():
+        apply_migrations()
+        db.engine.dispose()
+
+    sock = listening_socket(args.host, args.port, args.backlog)
+    if not hasattr(os, 'fork'):
+        log(f"serving on {args.host}:{args.port} (single process)")
+        serve(sock, args.host, args.port, args.warmup_paths)
+        return
+    Master(args, sock).run()
+
+
+if __name__ == '__main__':
+    main()
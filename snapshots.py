@@ -0,0 +1,104 @@
+"""
+Point-in-time snapshots of school.db for ad-hoc SQL and analytics.
+
+A snapshot is a copy made with SQLite's online backup API into
+snapshots/school-<UTC timestamp>.db. run_sql.py and view_database.py read the
+latest snapshot by default, opened read-only and immutable, so heavy queries
+there take no locks on the live database and never hold up the API's writes.
+
+Usage:
+    python snapshots.py take                  # take one snapshot now
+    python snapshots.py take --every 900      # keep taking one every 15 minutes
+    python snapshots.py list
+    python snapshots.py take --keep 5 --db other.db --dir /var/backups/school
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime
+
+DATABASE = 'school.db'
+SNAPSHOT_DIR = os.environ.get('SCHOOL_SNAPSHOT_DIR', 'snapshots')
+KEEP = 3
+# pages copied per backup step when the source is not in WAL mode; between steps
+# the source is unlocked, so writers are never held up for a whole copy
+STEP_PAGES = 1024
+
+
+def snapshot_paths(directory=SNAPSHOT_DIR):
+    """Snapshots in ``directory``, oldest first"""
+    if not os.path.isdir(directory):
+        return []
+    return [os.path.join(directory, name) for name in sorted(os.listdir(directory))
+            if name.startswith('school-') and name.endswith('.db')]
+
+
+def latest_snapshot(directory=SNAPSHOT_DIR):
+    paths = snapshot_paths(directory)
+    return paths[-1] if paths else None
+
+
+def take_snapshot(database=DATABASE, directory=SNAPSHOT_DIR, keep=KEEP):
+    """Copy ``database`` into a new snapshot and delete all but the newest ``keep``. Returns its path."""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"school-{datetime.utcnow():%Y%m%dT%H%M%S%f}.db")
+    partial = path + '.partial'
+    source = sqlite3.connect(database)
+    target = sqlite3.connect(partial)
+    try:
+        # in WAL mode one step reads a consistent snapshot without blocking writers;
+        # otherwise copy in steps so writers can commit in between
+        wal = source.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+        source.backup(target, pages=-1 if wal else STEP_PAGES, sleep=0.005)
+        # snapshots are opened immutable, so they must not need a -wal file
+        target.execute("PRAGMA journal_mode=DELETE")
+    finally:
+        target.close()
+        source.close()
+    # readers only ever see complete snapshots
+    os.replace(partial, path)
+    for old in snapshot_paths(directory)[:-keep] if keep > 0 else []:
+        os.remove(old)
+    return path
+
+
+def snapshot_uri(path):
+    """URI that opens a snapshot read-only; immutable skips locking, as nothing writes to it"""
+    return f"file:{os.path.abspath(path)}?mode=ro&immutable=1"
+
+
+def describe(path):
+    taken = datetime.strptime(os.path.basename(path)[len('school-'):-len('.db')], '%Y%m%dT%H%M%S%f')
+    age = (datetime.utcnow() - taken).total_seconds()
+    return f"{path}  taken {taken:%Y-%m-%d %H:%M:%S} UTC ({age / 60:.0f} min ago), {os.path.getsize(path) / 1e6:.1f} MB"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Point-in-time snapshots of the school database")
+    parser.add_argument('command', nargs='?', default='take', choices=['take', 'list'])
+    parser.add_argument('--db', default=DATABASE, help="database to snapshot (default: school.db)")
+    parser.add_argument('--dir', default=SNAPSHOT_DIR, help="snapshot directory (default: snapshots, or SCHOOL_SNAPSHOT_DIR)")
+    parser.add_argument('--keep', type=int, default=KEEP, help="snapshots to keep (default: 3; 0 keeps all)")
+    parser.add_argument('--every', type=float, help="keep taking a snapshot every this many seconds")
+    args = parser.parse_args()
+
+    if args.command == 'list':
+        for path in snapshot_paths(args.dir):
+            print(describe(path))
+        return
+    if not os.path.exists(args.db):
+        sys.exit(f"No database at {args.db}")
+    while True:
+        started = time.monotonic()
+        path = take_snapshot(args.db, args.dir, args.keep)
+        print(f"Snapshot {path} taken in {time.monotonic() - started:.2f}s", flush=True)
+        if not args.every:
+            return
+        time.sleep(max(0, args.every - (time.monotonic() - started)))
+
+
+if __name__ == '__main__':
+    main()
@@ -24,16 +24,13 @@ function MainApp() {
 
   const fetchStats = async () => {
     try {
-      const [studentsRes, teachersRes, coursesRes] = await Promise.all([
-        axios.get('/api/students'),
-        axios.get('/api/teachers'),
-        axios.get('/api/courses')
-      ]);
-      
+      const response = await axios.get('/api/stats');
+      const { totals } = response.data;
+
       setStats({
-        students: studentsRes.data.length,
-        teachers: teachersRes.data.length,
-        courses: coursesRes.data.length
+        students: totals.students,
+        teachers: totals.teachers,
+        courses: totals.courses
       });
     } catch (error) {
       console.error('Error fetching stats:', error);
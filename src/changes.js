@@ -0,0 +1,50 @@
+import axios from 'axios';
+
+// Fetch the changes to /api/<entity> made after revision `since`, oldest first. Resolves
+// to { changes, revision } with the revision to sync from next time, or to null when
+// changes that old are no longer kept and the list must be reloaded.
+export const fetchChanges = async (entity, since) => {
+  const changes = [];
+  let revision = since;
+  let more = true;
+  while (more) {
+    let response;
+    try {
+      response = await axios.get(`/api/${entity}/changes`, { params: { since: revision } });
+    } catch (error) {
+      if (error.response && error.response.status === 410) {
+        return null;
+      }
+      throw error;
+    }
+    changes.push(...response.data.changes);
+    revision = response.data.revision;
+    more = response.data.more;
+  }
+  return { changes, revision };
+};
+
+// Apply changes, from /changes or /api/events, to rows kept in id order
+export const applyChanges = (rows, changes) => {
+  const byId = new Map(rows.map((row) => [row.id, row]));
+  changes.forEach((change) => {
+    if (change.op === 'delete') {
+      byId.delete(change.id);
+    } else {
+      byId.set(change.id, change.row);
+    }
+  });
+  return [...byId.values()].sort((a, b) => a.id - b.id);
+};
+
+// Listen for live changes to /api/<entity>. onChange gets each change as it happens.
+// onConnect is called each time the stream (re)connects, including after the server
+// dropped it for falling behind, so the caller can catch up on what it missed with
+// fetchChanges. Returns a function that closes the stream.
+export const subscribeChanges = (entity, { onChange, onConnect }) => {
+  const source = new EventSource(`/api/events?entities=${entity}`);
+  const handleChange = (event) => onChange(JSON.parse(event.data));
+  source.addEventListener('ready', onConnect);
+  ['create', 'update', 'delete'].forEach((op) => source.addEventListener(op, handleChange));
+  return () => source.close();
+};
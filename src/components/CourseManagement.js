@@ -1,8 +1,13 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import axios from 'axios';
+import { applyChanges, fetchChanges, subscribeChanges } from '../changes';
 
 const CourseManagement = ({ onDataChange }) => {
   const [courses, setCourses] = useState([]);
+  // change log revision the list is current to (see /api/courses/changes)
+  const revision = useRef(null);
+  // set when a live change arrives before the list has loaded, so it is synced once it has
+  const missed = useRef(false);
   const [teachers, setTeachers] = useState([]);
   const [showModal, setShowModal] = useState(false);
   const [editingCourse, setEditingCourse] = useState(null);
@@ -16,17 +21,55 @@ const CourseManagement = ({ onDataChange }) => {
   useEffect(() => {
     fetchCourses();
     fetchTeachers();
+    // apply changes made by anyone, here or elsewhere, as they happen (see /api/events)
+    return subscribeChanges('courses', {
+      onChange: (change) => {
+        if (revision.current == null) {
+          missed.current = true;
+        } else if (change.revision > revision.current) {
+          revision.current = change.revision;
+          setCourses((rows) => applyChanges(rows, [change]));
+        }
+      },
+      onConnect: () => {
+        if (revision.current != null) {
+          refreshCourses();
+        }
+      }
+    });
   }, []);
 
   const fetchCourses = async () => {
     try {
       const response = await axios.get('/api/courses');
       setCourses(response.data);
+      revision.current = Number(response.headers['x-revision']);
+      if (missed.current) {
+        missed.current = false;
+        refreshCourses();
+      }
     } catch (error) {
       console.error('Error fetching courses:', error);
     }
   };
 
+  // Apply just the rows changed since the last fetch or sync, rather than reloading them all
+  const refreshCourses = async () => {
+    if (revision.current == null) {
+      return fetchCourses();
+    }
+    try {
+      const fetched = await fetchChanges('courses', revision.current);
+      if (!fetched) {
+        return fetchCourses();
+      }
+      revision.current = Math.max(revision.current, fetched.revision);
+      setCourses((rows) => applyChanges(rows, fetched.changes));
+    } catch (error) {
+      console.error('Error syncing courses:', error);
+    }
+  };
+
   const fetchTeachers = async () => {
     try {
       const response = await axios.get('/api/teachers');
@@ -47,17 +90,27 @@ const CourseManagement = ({ onDataChange }) => {
     e.preventDefault();
     try {
       if (editingCourse) {
-        await axios.put(`/api/courses/${editingCourse.id}`, formData);
+        // If-Match: the save is rejected with 409 if someone else changed the course meanwhile
+        await axios.put(`/api/courses/${editingCourse.id}`, formData, {
+          headers: { 'If-Match': String(editingCourse.version) }
+        });
       } else {
         await axios.post('/api/courses', formData);
       }
-      fetchCourses();
+      refreshCourses();
       onDataChange();
       resetForm();
       setShowModal(false);
     } catch (error) {
       console.error('Error saving course:', error);
-      alert('Error saving course. Please try again.');
+      if (error.response && error.response.status === 409) {
+        alert('This course was changed by someone else. The list has been reloaded; please make your edit again.');
+        refreshCourses();
+        resetForm();
+        setShowModal(false);
+      } else {
+        alert('Error saving course. Please try again.');
+      }
     }
   };
 
@@ -76,7 +129,7 @@ const CourseManagement = ({ onDataChange }) => {
     if (window.confirm('Are you sure you want to delete this course?')) {
       try {
         await axios.delete(`/api/courses/${courseId}`);
-        fetchCourses();
+        refreshCourses();
         onDataChange();
       } catch (error) {
         console.error('Error deleting course:', error);
@@ -15,14 +15,11 @@ const DatabaseViewer = () => {
   const fetchAllData = async () => {
     setLoading(true);
     try {
-      const [studentsRes, teachersRes, coursesRes] = await Promise.all([
-        axios.get('/api/students'),
-        axios.get('/api/teachers'),
-        axios.get('/api/courses')
-      ]);
-      setStudents(studentsRes.data);
-      setTeachers(teachersRes.data);
-      setCourses(coursesRes.data);
+      const response = await axios.get('/api/snapshot');
+      const { students, teachers, courses } = response.data;
+      setStudents(students);
+      setTeachers(teachers);
+      setCourses(courses);
     } catch (error) {
       console.error('Error fetching data:', error);
     }
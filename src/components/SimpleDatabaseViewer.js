@@ -19,21 +19,14 @@ const SimpleDatabaseViewer = () => {
       
       console.log('Fetching data...');
       
-      const [studentsRes, teachersRes, coursesRes] = await Promise.all([
-        axios.get('/api/students'),
-        axios.get('/api/teachers'),
-        axios.get('/api/courses')
-      ]);
+      const response = await axios.get('/api/snapshot');
+      const { students, teachers, courses } = response.data;
       
-      console.log('API Responses:', {
-        students: studentsRes.data,
-        teachers: teachersRes.data,
-        courses: coursesRes.data
-      });
+      console.log('API Response:', response.data);
       
-      setStudents(studentsRes.data);
-      setTeachers(teachersRes.data);
-      setCourses(coursesRes.data);
+      setStudents(students);
+      setTeachers(teachers);
+      setCourses(courses);
       
     } catch (err) {
       console.error('Error fetching data:', err);
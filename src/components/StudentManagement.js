@@ -1,8 +1,13 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import axios from 'axios';
+import { applyChanges, fetchChanges, subscribeChanges } from '../changes';
 
 const StudentManagement = ({ onDataChange }) => {
   const [students, setStudents] = useState([]);
+  // change log revision the list is current to (see /api/students/changes)
+  const revision = useRef(null);
+  // set when a live change arrives before the list has loaded, so it is synced once it has
+  const missed = useRef(false);
   const [showModal, setShowModal] = useState(false);
   const [editingStudent, setEditingStudent] = useState(null);
   const [formData, setFormData] = useState({
@@ -15,6 +20,22 @@ const StudentManagement = ({ onDataChange }) => {
 
   useEffect(() => {
     fetchStudents();
+    // apply changes made by anyone, here or elsewhere, as they happen (see /api/events)
+    return subscribeChanges('students', {
+      onChange: (change) => {
+        if (revision.current == null) {
+          missed.current = true;
+        } else if (change.revision > revision.current) {
+          revision.current = change.revision;
+          setStudents((rows) => applyChanges(rows, [change]));
+        }
+      },
+      onConnect: () => {
+        if (revision.current != null) {
+          refreshStudents();
+        }
+      }
+    });
   }, []);
 
   const fetchStudents = async () => {
@@ -23,11 +44,33 @@ const StudentManagement = ({ onDataChange }) => {
       const response = await axios.get('/api/students');
       console.log('Students response:', response.data);
       setStudents(response.data);
+      revision.current = Number(response.headers['x-revision']);
+      if (missed.current) {
+        missed.current = false;
+        refreshStudents();
+      }
     } catch (error) {
       console.error('Error fetching students:', error);
     }
   };
 
+  // Apply just the rows changed since the last fetch or sync, rather than reloading them all
+  const refreshStudents = async () => {
+    if (revision.current == null) {
+      return fetchStudents();
+    }
+    try {
+      const fetched = await fetchChanges('students', revision.current);
+      if (!fetched) {
+        return fetchStudents();
+      }
+      revision.current = Math.max(revision.current, fetched.revision);
+      setStudents((rows) => applyChanges(rows, fetched.changes));
+    } catch (error) {
+      console.error('Error syncing students:', error);
+    }
+  };
+
   const handleInputChange = (e) => {
     setFormData({
       ...formData,
@@ -39,17 +82,27 @@ const StudentManagement = ({ onDataChange }) => {
     e.preventDefault();
     try {
       if (editingStudent) {
-        await axios.put(`/api/students/${editingStudent.id}`, formData);
+        // If-Match: the save is rejected with 409 if someone else changed the student meanwhile
+        await axios.put(`/api/students/${editingStudent.id}`, formData, {
+          headers: { 'If-Match': String(editingStudent.version) }
+        });
       } else {
         await axios.post('/api/students', formData);
       }
-      fetchStudents();
+      refreshStudents();
       onDataChange();
       resetForm();
       setShowModal(false);
     } catch (error) {
       console.error('Error saving student:', error);
-      alert('Error saving student. Please try again.');
+      if (error.response && error.response.status === 409) {
+        alert('This student was changed by someone else. The list has been reloaded; please make your edit again.');
+        refreshStudents();
+        resetForm();
+        setShowModal(false);
+      } else {
+        alert('Error saving student. Please try again.');
+      }
     }
   };
 
@@ -69,7 +122,7 @@ const StudentManagement = ({ onDataChange }) => {
     if (window.confirm('Are you sure you want to delete this student?')) {
       try {
         await axios.delete(`/api/students/${studentId}`);
-        fetchStudents();
+        refreshStudents();
         onDataChange();
       } catch (error) {
         console.error('Error deleting student:', error);
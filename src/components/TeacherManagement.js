@@ -1,8 +1,13 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import axios from 'axios';
+import { applyChanges, fetchChanges, subscribeChanges } from '../changes';
 
 const TeacherManagement = ({ onDataChange }) => {
   const [teachers, setTeachers] = useState([]);
+  // change log revision the list is current to (see /api/teachers/changes)
+  const revision = useRef(null);
+  // set when a live change arrives before the list has loaded, so it is synced once it has
+  const missed = useRef(false);
   const [showModal, setShowModal] = useState(false);
   const [editingTeacher, setEditingTeacher] = useState(null);
   const [formData, setFormData] = useState({
@@ -15,17 +20,55 @@ const TeacherManagement = ({ onDataChange }) => {
 
   useEffect(() => {
     fetchTeachers();
+    // apply changes made by anyone, here or elsewhere, as they happen (see /api/events)
+    return subscribeChanges('teachers', {
+      onChange: (change) => {
+        if (revision.current == null) {
+          missed.current = true;
+        } else if (change.revision > revision.current) {
+          revision.current = change.revision;
+          setTeachers((rows) => applyChanges(rows, [change]));
+        }
+      },
+      onConnect: () => {
+        if (revision.current != null) {
+          refreshTeachers();
+        }
+      }
+    });
   }, []);
 
   const fetchTeachers = async () => {
     try {
       const response = await axios.get('/api/teachers');
       setTeachers(response.data);
+      revision.current = Number(response.headers['x-revision']);
+      if (missed.current) {
+        missed.current = false;
+        refreshTeachers();
+      }
     } catch (error) {
       console.error('Error fetching teachers:', error);
     }
   };
 
+  // Apply just the rows changed since the last fetch or sync, rather than reloading them all
+  const refreshTeachers = async () => {
+    if (revision.current == null) {
+      return fetchTeachers();
+    }
+    try {
+      const fetched = await fetchChanges('teachers', revision.current);
+      if (!fetched) {
+        return fetchTeachers();
+      }
+      revision.current = Math.max(revision.current, fetched.revision);
+      setTeachers((rows) => applyChanges(rows, fetched.changes));
+    } catch (error) {
+      console.error('Error syncing teachers:', error);
+    }
+  };
+
   const handleInputChange = (e) => {
     setFormData({
       ...formData,
@@ -37,17 +80,27 @@ const TeacherManagement = ({ onDataChange }) => {
     e.preventDefault();
     try {
       if (editingTeacher) {
-        await axios.put(`/api/teachers/${editingTeacher.id}`, formData);
+        // If-Match: the save is rejected with 409 if someone else changed the teacher meanwhile
+        await axios.put(`/api/teachers/${editingTeacher.id}`, formData, {
+          headers: { 'If-Match': String(editingTeacher.version) }
+        });
       } else {
         await axios.post('/api/teachers', formData);
       }
-      fetchTeachers();
+      refreshTeachers();
       onDataChange();
       resetForm();
       setShowModal(false);
     } catch (error) {
       console.error('Error saving teacher:', error);
-      alert('Error saving teacher. Please try again.');
+      if (error.response && error.response.status === 409) {
+        alert('This teacher was changed by someone else. The list has been reloaded; please make your edit again.');
+        refreshTeachers();
+        resetForm();
+        setShowModal(false);
+      } else {
+        alert('Error saving teacher. Please try again.');
+      }
     }
   };
 
@@ -67,11 +120,15 @@ const TeacherManagement = ({ onDataChange }) => {
     if (window.confirm('Are you sure you want to delete this teacher?')) {
       try {
         await axios.delete(`/api/teachers/${teacherId}`);
-        fetchTeachers();
+        refreshTeachers();
         onDataChange();
       } catch (error) {
         console.error('Error deleting teacher:', error);
-        alert('Error deleting teacher. Please try again.');
+        if (error.response && error.response.status === 409) {
+          alert(error.response.data.error);
+        } else {
+          alert('Error deleting teacher. Please try again.');
+        }
       }
     }
   };
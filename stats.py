@@ -0,0 +1,173 @@
+"""
+Summary tables behind /api/stats.
+
+Counts per grade, per subject and per teacher are kept in small stats_* tables
+that SQLite triggers update on every insert, update and delete of the student,
+teacher and course tables. Reading the dashboard aggregates therefore touches
+a handful of summary rows instead of scanning the base tables.
+
+stats_course_teacher has a row for every teacher, indexed by course count, so
+the per-teacher list is read a page at a time in that order rather than sorted
+on every request; /api/stats itself does not read it.
+"""
+
+from triggers import create_triggers
+
+
+SUMMARY_TABLES = [
+    """CREATE TABLE IF NOT EXISTS stats_student_grade (
+        grade VARCHAR(10) PRIMARY KEY,
+        students INTEGER NOT NULL DEFAULT 0
+    )""",
+    """CREATE TABLE IF NOT EXISTS stats_teacher_subject (
+        subject VARCHAR(50) PRIMARY KEY,
+        teachers INTEGER NOT NULL DEFAULT 0
+    )""",
+    """CREATE TABLE IF NOT EXISTS stats_course_teacher (
+        teacher_id INTEGER PRIMARY KEY,
+        courses INTEGER NOT NULL DEFAULT 0,
+        credits INTEGER NOT NULL DEFAULT 0
+    )""",
+    "CREATE INDEX IF NOT EXISTS ix_stats_course_teacher_courses ON stats_course_teacher (courses, teacher_id)",
+    # courses and credits by their teacher's subject; courses whose teacher does not exist are not counted
+    """CREATE TABLE IF NOT EXISTS stats_course_subject (
+        subject VARCHAR(50) PRIMARY KEY,
+        courses INTEGER NOT NULL DEFAULT 0,
+        credits INTEGER NOT NULL DEFAULT 0
+    )""",
+]
+
+# (trigger name, timing/event, body)
+_TRIGGERS = [
+    ('stats_student_insert', 'AFTER INSERT ON student', """
+        INSERT INTO stats_student_grade (grade, students) VALUES (NEW.grade, 1)
+            ON CONFLICT(grade) DO UPDATE SET students = students + 1;"""),
+    ('stats_student_delete', 'AFTER DELETE ON student', """
+        UPDATE stats_student_grade SET students = students - 1 WHERE grade = OLD.grade;"""),
+    ('stats_student_update', 'AFTER UPDATE OF grade ON student WHEN OLD.grade IS NOT NEW.grade', """
+        UPDATE stats_student_grade SET students = students - 1 WHERE grade = OLD.grade;
+        INSERT INTO stats_student_grade (grade, students) VALUES (NEW.grade, 1)
+            ON CONFLICT(grade) DO UPDATE SET students = students + 1;"""),
+    ('stats_teacher_insert', 'AFTER INSERT ON teacher', """
+        INSERT INTO stats_teacher_subject (subject, teachers) VALUES (NEW.subject, 1)
+            ON CONFLICT(subject) DO UPDATE SET teachers = teachers + 1;"""),
+    ('stats_teacher_delete', 'AFTER DELETE ON teacher', """
+        UPDATE stats_teacher_subject SET teachers = teachers - 1 WHERE subject = OLD.subject;"""),
+    ('stats_teacher_update', 'AFTER UPDATE OF subject ON teacher WHEN OLD.subject IS NOT NEW.subject', """
+        UPDATE stats_teacher_subject SET teachers = teachers - 1 WHERE subject = OLD.subject;
+        INSERT INTO stats_teacher_subject (subject, teachers) VALUES (NEW.subject, 1)
+            ON CONFLICT(subject) DO UPDATE SET teachers = teachers + 1;"""),
+    ('stats_course_insert', 'AFTER INSERT ON course', """
+        INSERT INTO stats_course_teacher (teacher_id, courses, credits) VALUES (NEW.teacher_id, 1, NEW.credits)
+            ON CONFLICT(teacher_id) DO UPDATE SET courses = courses + 1, credits = credits + NEW.credits;"""),
+    ('stats_course_delete', 'AFTER DELETE ON course', """
+        UPDATE stats_course_teacher SET courses = courses - 1, credits = credits - OLD.credits
+            WHERE teacher_id = OLD.teacher_id;"""),
+    ('stats_course_update', 'AFTER UPDATE OF teacher_id, credits ON course', """
+        UPDATE stats_course_teacher SET courses = courses - 1, credits = credits - OLD.credits
+            WHERE teacher_id = OLD.teacher_id;
+        INSERT INTO stats_course_teacher (teacher_id, courses, credits) VALUES (NEW.teacher_id, 1, NEW.credits)
+            ON CONFLICT(teacher_id) DO UPDATE SET courses = courses + 1, credits = credits + NEW.credits;"""),
+    ('stats_teacher_courses_insert', 'AFTER INSERT ON teacher', """
+        INSERT INTO stats_course_teacher (teacher_id, courses, credits) VALUES (NEW.id, 0, 0)
+            ON CONFLICT(teacher_id) DO NOTHING;
+        INSERT INTO stats_course_subject (subject, courses, credits)
+            SELECT NEW.subject, courses, credits FROM stats_course_teacher WHERE teacher_id = NEW.id AND courses > 0
+            ON CONFLICT(subject) DO UPDATE SET courses = courses + excluded.courses, credits = credits + excluded.credits;"""),
+    ('stats_teacher_courses_delete', 'AFTER DELETE ON teacher', """
+        UPDATE stats_course_subject SET
+            courses = courses - (SELECT courses FROM stats_course_teacher WHERE teacher_id = OLD.id),
+            credits = credits - (SELECT credits FROM stats_course_teacher WHERE teacher_id = OLD.id)
+            WHERE subject = OLD.subject AND EXISTS (SELECT 1 FROM stats_course_teacher WHERE teacher_id = OLD.id);
+        DELETE FROM stats_course_teacher WHERE teacher_id = OLD.id AND courses = 0;"""),
+    ('stats_teacher_courses_update', 'AFTER UPDATE OF subject ON teacher WHEN OLD.subject IS NOT NEW.subject', """
+        UPDATE stats_course_subject SET
+            courses = courses - (SELECT courses FROM stats_course_teacher WHERE teacher_id = OLD.id),
+            credits = credits - (SELECT credits FROM stats_course_teacher WHERE teacher_id = OLD.id)
+            WHERE subject = OLD.subject AND EXISTS (SELECT 1 FROM stats_course_teacher WHERE teacher_id = OLD.id);
+        INSERT INTO stats_course_subject (subject, courses, credits)
+            SELECT NEW.subject, courses, credits FROM stats_course_teacher WHERE teacher_id = NEW.id AND courses > 0
+            ON CONFLICT(subject) DO UPDATE SET courses = courses + excluded.courses, credits = credits + excluded.credits;"""),
+    ('stats_course_subject_insert', 'AFTER INSERT ON course', """
+        INSERT INTO stats_course_subject (subject, courses, credits)
+            SELECT subject, 1, NEW.credits FROM teacher WHERE id = NEW.teacher_id
+            ON CONFLICT(subject) DO UPDATE SET courses = courses + 1, credits = credits + excluded.credits;"""),
+    ('stats_course_subject_delete', 'AFTER DELETE ON course', """
+        UPDATE stats_course_subject SET courses = courses - 1, credits = credits - OLD.credits
+            WHERE subject = (SELECT subject FROM teacher WHERE id = OLD.teacher_id);"""),
+    ('stats_course_subject_update', 'AFTER UPDATE OF teacher_id, credits ON course', """
+        UPDATE stats_course_subject SET courses = courses - 1, credits = credits - OLD.credits
+            WHERE subject = (SELECT subject FROM teacher WHERE id = OLD.teacher_id);
+        INSERT INTO stats_course_subject (subject, courses, credits)
+            SELECT subject, 1, NEW.credits FROM teacher WHERE id = NEW.teacher_id
+            ON CONFLICT(subject) DO UPDATE SET courses = courses + 1, credits = credits + excluded.credits;"""),
+]
+
+TRIGGERS = create_triggers(_TRIGGERS)
+
+REBUILD = [
+    "DELETE FROM stats_student_grade",
+    "INSERT INTO stats_student_grade (grade, students) SELECT grade, COUNT(*) FROM student GROUP BY grade",
+    "DELETE FROM stats_teacher_subject",
+    "INSERT INTO stats_teacher_subject (subject, teachers) SELECT subject, COUNT(*) FROM teacher GROUP BY subject",
+    "DELETE FROM stats_course_teacher",
+    """INSERT INTO stats_course_teacher (teacher_id, courses, credits)
+        SELECT teacher_id, COUNT(*), SUM(credits) FROM course GROUP BY teacher_id""",
+    """INSERT INTO stats_course_teacher (teacher_id, courses, credits) SELECT id, 0, 0 FROM teacher WHERE true
+        ON CONFLICT(teacher_id) DO NOTHING""",
+    "DELETE FROM stats_course_subject",
+    """INSERT INTO stats_course_subject (subject, courses, credits)
+        SELECT t.subject, COUNT(*), SUM(c.credits) FROM course c JOIN teacher t ON t.id = c.teacher_id GROUP BY t.subject""",
+]
+
+
+def install_stats(connection, rebuild=False):
+    """Create the summary tables and their triggers on a SQLAlchemy connection"""
+    for statement in SUMMARY_TABLES + TRIGGERS:
+        connection.exec_driver_sql(statement)
+    if rebuild:
+        rebuild_stats(connection)
+
+
+def rebuild_stats(connection):
+    """Recompute every summary table from the base tables"""
+    for statement in REBUILD:
+        connection.exec_driver_sql(statement)
+
+
+def read_stats(connection):
+    def rows(sql):
+        return [dict(row._mapping) for row in connection.exec_driver_sql(sql)]
+
+    students_per_grade = rows(
+        "SELECT grade, students FROM stats_student_grade WHERE students > 0 ORDER BY grade")
+    teachers_per_subject = rows(
+        "SELECT subject, teachers FROM stats_teacher_subject WHERE teachers > 0 ORDER BY subject")
+    courses_per_subject = rows(
+        "SELECT subject, courses, credits FROM stats_course_subject WHERE courses > 0 ORDER BY courses DESC, subject")
+
+    return {
+        'totals': {
+            'students': sum(row['students'] for row in students_per_grade),
+            'teachers': sum(row['teachers'] for row in teachers_per_subject),
+            'courses': sum(row['courses'] for row in courses_per_subject),
+            'credits': sum(row['credits'] for row in courses_per_subject),
+        },
+        'students_per_grade': students_per_grade,
+        'teachers_per_subject': teachers_per_subject,
+        'courses_per_subject': courses_per_subject,
+    }
+
+
+def read_courses_per_teacher(connection, limit, after=None):
+    """Teachers with their course count and credits, most courses first (ties by id, highest
+    first), at most ``limit`` of them; ``after`` is the (courses, teacher_id) of the last row
+    of the previous page"""
+    sql = """SELECT t.id AS teacher_id, t.name AS teacher, t.subject, s.courses, s.credits
+        FROM stats_course_teacher s JOIN teacher t ON t.id = s.teacher_id"""
+    params = ()
+    if after is not None:
+        sql += " WHERE (s.courses, s.teacher_id) < (?, ?)"
+        params = tuple(after)
+    sql += " ORDER BY s.courses DESC, s.teacher_id DESC LIMIT ?"
+    return [dict(row._mapping) for row in connection.exec_driver_sql(sql, params + (limit,))]
@@ -0,0 +1,11 @@
+"""
+SQL shared by the modules that keep derived tables up to date with triggers.
+"""
+
+# the current UTC time as ISO 8601 text with milliseconds
+NOW = "strftime('%Y-%m-%dT%H:%M:%f', 'now')"
+
+
+def create_triggers(triggers):
+    """CREATE TRIGGER statements for a list of (name, timing/event, body)"""
+    return [f"CREATE TRIGGER IF NOT EXISTS {name} {event} BEGIN {body}\n    END" for name, event, body in triggers]
@@ -1,59 +1,83 @@
-import sqlite3
+"""
+Print the tables of the school database and a few useful queries.
+
+Usage:
+    python view_database.py                       # every table, streamed in full
+    python view_database.py --summary             # row counts and the first 5 rows of each table
+    python view_database.py --table student --limit 100 --offset 1000
+    python view_database.py --table course --format csv
+    python view_database.py --live                # the live school.db rather than the latest snapshot
+"""
+
+import argparse
+
+from run_sql import DATABASE, FETCH_SIZE, FORMATS, choose_database, connect, iter_batches, paged_query, write_rows
+
+
+def stream_query(cursor, query, limit=None, offset=0, fmt='table', batch_size=FETCH_SIZE):
+    """Execute ``query`` and write its rows batch by batch; returns the number of rows written"""
+    sql, paged = paged_query(query, limit, offset)
+    cursor.execute(sql)
+    column_names = [description[0] for description in cursor.description]
+    if paged:
+        batches = iter_batches(cursor, batch_size=batch_size)
+    else:
+        batches = iter_batches(cursor, limit, offset, batch_size)
+    return write_rows(column_names, batches, fmt)
+
+
+def view_database(database=DATABASE, tables=None, summary=False, sample=5, limit=None, offset=0, fmt='table'):
+    # Connect to the SQLite database (a snapshot opens read-only)
+    conn = connect(database)
+    if summary:
+        limit = sample if limit is None else min(limit, sample)
 
-def view_database():
-    # Connect to the SQLite database
-    conn = sqlite3.connect('school.db')
-    
     print("=" * 60)
     print("SCHOOL MANAGEMENT DATABASE VIEWER")
     print("=" * 60)
-    
+
     # Get all table names
     cursor = conn.cursor()
     cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-    tables = cursor.fetchall()
-    
-    print(f"\nFound {len(tables)} tables:")
-    for table in tables:
-        print(f"  - {table[0]}")
-    
+    table_names = [row[0] for row in cursor.fetchall()]
+    if tables:
+        table_names = [name for name in table_names if name in tables]
+
+    print(f"\nFound {len(table_names)} tables:")
+    for table_name in table_names:
+        print(f"  - {table_name}")
+
     print("\n" + "=" * 60)
-    
+
     # Display each table
-    for table_name in tables:
-        table_name = table_name[0]
+    for table_name in table_names:
         print(f"\nTABLE: {table_name.upper()}")
         print("-" * 40)
-        
+
         # Get table schema
-        cursor.execute(f"PRAGMA table_info({table_name});")
+        cursor.execute(f'PRAGMA table_info("{table_name}");')
         columns = cursor.fetchall()
         print("Columns:")
         for col in columns:
             print(f"  {col[1]} ({col[2]})")
-        
+
         # Get table data
-        cursor.execute(f"SELECT * FROM {table_name};")
-        rows = cursor.fetchall()
-        
-        print(f"\nData ({len(rows)} rows):")
-        if rows:
-            # Get column names
-            column_names = [description[0] for description in cursor.description]
-            print(" | ".join(column_names))
-            print("-" * (len(" | ".join(column_names))))
-            
-            for row in rows:
-                print(" | ".join(str(cell) for cell in row))
+        total = cursor.execute(f'SELECT COUNT(*) FROM "{table_name}";').fetchone()[0]
+        print(f"\nData ({total} rows):")
+        if total:
+            shown = stream_query(cursor, f'SELECT * FROM "{table_name}";', limit, offset, fmt)
+            if shown < total:
+                print(f"  ... showing rows {offset + 1}-{offset + shown} of {total}" if shown
+                      else f"  (no rows after offset {offset})")
         else:
             print("  (No data)")
-        
+
         print("\n" + "=" * 60)
-    
+
     # Show some useful SQL queries
     print("\nUSEFUL SQL QUERIES:")
     print("-" * 40)
-    
+
     queries = [
         ("All Students", "SELECT * FROM student;"),
         ("All Teachers", "SELECT * FROM teacher;"),
@@ -61,38 +85,45 @@ def view_database():
         ("Students by Grade", "SELECT name, grade FROM student ORDER BY grade;"),
         ("Teachers by Subject", "SELECT name, subject FROM teacher ORDER BY subject;"),
         ("Courses with Teachers", """
-            SELECT c.name as course_name, c.credits, t.name as teacher_name, t.subject 
-            FROM course c 
+            SELECT c.name as course_name, c.credits, t.name as teacher_name, t.subject
+            FROM course c
             JOIN teacher t ON c.teacher_id = t.id;
         """),
         ("Student Count by Grade", """
-            SELECT grade, COUNT(*) as count 
-            FROM student 
-            GROUP BY grade 
+            SELECT grade, COUNT(*) as count
+            FROM student
+            GROUP BY grade
             ORDER BY grade;
         """)
     ]
-    
+
     for query_name, query in queries:
         print(f"\n{query_name}:")
         print(f"SQL: {query.strip()}")
         try:
-            cursor.execute(query)
-            results = cursor.fetchall()
-            if results:
-                column_names = [description[0] for description in cursor.description]
-                print("Result:")
-                print(" | ".join(column_names))
-                print("-" * (len(" | ".join(column_names))))
-                for row in results:
-                    print(" | ".join(str(cell) for cell in row))
-            else:
+            print("Result:")
+            if not stream_query(cursor, query, limit, offset, fmt):
                 print("  (No results)")
         except Exception as e:
             print(f"  Error: {e}")
         print()
-    
+
     conn.close()
 
+
+def main():
+    parser = argparse.ArgumentParser(description="View the school database")
+    parser.add_argument('--db', help="SQLite database file to view instead of the latest snapshot")
+    parser.add_argument('--live', action='store_true', help="view the live school.db instead of the latest snapshot")
+    parser.add_argument('--table', action='append', dest='tables', help="only show this table (repeatable)")
+    parser.add_argument('--summary', action='store_true', help="show row counts and sample rows instead of whole tables")
+    parser.add_argument('--sample', type=int, default=5, help="rows per table in --summary mode (default: 5)")
+    parser.add_argument('--limit', type=int, help="show at most this many rows per table or query")
+    parser.add_argument('--offset', type=int, default=0, help="skip this many rows first")
+    parser.add_argument('--format', choices=FORMATS, default='table', help="row format (default: table)")
+    args = parser.parse_args()
+    view_database(choose_database(args.db, args.live), args.tables, args.summary, args.sample, args.limit, args.offset, args.format)
+
+
 if __name__ == "__main__":
-    view_database()
+    main()